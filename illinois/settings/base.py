@@ -85,24 +85,60 @@ LOGIN_URL = 'login_urlpattern'
 LOGIN_REDIRECT_URL = 'student-list-url'
 LOGOUT_REDIRECT_URL = 'login_urlpattern'
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+# 12) CACHES
+# Used by students/stats.py (dashboard aggregates). Per-process memory cache in
+# development; production.py switches to a cache shared by all workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'illinois-default',
+    }
+}
+STUDENTS_STATS_CACHE_TIMEOUT = 300   # seconds; signals clear it sooner on writes
+
+# 13) STUDENT SEARCH (students/search.py)
+# Backend is picked from the DB vendor (SQLite FTS5 / MySQL FULLTEXT); set
+# STUDENTS_SEARCH_BACKEND = "students.search.LikeSearchBackend" to force the old LIKE search.
+STUDENTS_SEARCH_MAX_RESULTS = 500   # the student list page shows at most this many matches (the API: all)
+
+# 14) STUDENT JSON APIs (keyset pagination, students/pagination.py)
+STUDENTS_API_DEFAULT_LIMIT = 100
+STUDENTS_API_MAX_LIMIT = 1000      # ?limit= is clamped to this
+
+# 15) EXPORTS (students/exports.py)
+STUDENTS_EXPORT_CHUNK_SIZE = 2000  # rows fetched / encoded per chunk
+STUDENTS_EXPORT_GZIP = True        # gzip the stream when the client sends Accept-Encoding: gzip
+STUDENTS_EXPORT_COLUMNAR_BATCH_ROWS = 50_000   # rows per Parquet row group / Arrow record batch
+STUDENTS_EXPORT_DIR = BASE_DIR / 'data' / 'exports'   # background export artifacts (students/jobs.py)
+STUDENTS_EXPORT_ARTIFACT_GRACE = 3600   # seconds a replaced export artifact stays downloadable
+
+# 16) CHART RENDER CACHE (students/charts.py)
+# Rendered PNGs keyed by a hash of their input data; LRU-evicted past these sizes.
+STUDENTS_CHART_CACHE_MEMORY_BYTES = 16 * 2**20   # per process
+STUDENTS_CHART_CACHE_DISK_BYTES = 128 * 2**20    # shared by all workers on the host
+STUDENTS_CHART_CACHE_DIR = BASE_DIR / 'data' / 'charts'
+
+# 17) CHART RENDER WORKERS (students/charts.py, students/chart_render.py)
+# Charts are drawn in a pool of worker processes, not in request threads.
+STUDENTS_CHART_WORKERS = 2        # 0 = draw inline in the request thread
+STUDENTS_CHART_MAX_QUEUE = 16     # renders waiting/running before we answer "chart busy"
+STUDENTS_CHART_TIMEOUT = 10       # seconds a request waits for its chart
+STUDENTS_CHART_ENGINE = "matplotlib"   # or "pillow": fast inline renderer (students/chart_pillow.py)
+
+# 18) WEATHER CLIENT (students/weather.py, api/weather/)
+STUDENTS_WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+STUDENTS_WEATHER_TTL = 300            # seconds; also the minimum gap between upstream calls
+STUDENTS_WEATHER_STALE = 3600         # serve an older value this long while refreshing
+STUDENTS_WEATHER_TIMEOUT = 3          # seconds per upstream call
+STUDENTS_WEATHER_BREAKER_FAILURES = 3   # failures in a row that open the circuit
+STUDENTS_WEATHER_BREAKER_RESET = 900    # seconds before one trial call is let through
+STUDENTS_WEATHER_RETRY_AFTER = 30       # seconds after a failed call before the next attempt
+
+# 19) JSON RENDERER (students/renderers.py: api/ and export/ JSON)
+STUDENTS_JSON_RENDERER = "auto"       # "orjson", "stdlib", or "auto" (orjson if installed)
+
+# 20) VEGA-LITE DATASETS (students/datasets.py, datasets/<name>.csv)
+STUDENTS_DATASET_DIR = BASE_DIR / 'data' / 'vega-lite-test_data'
+STUDENTS_DATASET_CACHE_SIZE = 64      # encoded (file version, transform) variants kept per process
+STUDENTS_DATASET_PRECOMPRESSED_DIR = BASE_DIR / 'data' / 'precompressed'   # best-level .gz/.br of the published CSVs
+STUDENTS_CHART_PAGE_CACHE_SECONDS = 600   # charts/vega-lite/ shell (the specs revalidate by ETag)
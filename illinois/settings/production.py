@@ -20,3 +20,11 @@ DATABASES = {
     }
 }
 
+# Shared between all web workers, so a signal-driven invalidation in one worker
+# is seen by the others (see students/stats.py).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "data" / "cache",
+    }
+}
@@ -3,11 +3,11 @@
 
 # css/admin.py
 from django.contrib import admin
-from .models import Section, Student, Enrollment
+from .models import Section, Student, Enrollment, ExportJob
 
 @admin.register(Section)
 class SectionAdmin(admin.ModelAdmin):
-    list_display  = ("section_id", "code", "name", "term")
+    list_display  = ("section_id", "code", "name", "term", "n_students", "n_enrollments", "n_active_enrollments")
     search_fields = ("code", "name", "term")
     ordering      = ("section_id",)   # or ("code",)
 
@@ -23,4 +23,10 @@ class EnrollmentAdmin(admin.ModelAdmin):
     list_display  = ("enroll_id", "student", "section", "is_active", "enrolled_on")
     search_fields = ("student__first_name", "student__last_name", "section__code")
     list_filter   = ("section", "is_active")
-    ordering      = ("-enroll_id",)   # newest first
\ No newline at end of file
+    ordering      = ("-enroll_id",)   # newest first
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display  = ("job_id", "table", "file_format", "status", "data_version", "size_bytes", "created_at", "finished_at")
+    list_filter   = ("status", "table", "file_format")
+    ordering      = ("-created_at",)
@@ -1,6 +1,28 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    # SQLite drops triggers when a migration rebuilds students_student;
+    # put the full-text search index back if that happened.
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+    from .search import backend_for
+
+    conn = connections[using]
+    if ("students", "0004_student_search_index") not in MigrationRecorder(conn).applied_migrations():
+        return
+    backend = backend_for(conn)
+    if not backend.is_installed(conn):
+        backend.install(conn)
 
 
 class StudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'students'
+
+    def ready(self):
+        # Register the signal handlers (Section counters, stats cache)
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(ensure_search_index, sender=self)
@@ -0,0 +1,319 @@
+# students/chart_pillow.py
+# Fast-path renderer for the two dashboard bar charts, drawn directly with Pillow
+# (PNG / WebP) or written out as hand-built SVG - no matplotlib involved.
+#
+# Both charts are labelled bars of a dozen small integers; matplotlib's import
+# (hundreds of ms per worker) and layout engine are overkill for that. This draws
+# the same picture - same pixel size, same colours, same font (matplotlib's
+# bundled DejaVu Sans when available), same "nice" y ticks and 5% headroom - about
+# ten times faster, inline in the request thread. Selected with ?engine=pillow or
+# STUDENTS_CHART_ENGINE = "pillow" (students/charts.py).
+#
+# bar_chart() does the layout once and paints through a small canvas interface:
+#   _PillowCanvas -> raster image, encoded by encode()
+#   _SvgCanvas    -> SVG document (text measured with the same Pillow fonts)
+#
+# encode() is also used for the matplotlib path (students/chart_render.py).
+
+import importlib.util
+import math
+import os
+from functools import lru_cache
+from io import BytesIO
+from xml.sax.saxutils import escape, quoteattr
+
+from PIL import Image, ImageDraw, ImageFont
+
+from students.chart_render import FIGURE_SIZES
+
+NAVY = "#13294B"
+ORANGE = "#E84A27"
+INK = "#000000"
+WHITE = "#FFFFFF"
+
+# Palette size for PNG / WebP. Flat-coloured charts survive this untouched (the
+# anti-aliased text edges are what the extra entries are for) and the files
+# shrink to roughly a quarter of the 24-bit PNG.
+PALETTE_COLORS = 64
+
+SVG_FONT = "DejaVu Sans, Bitstream Vera Sans, Arial, sans-serif"
+
+
+def encode(img, fmt):
+    # RGB image -> PNG / WebP bytes, palette-quantised.
+    small = img.quantize(colors=PALETTE_COLORS, method=Image.Quantize.FASTOCTREE)
+    buf = BytesIO()
+    if fmt == "webp":
+        small.convert("RGB").save(buf, format="WEBP", lossless=True, method=4)
+    else:
+        small.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=None)
+def _font(px):
+    # matplotlib ships DejaVu Sans; find it without importing matplotlib.
+    spec = importlib.util.find_spec("matplotlib")
+    if spec and spec.submodule_search_locations:
+        path = os.path.join(spec.submodule_search_locations[0], "mpl-data", "fonts", "ttf", "DejaVuSans.ttf")
+        if os.path.exists(path):
+            return ImageFont.truetype(path, px)
+    return ImageFont.load_default(size=px)
+
+
+def _pt(points, dpi):
+    return max(1, round(points * dpi / 72))
+
+
+def _font_px(points, dpi):
+    # Pillow sizes a font by its full em box; matplotlib's glyphs come out ~17% smaller.
+    return max(1, round(points * dpi / 72 * 0.83))
+
+
+def nice_ticks(top, max_ticks=8):
+    # 0, step, 2*step, ... covering `top`, with step 1/2/2.5/5 x 10^k (like MaxNLocator).
+    if top <= 0:
+        return [0, 1]
+    raw = top / max_ticks
+    base = 10 ** math.floor(math.log10(raw))
+    step = next(m * base for m in (1, 2, 2.5, 5, 10) if m * base >= raw)
+    if step < 1:
+        step = 1   # counts are integers
+    n = int(top // step) + 1
+    return [i * step for i in range(n + 1) if i * step <= top + 1e-9]
+
+
+def _fmt(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+def _line_height(font):
+    # Full line box (ascent + descent), which is what matplotlib lays out with.
+    ascent, descent = font.getmetrics()
+    return ascent + descent
+
+
+def _slanted_height(font, text):
+    # Height of `text`'s line box rotated 45 degrees.
+    return math.ceil((font.getlength(text) + _line_height(font)) * math.sqrt(0.5)) + 2
+
+
+# ---------- Canvases ----------
+
+class _PillowCanvas:
+    def __init__(self, width, height):
+        self.img = Image.new("RGB", (width, height), WHITE)
+        self.draw = ImageDraw.Draw(self.img)
+
+    def rect(self, x0, y0, x1, y1, fill=None, outline=None, width=1):
+        self.draw.rectangle([x0, y0, x1, y1], fill=fill, outline=outline, width=width)
+
+    def line(self, x0, y0, x1, y1, color, width=1):
+        self.draw.line([x0, y0, x1, y1], fill=color, width=width)
+
+    def text(self, x, y, text, font, fill=INK, anchor="la"):
+        # anchor: Pillow's two-letter codes, l/m/r + t/m/d
+        self.draw.text((x, y), text, font=font, fill=fill, anchor=anchor)
+
+    def _text_layer(self, text, font, angle):
+        layer = Image.new("L", (math.ceil(font.getlength(text)) + 2, _line_height(font)), 0)
+        ImageDraw.Draw(layer).text((1, 0), text, font=font, fill=255)
+        return layer.rotate(angle, expand=True, resample=Image.BICUBIC)
+
+    def _paste_mask(self, layer, x, y, fill=INK):
+        self.img.paste(Image.new("RGB", layer.size, fill), (round(x), round(y)), layer)
+
+    def vertical_text(self, x, y_center, text, font):
+        # Reads bottom to top, left edge at x.
+        layer = self._text_layer(text, font, 90)
+        self._paste_mask(layer, x, y_center - layer.height / 2)
+
+    def slanted_text(self, x, y_top, text, font, align):
+        # Rotated 45 degrees, hanging below y_top; ends at x ("right") or centred on it.
+        layer = self._text_layer(text, font, 45)
+        x0 = x - layer.width if align == "right" else x - layer.width / 2
+        self._paste_mask(layer, x0, y_top)
+
+    def result(self, fmt):
+        return encode(self.img, fmt)
+
+
+class _SvgCanvas:
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.parts = [f'<rect width="{width}" height="{height}" fill="{WHITE}"/>']
+
+    @staticmethod
+    def _n(v):
+        return f"{v:.1f}".rstrip("0").rstrip(".")
+
+    def rect(self, x0, y0, x1, y1, fill=None, outline=None, width=1):
+        n = self._n
+        attrs = f'fill="{fill or "none"}"'
+        if outline:
+            attrs += f' stroke="{outline}" stroke-width="{width}"'
+        self.parts.append(
+            f'<rect x="{n(x0)}" y="{n(y0)}" width="{n(x1 - x0)}" height="{n(y1 - y0)}" {attrs}/>'
+        )
+
+    def line(self, x0, y0, x1, y1, color, width=1):
+        n = self._n
+        self.parts.append(
+            f'<line x1="{n(x0)}" y1="{n(y0)}" x2="{n(x1)}" y2="{n(y1)}" stroke="{color}" stroke-width="{width}"/>'
+        )
+
+    def _text(self, x, y, text, font, fill, h_anchor, rotate=0):
+        n = self._n
+        anchor = {"l": "start", "m": "middle", "r": "end"}[h_anchor]
+        transform = f' transform="rotate({rotate} {n(x)} {n(y)})"' if rotate else ""
+        self.parts.append(
+            f'<text x="{n(x)}" y="{n(y)}" font-size="{font.size}" fill="{fill}" '
+            f'text-anchor="{anchor}"{transform}>{escape(text)}</text>'
+        )
+
+    def text(self, x, y, text, font, fill=INK, anchor="la"):
+        # Same anchors as Pillow; SVG positions text by its baseline.
+        ascent, descent = font.getmetrics()
+        baseline = {"t": y + ascent, "m": y + (ascent - descent) / 2, "d": y - descent}.get(anchor[1], y)
+        self._text(x, baseline, text, font, fill, anchor[0])
+
+    def vertical_text(self, x, y_center, text, font):
+        self._text(x + font.getmetrics()[0], y_center, text, font, INK, "m", rotate=-90)
+
+    def slanted_text(self, x, y_top, text, font, align):
+        ascent, descent = font.getmetrics()
+        if align == "right":
+            # top-right corner of the rotated line box sits at (x, y_top)
+            bx, by = x - ascent * math.sqrt(0.5), y_top + ascent * math.sqrt(0.5)
+            self._text(bx, by, text, font, INK, "r", rotate=-45)
+        else:
+            cy = y_top + _slanted_height(font, text) / 2
+            self._text(x, cy + (ascent - descent) / 2, text, font, INK, "m", rotate=-45)
+
+    def result(self, fmt):
+        body = "\n".join(self.parts)
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" '
+            f'viewBox="0 0 {self.width} {self.height}" font-family={quoteattr(SVG_FONT)}>\n'
+            f"{body}\n</svg>\n"
+        ).encode("utf-8")
+
+
+# ---------- Layout ----------
+
+def bar_chart(labels, series, *, size_in, dpi, title, title_pt, tick_pt,
+              xlabel=None, ylabel=None, label_pt=None, title_color=INK,
+              group_width=0.8, label_align="center", legend=False, fmt="png"):
+    # series: [(name, values, colour), ...] drawn side by side within each group.
+    # Returns the encoded image (`fmt`: png / webp / svg).
+    width, height = round(size_in[0] * dpi), round(size_in[1] * dpi)
+    canvas = (_SvgCanvas if fmt == "svg" else _PillowCanvas)(width, height)
+
+    title_font = _font(_font_px(title_pt, dpi))
+    tick_font = _font(_font_px(tick_pt, dpi))
+    label_font = _font(_font_px(label_pt or tick_pt, dpi))
+    # Roughly matplotlib's defaults (tight_layout pad 1.08 x 10pt, 3.5pt ticks and
+    # tick label gap, 4pt axis label gap), tuned so the axes land on the same pixels.
+    outer = _pt(10.8, dpi)
+    pad = _pt(4, dpi)
+    tick_len = _pt(3.5, dpi)
+    tick_pad = _pt(3.5, dpi)
+    line = max(1, round(dpi / 100))
+
+    top_value = max([max(values, default=0) for _, values, _ in series], default=0)
+    y_top = max(top_value * 1.05, 1)
+    ticks = nice_ticks(y_top)
+
+    label_h = max((_slanted_height(tick_font, text) for text in labels), default=0)
+    ytick_w = max(tick_font.getlength(_fmt(t)) for t in ticks)
+    title_h = _line_height(title_font)
+
+    # Plot area in pixels
+    left = outer + (_line_height(label_font) + pad * 1.5 if ylabel else 0) + ytick_w + tick_pad + tick_len
+    right = width - outer
+    top = outer + title_h + _pt(3.5, dpi)
+    bottom = height - outer - label_h - tick_pad - tick_len - pad
+    if xlabel:
+        bottom -= _line_height(label_font) + pad
+    plot_w, plot_h = right - left, bottom - top
+
+    n = max(len(labels), 1)
+    x_lo = -group_width / 2 - 0.05 * n
+    x_hi = n - 1 + group_width / 2 + 0.05 * n
+
+    def px_x(x):
+        return left + (x - x_lo) / (x_hi - x_lo) * plot_w
+
+    def px_y(y):
+        return bottom - y / y_top * plot_h
+
+    # Bars
+    bar_w = group_width / max(len(series), 1)
+    for s, (_, values, colour) in enumerate(series):
+        offset = -group_width / 2 + bar_w * s
+        for i, v in enumerate(values):
+            if v > 0:
+                canvas.rect(px_x(i + offset), px_y(v), px_x(i + offset + bar_w) - 1, bottom, fill=colour)
+
+    # Frame, y ticks, x ticks
+    canvas.rect(left, top, right, bottom, outline=INK, width=line)
+    for t in ticks:
+        y = px_y(t)
+        canvas.line(left - tick_len, y, left, y, INK, line)
+        canvas.text(left - tick_len - tick_pad, y, _fmt(t), tick_font, anchor="rm")
+    for i, text in enumerate(labels):
+        x = px_x(i)
+        canvas.line(x, bottom, x, bottom + tick_len, INK, line)
+        canvas.slanted_text(x, bottom + tick_len + tick_pad, text, tick_font, label_align)
+
+    # Titles
+    canvas.text((left + right) / 2, outer, title, title_font, fill=title_color, anchor="mt")
+    if xlabel:
+        canvas.text((left + right) / 2, height - outer, xlabel, label_font, anchor="md")
+    if ylabel:
+        canvas.vertical_text(outer, (top + bottom) / 2, ylabel, label_font)
+
+    if legend:
+        swatch = _pt(10, dpi)
+        y = top + pad
+        text_w = max(tick_font.getlength(name) for name, _, _ in series)
+        x = left + pad * 2   # upper left, where matplotlib's "best" puts it for these charts
+        box_h = len(series) * (swatch + pad) + pad
+        canvas.rect(x - pad, y - pad, x + swatch + pad + text_w + pad, y + box_h - pad,
+                    fill=WHITE, outline="#CCCCCC")
+        for name, _, colour in series:
+            canvas.rect(x, y, x + swatch, y + swatch * 0.7, fill=colour)
+            canvas.text(x + swatch + pad, y + swatch * 0.35, name, tick_font, anchor="lm")
+            y += swatch + pad
+
+    return canvas.result(fmt)
+
+
+def render_sections_chart(rows, fmt="png", dpi=150):
+    return bar_chart(
+        [sec["code"] for sec in rows],
+        [("Students", [sec["n_students"] for sec in rows], NAVY)],
+        size_in=FIGURE_SIZES["sections"], dpi=dpi, fmt=fmt,
+        title="Students per Section", title_pt=10, title_color=NAVY, tick_pt=8,
+        xlabel="Section", ylabel="Students", label_pt=8,
+    )
+
+
+def render_enrollments_chart(rows, fmt="png", dpi=150):
+    return bar_chart(
+        [r["code"] for r in rows],
+        [("All", [r["n_all"] for r in rows], NAVY), ("Active", [r["n_active"] for r in rows], ORANGE)],
+        size_in=FIGURE_SIZES["enrollments"], dpi=dpi, fmt=fmt,
+        title="Enrollments per Section", title_pt=12, tick_pt=10,
+        ylabel="Enrollments", label_pt=10, label_align="right", legend=True,
+    )
+
+
+RENDERERS = {
+    "sections": render_sections_chart,
+    "enrollments": render_enrollments_chart,
+}
+
+
+def render(chart, rows, fmt="png", dpi=150):
+    return RENDERERS[chart](rows, fmt, dpi)
@@ -0,0 +1,96 @@
+# students/chart_render.py
+# The chart drawing code, run inside the chart worker processes (students/charts.py).
+#
+# Plain functions "rows -> image bytes" with no Django imports, so a worker process
+# only has to import this module and matplotlib. They use the object-oriented
+# Figure API instead of pyplot: no global figure registry, nothing shared between
+# renders, nothing to clean up with plt.close().
+#
+# matplotlib is imported inside the functions: the web process imports this
+# module only to hand the functions to the pool, and should not pay for it.
+#
+# Output: "svg" straight from matplotlib (text kept as text), "png" / "webp" from
+# the Agg pixel buffer through chart_pillow.encode() (palette-quantised).
+
+from io import BytesIO
+
+# Figure size in inches; pixel size = inches x dpi. Shared with chart_pillow.py.
+FIGURE_SIZES = {
+    "sections": (6, 3),
+    "enrollments": (6.5, 3.2),
+}
+
+
+def _encode(fig, fmt):
+    from matplotlib import rc_context
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    canvas = FigureCanvasAgg(fig)
+    if fmt == "svg":
+        buf = BytesIO()
+        with rc_context({"svg.fonttype": "none", "svg.hashsalt": "charts"}):
+            fig.savefig(buf, format="svg", metadata={"Date": None})
+        return buf.getvalue()
+
+    from PIL import Image
+    from students import chart_pillow
+
+    canvas.draw()
+    img = Image.frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+    return chart_pillow.encode(img.convert("RGB"), fmt)
+
+
+def render_sections_chart(rows, fmt="png", dpi=150):
+    labels = [sec["code"] for sec in rows]
+    counts = [sec["n_students"] for sec in rows]
+
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=FIGURE_SIZES["sections"], dpi=dpi)
+    ax = fig.subplots()
+    ax.bar(labels, counts, color="#13294B")
+    ax.set_title("Students per Section", fontsize=10, color="#13294B")
+    ax.set_xlabel("Section", fontsize=8)
+    ax.set_ylabel("Students", fontsize=8)
+    ax.tick_params(axis="x", rotation=45, labelsize=8)
+    ax.tick_params(axis="y", labelsize=8)
+    fig.tight_layout()
+    return _encode(fig, fmt)
+
+
+def render_enrollments_chart(rows, fmt="png", dpi=150):
+    labels        = [r["code"] for r in rows]
+    all_counts    = [r["n_all"] for r in rows]
+    active_counts = [r["n_active"] for r in rows]
+
+    x = range(len(labels))
+    width = 0.4
+
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=FIGURE_SIZES["enrollments"], dpi=dpi)
+    ax = fig.subplots()
+    ax.bar([i - width/2 for i in x], all_counts,   width=width, label="All",    color="#13294B")
+    ax.bar([i + width/2 for i in x], active_counts, width=width, label="Active", color="#E84A27")
+
+    ax.set_title("Enrollments per Section")
+    ax.set_ylabel("Enrollments")
+    ax.set_xticks(list(x))
+    ax.set_xticklabels(labels, rotation=45, ha="right")
+    ax.legend()
+    fig.tight_layout()
+    return _encode(fig, fmt)
+
+
+RENDERERS = {
+    "sections": render_sections_chart,
+    "enrollments": render_enrollments_chart,
+}
+
+
+def render(chart, rows, fmt="png", dpi=150):
+    return RENDERERS[chart](rows, fmt, dpi)
+
+
+def warm_up():
+    # Pool initializer: pay for the matplotlib import, font cache and first
+    # layout once per worker instead of on the first request it serves.
+    render_sections_chart([{"code": "warm-up", "n_students": 1}])
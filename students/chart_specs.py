@@ -0,0 +1,77 @@
+# students/chart_specs.py
+# The Vega-Lite specs of the charts/vega-lite/ page, one JSON resource per chart:
+#
+#   charts/vega-lite/specs/<name>.json   the spec of students/vega_lite/<name>.json
+#                                        with its "data" pointing at the dataset URL
+#
+# The page itself is a static shell (cached whole, see VegaLiteAPI) that fetches a
+# spec only when its chart scrolls into view, so the first charts do not wait for
+# the 17k-row vlSpec4 data. A spec is built once per (spec file, dataset version):
+# the data URLs carry the dataset digest, so a changed CSV changes the spec body and
+# its ETag, and browsers revalidate with If-None-Match (304, no body).
+
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+
+from students import datasets, timeseries
+from students.renderers import renderer
+
+SPEC_DIR = Path(__file__).resolve().parent / "vega_lite"
+
+CHART_WIDTH = 1100   # px, the wide charts of vlSpec4-6
+
+# spec -> where its data comes from (students/datasets.py, students/timeseries.py).
+# vlSpec4 is long format (31 variables x 559 days) and only 10 variables are plotted,
+# so the rest is dropped on the server; the two time series are capped at one point
+# per pixel of the chart.
+DATA = {
+    "vlSpec1": (datasets.dataset_url, {}),
+    "vlSpec2": (datasets.dataset_url, {}),
+    "vlSpec3": (datasets.dataset_url, {}),
+    "vlSpec4": (timeseries.series_url, {
+        "series": "volume,positive,neutral,negative,net_sent_vol,male,female,Reddit,Blogs,Twitter",
+        "max_points": CHART_WIDTH,
+    }),
+    "vlSpec5": (datasets.dataset_url, {}),
+    "vlSpec6": (timeseries.series_url, {"max_points": CHART_WIDTH}),
+}
+
+
+def names():
+    return list(DATA)
+
+
+def data_url(name):
+    url_for, params = DATA[name]
+    return url_for(name, **params)
+
+
+@lru_cache(maxsize=len(DATA) * 2)
+def _build(name, mtime_ns, url):
+    spec = json.loads((SPEC_DIR / f"{name}.json").read_text(encoding="utf-8"))
+    # format given explicitly: the query string hides the .csv extension from Vega
+    spec["data"] = {"url": url, "format": {"type": "csv"}}
+    body = renderer.dumps(spec)
+    return body, f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+
+def spec(name):
+    # -> (JSON bytes, ETag)
+    if name not in DATA:
+        raise Http404("Unknown chart.")
+    return _build(name, (SPEC_DIR / f"{name}.json").stat().st_mtime_ns, data_url(name))
+
+
+def spec_response(request, name):
+    body, etag = spec(name)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = datasets.REVALIDATE
+    return response
@@ -0,0 +1,423 @@
+# students/charts.py
+# Server-rendered dashboard charts (charts/sections.png, charts/enrollments.png).
+#
+# Rendering a chart with matplotlib costs 100-300 ms of CPU, but the counts behind
+# it only change when students / enrollments do. So every rendered image is stored
+# under a content address: sha256 of (chart name, input rows, render parameters).
+# Same data + same parameters -> same key -> same bytes, and the key doubles as a
+# strong ETag, so browsers revalidate with If-None-Match and get a 304.
+#
+# Two tiers, both LRU with a size cap:
+#   memory : per-process OrderedDict           (STUDENTS_CHART_CACHE_MEMORY_BYTES)
+#   disk   : one file per key in a directory   (STUDENTS_CHART_CACHE_DIR / _DISK_BYTES)
+#            shared by all workers on the host, survives restarts
+# Concurrent misses for the same key wait for a single render, which runs in a
+# separate process (RenderService below).
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from students import chart_render
+
+MEMORY_BYTES = getattr(settings, "STUDENTS_CHART_CACHE_MEMORY_BYTES", 16 * 2**20)
+DISK_BYTES = getattr(settings, "STUDENTS_CHART_CACHE_DISK_BYTES", 128 * 2**20)
+CACHE_DIR = Path(getattr(settings, "STUDENTS_CHART_CACHE_DIR", settings.BASE_DIR / "data" / "charts"))
+
+RENDER_WORKERS = getattr(settings, "STUDENTS_CHART_WORKERS", 2)
+RENDER_MAX_QUEUE = getattr(settings, "STUDENTS_CHART_MAX_QUEUE", 16)
+RENDER_TIMEOUT = getattr(settings, "STUDENTS_CHART_TIMEOUT", 10)
+
+# "matplotlib" (worker pool) or "pillow" (students/chart_pillow.py, inline);
+# a request can pick one with ?engine=
+ENGINES = ("matplotlib", "pillow")
+DEFAULT_ENGINE = getattr(settings, "STUDENTS_CHART_ENGINE", "matplotlib")
+
+# Output variants. ?format= picks one explicitly, otherwise the Accept header does
+# (highest q, then the most specific match, then this order); ?w= (pixel width) or
+# ?dpi= pick the resolution. Only whitelisted values, so clients cannot ask for a
+# 20000px chart.
+FORMATS = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+DEFAULT_FORMAT = "png"
+DPIS = (72, 100, 150, 200, 300)
+DEFAULT_DPI = 150
+WIDTHS = (320, 480, 640, 800, 960, 1280, 1600, 1920)
+
+# Bump when the drawing code changes, so old images are not served for new code.
+RENDER_VERSION = 3
+
+CACHE_CONTROL = "private, no-cache"   # keep a copy, but revalidate (cheap 304) every time
+
+
+# ---------- Rendering service: a small pool of chart worker processes ----------
+# matplotlib holds the GIL for the whole render (and pyplot is not thread-safe),
+# so drawing inside a request thread stalls every other request in the worker.
+# Renders run in separate processes instead (students/chart_render.py, Figure API).
+# Callers get a bounded wait: too many renders queued, a render slower than
+# RENDER_TIMEOUT, or waiting longer than that for another request's render of the
+# same chart (ChartCache) raises ChartBusy and the view answers 503 with the
+# busy_image() placeholder.
+# `pending` counts renders until they actually finish (a timed-out render keeps its
+# worker busy), so the queue limit holds even when callers give up waiting.
+
+class ChartBusy(Exception):
+    pass
+
+
+class RenderService:
+    def __init__(self, workers, max_queue, timeout):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+
+    def _executor(self):
+        # One pool per process (a forked app-server worker must not reuse its parent's).
+        # "spawn": workers start clean and only import chart_render + matplotlib.
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=chart_render.warm_up,
+            )
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def render(self, chart, rows, engine="matplotlib", fmt="png", dpi=DEFAULT_DPI):
+        if engine == "pillow":
+            # A few ms and no matplotlib: cheaper than the round trip to a worker.
+            from students import chart_pillow
+            return chart_pillow.render(chart, rows, fmt, dpi)
+        if self.workers <= 0:
+            return chart_render.render(chart, rows, fmt, dpi)   # STUDENTS_CHART_WORKERS = 0: inline
+
+        with self._lock:
+            if self.pending >= self.max_queue:
+                raise ChartBusy(f"{self.pending} renders already queued")
+            pool = self._executor()
+            try:
+                future = pool.submit(chart_render.render, chart, rows, fmt, dpi)
+            except BrokenProcessPool:
+                self._discard(pool)
+                raise ChartBusy("chart worker pool restarted")
+            self.pending += 1
+        # outside the lock: runs right here if the render is already done
+        future.add_done_callback(self._finished)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()   # no-op if a worker already started it; it still finishes
+            raise ChartBusy(f"render took longer than {self.timeout}s")
+        except BrokenProcessPool:
+            with self._lock:
+                self._discard(pool)   # a worker died; start a fresh pool next time
+            raise ChartBusy("chart worker died")
+
+    def _finished(self, future):
+        with self._lock:
+            self.pending -= 1
+
+    def _discard(self, pool):
+        # (lock held) shut a broken pool down, so its manager thread and the
+        # surviving workers go away, and have _executor() start a new one
+        if self._pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+
+render_service = RenderService(RENDER_WORKERS, RENDER_MAX_QUEUE, RENDER_TIMEOUT)
+
+
+BUSY_TEXT = "Chart busy - refresh in a moment"
+BUSY_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="480" height="240" viewBox="0 0 480 240">'
+    '<rect x="0.5" y="0.5" width="479" height="239" fill="#f3f4f6" stroke="#9ca3af"/>'
+    f'<text x="240" y="114" fill="#13294B" font-family="sans-serif" font-size="13" '
+    f'text-anchor="middle">{BUSY_TEXT}</text></svg>'
+).encode()
+
+_busy_images = {}
+
+
+def busy_image(fmt=DEFAULT_FORMAT):
+    # Small grey "chart busy" placeholder in the requested format, drawn once per
+    # format with Pillow (no matplotlib).
+    if fmt == "svg":
+        return BUSY_SVG
+    if fmt not in _busy_images:
+        from PIL import Image, ImageDraw
+        img = Image.new("P", (480, 240), "#f3f4f6")
+        draw = ImageDraw.Draw(img)
+        draw.rectangle([0, 0, 479, 239], outline="#9ca3af")
+        draw.text((240, 110), BUSY_TEXT, fill="#13294B", anchor="mm")
+        buf = BytesIO()
+        if fmt == "webp":
+            img.save(buf, format="WEBP", lossless=True)
+        else:
+            img.save(buf, format="PNG", optimize=True)
+        _busy_images[fmt] = buf.getvalue()
+    return _busy_images[fmt]
+
+
+def chart_key(chart, rows, params=None):
+    raw = json.dumps(
+        {"v": RENDER_VERSION, "chart": chart, "rows": rows, "params": params or {}},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ---------- The two cache tiers ----------
+
+class MemoryTier:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.items.get(key)
+            if data is not None:
+                self.items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.items.popitem(last=False)   # least recently used
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.size = 0
+
+
+class DiskTier:
+    # File mtime is the "last used" time: hits touch the file, eviction removes
+    # the oldest files until the directory is under the cap again.
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def path_for(self, key):
+        return self.directory / f"{key}.bin"
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        partial = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+        partial.write_bytes(data)
+        os.replace(partial, path)   # other workers never read a half-written file
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for path in self.directory.glob("*.bin"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue   # removed by another worker
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for path in self.directory.glob("*.bin"):
+            path.unlink(missing_ok=True)
+
+
+class ChartCache:
+    # wait: how long a request waits for another request's render of the same key
+    # before giving up with ChartBusy (each render is itself bounded by RENDER_TIMEOUT).
+    def __init__(self, memory, disk, wait=RENDER_TIMEOUT):
+        self.memory = memory
+        self.disk = disk
+        self.wait = wait
+        self.renders = 0                # how many times we actually drew something
+        self._locks = {}                # key -> lock, for single-flight rendering
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key):
+        data = self.memory.get(key)
+        if data is None:
+            data = self.disk.get(key)
+            if data is not None:
+                self.memory.put(key, data)
+        return data
+
+    def get_or_render(self, key, render):
+        data = self._lookup(key)
+        if data is not None:
+            return data
+
+        lock = self._lock_for(key)
+        if not lock.acquire(timeout=self.wait):
+            raise ChartBusy(f"this chart has been rendering for more than {self.wait}s")
+        try:
+            data = self._lookup(key)   # someone else may have rendered it meanwhile
+            if data is None:
+                data = render()
+                self.renders += 1
+                self.memory.put(key, data)
+                self.disk.put(key, data)
+        finally:
+            lock.release()
+        with self._locks_guard:
+            if self._locks.get(key) is lock and not lock.locked():
+                del self._locks[key]
+        return data
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+
+render_cache = ChartCache(MemoryTier(MEMORY_BYTES), DiskTier(CACHE_DIR, DISK_BYTES))
+
+
+def negotiate_format(accept):
+    # Best of FORMATS for an Accept header ("" / missing -> DEFAULT_FORMAT).
+    if not accept.strip():
+        return DEFAULT_FORMAT
+    ranges = {}
+    for item in accept.split(","):
+        media, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges[media.strip().lower()] = q
+
+    def quality(content_type):
+        # (q, specificity) of the most specific range matching content_type
+        candidates = (content_type, content_type.split("/")[0] + "/*", "*/*")
+        for specificity, media in zip((2, 1, 0), candidates):
+            if media in ranges:
+                return ranges[media], specificity
+        return 0.0, 0
+
+    scored = [(*quality(ct), -rank, fmt) for rank, (fmt, ct) in enumerate(FORMATS.items())]
+    q, _, _, fmt = max(scored)
+    return fmt if q > 0 else DEFAULT_FORMAT
+
+
+def parse_chart_options(request, chart):
+    # -> (engine, fmt, dpi, negotiated); ValueError on anything outside the whitelists.
+    engine = request.GET.get("engine") or DEFAULT_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of: {', '.join(ENGINES)}")
+
+    fmt = request.GET.get("format")
+    negotiated = not fmt
+    if negotiated:
+        fmt = negotiate_format(request.headers.get("Accept", ""))
+    elif fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+
+    width, dpi = request.GET.get("w"), request.GET.get("dpi")
+    if width:
+        if not width.isdigit() or int(width) not in WIDTHS:
+            raise ValueError(f"w must be one of: {', '.join(map(str, WIDTHS))}")
+        dpi = round(int(width) / chart_render.FIGURE_SIZES[chart][0], 3)   # ?w= wins over ?dpi=
+    elif dpi:
+        if not dpi.isdigit() or int(dpi) not in DPIS:
+            raise ValueError(f"dpi must be one of: {', '.join(map(str, DPIS))}")
+        dpi = int(dpi)
+    else:
+        dpi = DEFAULT_DPI
+    return engine, fmt, dpi, negotiated
+
+
+def chart_response(request, chart, rows):
+    # Image response for `chart` drawn from `rows`, or a 304 if the client already has it.
+    # Every (engine, format, dpi) variant is cached under its own key / ETag.
+    try:
+        engine, fmt, dpi, negotiated = parse_chart_options(request, chart)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    key = chart_key(chart, rows, {"engine": engine, "format": fmt, "dpi": dpi})
+    etag = f'"{key}"'
+
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    if etag in if_none_match or "*" in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        try:
+            data = render_cache.get_or_render(
+                key, lambda: render_service.render(chart, rows, engine, fmt, dpi)
+            )
+        except ChartBusy:
+            response = HttpResponse(busy_image(fmt), content_type=FORMATS[fmt], status=503)
+            response["Retry-After"] = "2"
+            response["Cache-Control"] = "no-store"
+            if negotiated:
+                patch_vary_headers(response, ["Accept"])
+            return response
+        response = HttpResponse(data, content_type=FORMATS[fmt])
+    response["ETag"] = etag
+    response["Cache-Control"] = CACHE_CONTROL
+    if negotiated:
+        patch_vary_headers(response, ["Accept"])
+    return response
@@ -0,0 +1,81 @@
+# students/conditional.py
+# Conditional GET for the data endpoints (JSON APIs, exports), driven by the
+# per-table DataVersion counters (students/models.py).
+#
+#   @conditional_on("student", "section")
+#   def view(request): ...
+#
+# Before the view runs, one primary-key read of DataVersion gives
+#   ETag:          W/"g1-section.5d1e03aa.40-student.1f3a9c0e.12"   (weak: gzip /
+#                  identity bodies share it; the epochs keep a reset counter from
+#                  matching an ETag handed out before the reset)
+# and a request whose If-None-Match still matches gets a 304 straight away,
+# without running the view's queries. There is no Last-Modified: it only has
+# whole seconds, so a write in the same second as a response would still be
+# answered 304 to If-Modified-Since, while the counters change on every write.
+# Polling dashboards mostly hit this path. Works on sync and async views; `tables`
+# may also be a function of the view arguments (e.g. the export table in the URL).
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from students.models import DataVersion
+
+# Bump when the body of a response changes for the same data (new fields, new
+# encoding), so clients don't keep an old body forever.
+ETAG_GENERATION = 1
+
+
+def etag_for(versions):
+    # {table: DataVersion} -> ETag
+    if not versions:
+        return None
+    key = "-".join(versions[t].tag for t in sorted(versions))
+    return f'W/"g{ETAG_GENERATION}-{key}"'
+
+
+def _check(request, versions):
+    if request.method not in ("GET", "HEAD"):
+        return None, None
+    etag = etag_for(versions)
+    return get_conditional_response(request, etag=etag), etag
+
+
+def _finish(response, etag):
+    if etag is None or response.status_code not in (200, 304):
+        return response
+    response.headers.setdefault("ETag", etag)
+    # cacheable, but revalidated on every use
+    if not response.has_header("Cache-Control"):
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_on(tables):
+    # tables: a tuple of DataVersion table names, or f(request, *args, **kwargs) -> tuple
+    tables_for = tables if callable(tables) else (lambda request, *args, **kwargs: tables)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                names = tables_for(request, *args, **kwargs)
+                versions = await DataVersion.acurrent(*names) if names else {}
+                response, etag = _check(request, versions)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(response, etag)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                names = tables_for(request, *args, **kwargs)
+                versions = DataVersion.current(*names) if names else {}
+                response, etag = _check(request, versions)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return _finish(response, etag)
+        return inner
+
+    return decorator
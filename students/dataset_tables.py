@@ -0,0 +1,185 @@
+# students/dataset_tables.py
+# Typed, indexed copies of the Vega-Lite CSV files (the DatasetFile / DataSeries /
+# SeriesPoint / CountryValue / ProfilePoint models), so consumers query a table
+# instead of re-parsing text:
+#
+#   ingest(name, force=False)            -> IngestResult (load_datasets command)
+#   points(name, series=(), start=None, end=None) -> values_list() rows (datasets API)
+#
+# Ingestion is incremental: a file whose sha256 matches the DatasetFile row is
+# skipped; a changed file replaces its dataset's series and values in one
+# transaction. Headers are read with utf-8-sig, so the BOM some exports carry
+# ("﻿dayOfWeek") never reaches a column name. Every load bumps the
+# "datasetfile" DataVersion, which the datasets API uses for its ETag.
+#
+# How each file maps onto the tables is declared in LAYOUTS.
+
+import csv
+import datetime
+import hashlib
+import io
+import time
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from students import datasets
+from students.models import (
+    Country, CountryValue, DataSeries, DatasetFile, DataVersion, ProfilePoint, SeriesPoint,
+)
+
+BATCH_SIZE = 2000
+DATA_VERSION_TABLE = DatasetFile._meta.model_name
+
+
+def _number(text):
+    return float(text) if text.strip() else None
+
+
+class TimeSeries:
+    # One row per date. `long` = (series column, value column) for long-format
+    # files; every other column (except the date) is a series of its own.
+    kind = "dated"
+    model = SeriesPoint
+    key_field = "day"
+
+    def __init__(self, date_column, long=None):
+        self.date_column = date_column
+        self.long = long
+
+    def key(self, text):
+        return datetime.date.fromisoformat(text)
+
+    def values(self, header, rows):
+        # -> (series name, key, value), first one wins for a repeated (series, key)
+        date = header.index(self.date_column)
+        skip = {self.date_column, *(self.long or ())}
+        wide = [(i, column) for i, column in enumerate(header) if column not in skip]
+        if self.long:
+            name, value = header.index(self.long[0]), header.index(self.long[1])
+        for row in rows:
+            key = self.key(row[date])
+            if self.long:
+                yield row[name], key, _number(row[value])
+            for i, column in wide:
+                yield column, key, _number(row[i])
+
+
+class ByCountry(TimeSeries):
+    kind = "country"
+    model = CountryValue
+    key_field = "country"
+
+    def __init__(self, country_column):
+        super().__init__(country_column)
+
+    def key(self, text):
+        return text.strip()
+
+
+class Profile(TimeSeries):
+    kind = "profile"
+    model = ProfilePoint
+    key_field = "slot"
+
+    def __init__(self, slot_column, parse):
+        super().__init__(slot_column)
+        self.key = parse
+
+
+LAYOUTS = {
+    "vlSpec1": Profile("dayOfWeek", int),                                  # 1-7
+    "vlSpec2": Profile("hourOfDay", lambda text: int(text.split(":")[0])),  # "13:00:00" -> 13
+    "vlSpec3": ByCountry("countries"),
+    "vlSpec4": TimeSeries("days", long=("variable", "value")),
+    "vlSpec5": TimeSeries("days"),
+    "vlSpec6": TimeSeries("Date", long=("Brand", "Value")),    # + the per-day volume columns
+}
+
+
+@dataclass
+class IngestResult:
+    name: str
+    loaded: bool          # False: unchanged since the last load
+    rows: int = 0
+    series: int = 0
+    values: int = 0
+    seconds: float = 0.0
+
+
+def _countries(names):
+    # name -> country_id, creating the missing ones
+    known = dict(Country.objects.filter(name__in=names).values_list("name", "country_id"))
+    missing = [Country(name=n) for n in sorted(set(names) - set(known))]
+    if missing:
+        Country.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+        known = dict(Country.objects.filter(name__in=names).values_list("name", "country_id"))
+    return known
+
+
+def ingest(name, force=False):
+    began = time.perf_counter()
+    layout = LAYOUTS[name]
+    body = datasets.source(name).body
+    digest = hashlib.sha256(body).hexdigest()
+    if not force and DatasetFile.objects.filter(name=name, sha256=digest).exists():
+        return IngestResult(name, loaded=False)
+
+    reader = csv.reader(io.StringIO(body.decode("utf-8-sig")))
+    header = [column.strip() for column in next(reader)]
+    rows = [row for row in reader if row]
+    values = {}
+    for series, key, value in layout.values(header, rows):
+        values.setdefault((series, key), value)
+    names = list(dict.fromkeys(series for series, _ in values))
+
+    with transaction.atomic():
+        dataset, _ = DatasetFile.objects.update_or_create(
+            name=name, defaults={"sha256": digest, "n_rows": len(rows), "loaded_at": timezone.now()},
+        )
+        DataSeries.objects.filter(dataset=dataset).delete()    # cascades to the old values
+        DataSeries.objects.bulk_create([DataSeries(dataset=dataset, name=n) for n in names])
+        series_ids = dict(DataSeries.objects.filter(dataset=dataset).values_list("name", "series_id"))
+
+        if layout.kind == "country":
+            country_ids = _countries([key for _, key in values])
+            values = {(series, country_ids[key]): value for (series, key), value in values.items()}
+            key_field = "country_id"
+        else:
+            key_field = layout.key_field
+        layout.model.objects.bulk_create(
+            (layout.model(series_id=series_ids[series], value=value, **{key_field: key})
+             for (series, key), value in values.items()),
+            batch_size=BATCH_SIZE,
+        )
+        DataVersion.bump(DATA_VERSION_TABLE)
+
+    return IngestResult(name, True, len(rows), len(names), len(values), time.perf_counter() - began)
+
+
+# ---------- queries ----------
+
+def points(name, series=(), start=None, end=None):
+    # (series name, day / country / slot, value) rows, ordered by series then key.
+    # Filters on series_id (looked up first in the small DataSeries table) so the
+    # (series, day) unique index serves both the range and the order.
+    layout = LAYOUTS[name]
+    wanted = DataSeries.objects.filter(dataset_id=name)
+    if series:
+        wanted = wanted.filter(name__in=series)
+    ids = dict(wanted.values_list("series_id", "name"))
+    unknown = set(series) - set(ids.values())
+    if unknown:
+        raise ValueError(f"Unknown series: {', '.join(sorted(unknown))}.")
+    if (start or end) and layout.kind != "dated":
+        raise ValueError(f"{name} is not a time series; from / to do not apply.")
+
+    qs = layout.model.objects.filter(series_id__in=ids)
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    key = "country__name" if layout.kind == "country" else layout.key_field
+    rows = qs.order_by("series_id", layout.key_field).values_list("series_id", key, "value")
+    return [(ids[series_id], key, value) for series_id, key, value in rows]
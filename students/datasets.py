@@ -0,0 +1,283 @@
+# students/datasets.py
+# The CSV files behind the Vega-Lite dashboard (data/vega-lite-test_data/), served
+# by the datasets/ views instead of being fetched from raw.githubusercontent.com.
+#
+#   dataset_url(name, **transform)   -> /datasets/<name>.<digest>.csv[?transform]
+#   dataset_response(request, name, digest=None) -> the HttpResponse for those URLs
+#
+# <digest> is the start of the file's sha256, so a changed file gets a new URL and
+# hashed URLs can be cached by the browser for good ("immutable"). The plain
+# /datasets/<name>.csv URL always serves the current file and is revalidated.
+#
+# Optional server-side transforms (query string), so the browser does not have
+# to download and parse rows it throws away:
+#   ?oneof=variable:volume,positive   keep rows whose `variable` is one of these
+#   ?columns=days,value               keep these columns (in this order)
+#   ?groupby=days&agg=sum:value       one row per group; ops: sum mean median min max count
+#
+# Every (file version, transform) is encoded once -- identity, gzip and, when the
+# brotli module is installed, br -- and kept in a small LRU, so a request only
+# picks the variant the client accepts (Accept-Encoding) and sends it.
+#
+# Only the published variants -- the plain files and the transforms the chart
+# specs link to (chart_specs.DATA) -- get the slow, small BEST encodings, and those
+# are compressed once into PRECOMPRESSED_DIR (`manage.py load_datasets` does it on
+# deploy). Any other query string is encoded in-request, so it gets the cheap FAST
+# levels: a client inventing transforms costs milliseconds, not a second of CPU each.
+
+import csv
+import gzip
+import hashlib
+import io
+import os
+import statistics
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DATASET_DIR = Path(getattr(settings, "STUDENTS_DATASET_DIR", settings.BASE_DIR / "data" / "vega-lite-test_data"))
+CACHE_SIZE = getattr(settings, "STUDENTS_DATASET_CACHE_SIZE", 64)
+PRECOMPRESSED_DIR = Path(getattr(settings, "STUDENTS_DATASET_PRECOMPRESSED_DIR",
+                                 settings.BASE_DIR / "data" / "precompressed"))
+
+DIGEST_LENGTH = 12
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+
+AGGREGATES = {
+    "sum": sum,
+    "mean": statistics.fmean,
+    "median": statistics.median,
+    "min": min,
+    "max": max,
+    "count": len,
+}
+TRANSFORM_KEYS = ("oneof", "columns", "groupby", "agg")
+
+# (gzip level, brotli quality)
+BEST = (9, 11)   # published variants, compressed once
+FAST = (6, 5)    # everything else, compressed in-request
+SUFFIXES = {"gzip": "gz", "br": "br"}
+
+
+class Source:
+    def __init__(self, name, body):
+        self.name = name
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:DIGEST_LENGTH]
+
+
+class Variant:
+    # One transformed dataset in every encoding worth sending.
+    # best: a published variant (BEST levels, kept on disk); otherwise FAST levels.
+    def __init__(self, body, best=False):
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.encodings = {"identity": body}
+        compressed = _precompressed(body, self.etag) if best else _compress(body, *FAST)
+        for coding, data in compressed.items():
+            if len(data) < len(body):
+                self.encodings[coding] = data
+
+
+def _compress(body, gzip_level, brotli_quality):
+    compressed = {"gzip": gzip.compress(body, gzip_level, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(body, quality=brotli_quality)
+    return compressed
+
+
+def _precompressed(body, etag):
+    # The BEST encodings of `body`, read from PRECOMPRESSED_DIR (<etag>.gz, <etag>.br)
+    # or compressed now and written there for the next process.
+    paths = {coding: PRECOMPRESSED_DIR / f"{etag}.{SUFFIXES[coding]}"
+             for coding in SUFFIXES if coding != "br" or brotli is not None}
+    try:
+        return {coding: path.read_bytes() for coding, path in paths.items()}
+    except FileNotFoundError:
+        pass
+    compressed = _compress(body, *BEST)
+    PRECOMPRESSED_DIR.mkdir(parents=True, exist_ok=True)
+    for coding, path in paths.items():
+        part = path.with_name(f"{path.name}.{os.getpid()}.part")
+        part.write_bytes(compressed[coding])
+        os.replace(part, path)   # readers never see half a file
+    return compressed
+
+
+# ---------- sources ----------
+
+def names():
+    return sorted(p.stem for p in DATASET_DIR.glob("*.csv"))
+
+
+@lru_cache(maxsize=32)
+def _read(path, mtime_ns, size):
+    return Source(path.stem, path.read_bytes())
+
+
+def source(name, digest=None):
+    # digest: the one in a hashed URL; 404 once the file has changed since.
+    path = DATASET_DIR / f"{name}.csv"
+    if "/" in name or not path.is_file():
+        raise Http404("Unknown dataset.")
+    stat = path.stat()
+    src = _read(path, stat.st_mtime_ns, stat.st_size)
+    if digest is not None and digest != src.digest:
+        raise Http404("This version of the dataset is gone; reload the page.")
+    return src
+
+
+# ---------- transforms ----------
+
+def parse_transform(params):
+    # QueryDict -> canonical tuple of (key, value) pairs (the cache key). ValueError on bad input.
+    transform = tuple((key, params[key]) for key in TRANSFORM_KEYS if params.get(key))
+    found = dict(transform)
+    if "oneof" in found and ":" not in found["oneof"]:
+        raise ValueError("oneof must look like column:value1,value2")
+    if ("groupby" in found) != ("agg" in found):
+        raise ValueError("groupby and agg go together.")
+    if "agg" in found:
+        for spec in found["agg"].split(","):
+            op, _, column = spec.partition(":")
+            if op not in AGGREGATES or (not column and op != "count"):
+                raise ValueError(f"agg must be op:column with op one of {', '.join(AGGREGATES)}.")
+    return transform
+
+
+def _number(text):
+    return float(text) if text not in ("", None) else None
+
+
+def _format(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _apply(body, transform):
+    found = dict(transform)
+    reader = csv.reader(io.StringIO(body.decode("utf-8-sig")))
+    header = next(reader)
+    rows = list(reader)
+
+    def index(column):
+        try:
+            return header.index(column)
+        except ValueError:
+            raise ValueError(f"Unknown column {column!r}.")
+
+    if "oneof" in found:
+        column, _, values = found["oneof"].partition(":")
+        i, wanted = index(column), set(values.split(","))
+        rows = [row for row in rows if row[i] in wanted]
+
+    if "groupby" in found:
+        keys = [index(c) for c in found["groupby"].split(",")]
+        specs = [spec.partition(":")[::2] for spec in found["agg"].split(",")]
+        value_columns = [(op, index(column) if column else None) for op, column in specs]
+        groups = OrderedDict()
+        for row in rows:
+            groups.setdefault(tuple(row[k] for k in keys), []).append(row)
+        header = [header[k] for k in keys] + [f"{op}_{header[i]}" if i is not None else op
+                                              for op, i in value_columns]
+        rows = []
+        for key, members in groups.items():
+            values = []
+            for op, i in value_columns:
+                column = members if i is None else [v for v in (_number(m[i]) for m in members) if v is not None]
+                values.append(_format(AGGREGATES[op](column)) if column else "")
+            rows.append(list(key) + values)
+
+    if "columns" in found:
+        keep = [index(c) for c in found["columns"].split(",")]
+        header = [header[i] for i in keep]
+        rows = [[row[i] for i in keep] for row in rows]
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return out.getvalue().encode("utf-8")
+
+
+def published(name):
+    # The transforms of `name` that pages link to: the plain file and the chart spec's.
+    from students import chart_specs   # chart_specs builds its URLs with this module
+
+    transforms = {()}
+    url_for, params = chart_specs.DATA.get(name, (None, {}))
+    if url_for is dataset_url:
+        transforms.add(parse_transform(params))
+    return transforms
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _variant(src, transform):
+    body = _apply(src.body, transform) if transform else src.body
+    return Variant(body, best=transform in published(src.name))
+
+
+def load(name, transform=()):
+    return _variant(source(name), transform)
+
+
+def precompress(name):
+    # Build (and so write to PRECOMPRESSED_DIR) the published variants of `name`.
+    src = source(name)
+    return [_variant(src, transform) for transform in published(name)]
+
+
+# ---------- URLs and responses ----------
+
+def dataset_url(name, **transform):
+    url = reverse("dataset-hashed", kwargs={"name": name, "digest": source(name).digest})
+    params = [(key, transform[key]) for key in TRANSFORM_KEYS if transform.get(key)]
+    return f"{url}?{urlencode(params)}" if params else url
+
+
+def _accepted_codings(request):
+    header = request.headers.get("Accept-Encoding", "").lower()
+    return {part.split(";")[0].strip() for part in header.split(",")}
+
+
+def dataset_response(request, name, digest=None):
+    src = source(name, digest)
+    try:
+        variant = _variant(src, parse_transform(request.GET))
+    except ValueError as e:
+        return bad_request(e)
+    return send(request, variant, immutable=digest is not None)
+
+
+def bad_request(error):
+    return HttpResponse(str(error), status=400, content_type="text/plain; charset=utf-8")
+
+
+def send(request, variant, immutable):
+    # The encoding of `variant` the client accepts, as a (possibly 304) CSV response.
+    accepted = _accepted_codings(request)
+    coding = next((c for c in ("br", "gzip") if c in accepted and c in variant.encodings), "identity")
+    etag = f'"{variant.etag}-{coding}"' if coding != "identity" else f'"{variant.etag}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(variant.encodings[coding], content_type="text/csv; charset=utf-8")
+        if coding != "identity":
+            response["Content-Encoding"] = coding
+    response["ETag"] = etag
+    response["Cache-Control"] = IMMUTABLE if immutable else REVALIDATE
+    if len(variant.encodings) > 1:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    return response
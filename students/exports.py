@@ -0,0 +1,367 @@
+# students/exports.py
+# Building blocks for the download/export views (students/views.py).
+#
+# Exports are streamed: rows come out of the database in chunks, get encoded a
+# chunk at a time and are handed to StreamingHttpResponse, so peak memory stays
+# the same whether the table has 10k or 5M rows.
+#   iter_rows(qs)            -> tuples from a values_list() queryset, chunk by chunk
+#                               (true server-side cursor on MySQL)
+#   csv_chunks(header, rows) -> encoded CSV text, ~chunk_size rows per piece
+#   json_envelope_chunks(...) / ndjson_chunks(...) -> the same for JSON / NDJSON
+#   columnar_chunks(table, fmt) -> typed Parquet / Arrow IPC, one record batch per chunk
+#   streaming_response(...)  -> StreamingHttpResponse, gzip-compressed if the client accepts it
+#   ranged_file_response(...) -> FileResponse for a finished file, with HTTP Range support
+
+import csv
+import re
+import zlib
+from io import StringIO
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+from students import renderers
+from students.models import Student, Section, Enrollment
+
+EXPORT_CHUNK_SIZE = getattr(settings, "STUDENTS_EXPORT_CHUNK_SIZE", 2000)
+EXPORT_GZIP = getattr(settings, "STUDENTS_EXPORT_GZIP", True)
+COLUMNAR_BATCH_ROWS = getattr(settings, "STUDENTS_EXPORT_COLUMNAR_BATCH_ROWS", 50_000)
+
+STUDENT_EXPORT_COLUMNS = ["student_id", "first_name", "last_name", "email", "section_code"]
+STUDENT_EXPORT_FIELDS = ["student_id", "first_name", "last_name", "email", "section__code"]
+
+
+def student_export_rows():
+    return (
+        Student.objects
+        .values_list(*STUDENT_EXPORT_FIELDS)
+        .order_by("last_name", "first_name")
+    )
+
+
+def iter_rows(values_list_qs, chunk_size=EXPORT_CHUNK_SIZE):
+    conn = connections[values_list_qs.db]
+    if conn.vendor != "mysql":
+        # SQLite / PostgreSQL: Django already fetches chunk by chunk.
+        yield from values_list_qs.iterator(chunk_size=chunk_size)
+        return
+
+    # MySQL drivers buffer the whole result set on the client unless we ask for an
+    # unbuffered (server-side) cursor, which .iterator() does not do.
+    import MySQLdb.cursors   # PyMySQL, installed as MySQLdb in illinois/__init__.py
+
+    compiler = values_list_qs.query.get_compiler(using=values_list_qs.db)
+    sql, params = compiler.as_sql()
+    # Same value conversions Django would apply (e.g. 0/1 -> bool)
+    converters = compiler.get_converters([col for col, _, _ in compiler.select])
+
+    conn.ensure_connection()
+    cursor = conn.connection.cursor(MySQLdb.cursors.SSCursor)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(chunk_size)
+            if not batch:
+                break
+            if converters:
+                batch = compiler.apply_converters(batch, converters)
+            yield from (tuple(row) for row in batch)
+    finally:
+        cursor.close()
+
+
+def csv_chunks(header, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    pending = 1
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if pending:
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _batched(pieces, chunk_size):
+    # pieces are bytes; joined into chunks of ~chunk_size pieces
+    batch = []
+    for piece in pieces:
+        batch.append(piece)
+        if len(batch) >= chunk_size:
+            yield b"".join(batch)
+            batch = []
+    if batch:
+        yield b"".join(batch)
+
+
+def json_envelope_chunks(values_list_qs, field_names, generated_at, chunk_size=EXPORT_CHUNK_SIZE):
+    # Emits, piece by piece, the same document as
+    #   json.dumps({"generated_at": ..., "record_count": N, "students": [...]}, indent=2)
+    # (values encoded by students/renderers.py, so non-ASCII text is UTF-8, not \u escapes).
+    # Count and rows are read in one transaction so they agree.
+    dumps = renderers.renderer.dumps
+
+    def pieces():
+        with transaction.atomic(using=values_list_qs.db):
+            record_count = values_list_qs.order_by().count()
+            yield (
+                b"{\n"
+                b'  "generated_at": ' + dumps(generated_at) + b",\n"
+                b'  "record_count": ' + dumps(record_count) + b",\n"
+                b'  "students": ['
+            )
+            # json.dumps(indent=...) drops to the pure-Python encoder, so lay out
+            # each object by hand and only encode the scalar values.
+            prefixes = [b"      " + dumps(name) + b": " for name in field_names]
+            separator = b"\n"
+            for row in iter_rows(values_list_qs, chunk_size):
+                members = b",\n".join(p + dumps(v) for p, v in zip(prefixes, row))
+                yield separator + b"    {\n" + members + b"\n    }"
+                separator = b",\n"
+            # indent=2 writes an empty list as "[]"
+            yield b"]\n}" if separator == b"\n" else b"\n  ]\n}"
+
+    return _batched(pieces(), chunk_size)
+
+
+def ndjson_chunks(values_list_qs, field_names, chunk_size=EXPORT_CHUNK_SIZE):
+    # One JSON object per line (application/x-ndjson).
+    dumps = renderers.renderer.dumps
+    lines = (
+        dumps(dict(zip(field_names, row))) + b"\n"
+        for row in iter_rows(values_list_qs, chunk_size)
+    )
+    return _batched(lines, chunk_size)
+
+
+def gzip_chunks(chunks, level=6):
+    # wbits=31 -> gzip container (header + CRC), so browsers can decode it.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ---------- Columnar (Parquet / Arrow) exports ----------
+# pyarrow is imported lazily so the rest of the site works without it.
+
+# name -> (queryset of values_list rows, [(column, arrow type name), ...])
+COLUMNAR_TABLES = {
+    "students": (
+        lambda: Student.objects.values_list(
+            "student_id", "first_name", "last_name", "nickname", "email", "section_id", "section__code",
+        ).order_by("last_name", "first_name"),
+        [
+            ("student_id", "int64"), ("first_name", "string"), ("last_name", "string"),
+            ("nickname", "string"), ("email", "string"), ("section_id", "int64"),
+            ("section_code", "string"),
+        ],
+    ),
+    "sections": (
+        lambda: Section.objects.values_list(
+            "section_id", "code", "name", "term",
+            "n_students", "n_enrollments", "n_active_enrollments",
+        ).order_by("code"),
+        [
+            ("section_id", "int64"), ("code", "string"), ("name", "string"), ("term", "string"),
+            ("n_students", "int64"), ("n_enrollments", "int64"), ("n_active_enrollments", "int64"),
+        ],
+    ),
+    "enrollments": (
+        # order by pk only: the model's default ordering would join Student
+        lambda: Enrollment.objects.values_list(
+            "enroll_id", "student_id", "section_id", "enrolled_on", "is_active",
+        ).order_by("enroll_id"),
+        [
+            ("enroll_id", "int64"), ("student_id", "int64"), ("section_id", "int64"),
+            ("enrolled_on", "date32"), ("is_active", "bool_"),
+        ],
+    ),
+}
+
+COLUMNAR_FORMATS = {
+    # fmt -> content type
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+class _ChunkSink:
+    # Write-only file object for pyarrow writers: collects bytes until drained.
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def record_batches(table, batch_rows=COLUMNAR_BATCH_ROWS):
+    import pyarrow as pa
+
+    build_qs, columns = COLUMNAR_TABLES[table]
+    schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in columns])
+
+    def to_batch(rows):
+        values = list(zip(*rows)) if rows else [[] for _ in columns]
+        arrays = [pa.array(col, type=field.type) for col, field in zip(values, schema)]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def batches():
+        rows = []
+        for row in iter_rows(build_qs()):
+            rows.append(row)
+            if len(rows) >= batch_rows:
+                yield to_batch(rows)
+                rows = []
+        if rows:
+            yield to_batch(rows)
+
+    return schema, batches()
+
+
+def columnar_chunks(table, fmt, batch_rows=COLUMNAR_BATCH_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema, batches = record_batches(table, batch_rows)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        # one row group per batch, so the writer never holds more than one batch
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+
+    for batch in batches:
+        writer.write_batch(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def accepts_gzip(request):
+    return EXPORT_GZIP and "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+
+def streaming_response(request, chunks, content_type, filename, compressible=True):
+    # compressible=False for formats that are already compressed (Parquet)
+    compress = compressible and accepts_gzip(request)
+    response = StreamingHttpResponse(
+        gzip_chunks(chunks) if compress else chunks,
+        content_type=content_type,
+    )
+    if compress:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ---------- Serving finished files (background export artifacts) ----------
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header, size):
+    # Single "bytes=start-end" / "bytes=start-" / "bytes=-suffix" range -> (start, end) inclusive.
+    # Returns None to mean "send the whole file" (no/unsupported header),
+    # raises ValueError when the range cannot be satisfied.
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1   # last N bytes
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+class _FileSlice:
+    # Readable view of bytes [start, start + length) of an open file.
+    def __init__(self, fh, start, length):
+        fh.seek(start)
+        self.fh = fh
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fh.close()
+
+
+def ranged_file_response(request, path, content_type, filename, etag=None):
+    size = path.stat().st_size
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    # If-Range: only resume when the client still has the same file
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    fh = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type, as_attachment=True, filename=filename)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            _FileSlice(fh, start, length),
+            status=206,
+            content_type=content_type,
+            as_attachment=True,
+            filename=filename,
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    if etag:
+        response["ETag"] = etag
+    return response
@@ -0,0 +1,182 @@
+# students/jobs.py
+# Background export jobs.
+#
+# Request threads only record an ExportJob row (or hand back an existing one);
+# `python manage.py run_export_worker` does the actual work and writes the file
+# to STUDENTS_EXPORT_DIR. Artifacts are named after the DataVersion of the tables
+# they were built from (counters and epochs, so a reset counter never picks up an
+# old file), so as long as the data has not changed, every request for the same
+# export reuses the same file. A replaced artifact is kept for
+# STUDENTS_EXPORT_ARTIFACT_GRACE seconds, so downloads already handed its URL finish.
+
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+from students import exports
+from students.models import DataVersion, ExportJob
+
+EXPORT_DIR = Path(getattr(settings, "STUDENTS_EXPORT_DIR", settings.BASE_DIR / "data" / "exports"))
+ARTIFACT_GRACE = getattr(settings, "STUDENTS_EXPORT_ARTIFACT_GRACE", 3600)   # seconds
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    **exports.COLUMNAR_FORMATS,
+}
+
+# (table, format) -> function returning the byte chunks of the file
+EXPORT_KINDS = {
+    ("students", "csv"): lambda: exports.csv_chunks(
+        exports.STUDENT_EXPORT_COLUMNS, exports.iter_rows(exports.student_export_rows())
+    ),
+    ("students", "json"): lambda: exports.json_envelope_chunks(
+        exports.student_export_rows(),
+        exports.STUDENT_EXPORT_FIELDS,
+        generated_at=timezone.localtime().isoformat(timespec="seconds"),
+    ),
+    ("students", "ndjson"): lambda: exports.ndjson_chunks(
+        exports.student_export_rows(), exports.STUDENT_EXPORT_FIELDS
+    ),
+    **{
+        (table, fmt): (lambda table=table, fmt=fmt: exports.columnar_chunks(table, fmt))
+        for table in exports.COLUMNAR_TABLES
+        for fmt in exports.COLUMNAR_FORMATS
+    },
+}
+
+# Which tables' DataVersions an export depends on
+EXPORT_SOURCES = {
+    "students": ("student", "section"),      # includes section__code
+    "sections": ("section",),                # counters are bumped through Section updates
+    "enrollments": ("enrollment",),
+}
+
+
+def data_version_for(table):
+    return DataVersion.key(*EXPORT_SOURCES[table])
+
+
+def artifact_path(job):
+    return EXPORT_DIR / job.artifact
+
+
+def request_export(table, file_format, user=None):
+    # Cheap on purpose (a few indexed reads / one insert): called from request threads.
+    kind = ExportJob.objects.filter(table=table, file_format=file_format)
+
+    done = kind.filter(status=ExportJob.DONE, data_version=data_version_for(table)).first()
+    if done and artifact_path(done).exists():
+        return done
+
+    pending = kind.filter(status__in=[ExportJob.QUEUED, ExportJob.RUNNING]).first()
+    if pending:
+        return pending
+
+    return ExportJob.objects.create(
+        table=table,
+        file_format=file_format,
+        requested_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def claim_next_job():
+    # The conditional UPDATE is the lock: only one worker can move a job out of "queued".
+    queued = ExportJob.objects.filter(status=ExportJob.QUEUED).order_by("created_at")
+    for job in queued[:10]:
+        claimed = ExportJob.objects.filter(pk=job.pk, status=ExportJob.QUEUED).update(
+            status=ExportJob.RUNNING, started_at=timezone.now(),
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def requeue_stale_jobs(older_than):
+    # Jobs left "running" by a worker that died.
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return ExportJob.objects.filter(status=ExportJob.RUNNING, started_at__lt=cutoff).update(
+        status=ExportJob.QUEUED, started_at=None,
+    )
+
+
+def run_job(job):
+    try:
+        # Read the version BEFORE the data: if rows change while we write, the file
+        # is labelled with the older version and simply gets rebuilt next time.
+        version = data_version_for(job.table)
+        name = f"{job.table}-{version}.{job.file_format}"
+        path = EXPORT_DIR / name
+
+        if not path.exists():
+            EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(f"{name}.{job.pk.hex}.part")
+            try:
+                with open(partial, "wb") as fh:
+                    for chunk in EXPORT_KINDS[(job.table, job.file_format)]():
+                        fh.write(chunk)
+                os.replace(partial, path)   # readers never see a half-written file
+            except BaseException:
+                partial.unlink(missing_ok=True)
+                raise
+
+        job.status = ExportJob.DONE
+        job.data_version = version
+        job.artifact = name
+        job.size_bytes = path.stat().st_size
+    except Exception as e:
+        job.status = ExportJob.FAILED
+        job.error = f"{type(e).__name__}: {e}"
+    job.finished_at = timezone.now()
+    job.save()
+
+    if job.status == ExportJob.DONE:
+        _remove_superseded_artifacts(job)
+    return job
+
+
+def _remove_superseded_artifacts(job):
+    # An artifact is deleted once the one that replaced it is ARTIFACT_GRACE seconds old.
+    done = (
+        ExportJob.objects
+        .filter(table=job.table, file_format=job.file_format, status=ExportJob.DONE)
+        .exclude(artifact="")
+        .order_by("finished_at")
+        .values_list("artifact", "finished_at")
+    )
+    built = {}   # artifact -> when it was last built, oldest first
+    for name, finished_at in done:
+        built.pop(name, None)
+        built[name] = finished_at
+    names = list(built)
+    cutoff = timezone.now() - timedelta(seconds=ARTIFACT_GRACE)
+    for name, replacement in zip(names, names[1:]):
+        if name != job.artifact and built[replacement] < cutoff:
+            (EXPORT_DIR / name).unlink(missing_ok=True)
+
+
+def job_payload(job, request):
+    payload = {
+        "id": str(job.pk),
+        "table": job.table,
+        "format": job.file_format,
+        "status": job.status,
+        "data_version": job.data_version,
+        "size_bytes": job.size_bytes,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "status_url": request.build_absolute_uri(reverse("export-job-status", args=[job.pk])),
+        "download_url": None,
+    }
+    if job.status == ExportJob.DONE:
+        payload["download_url"] = request.build_absolute_uri(
+            reverse("export-job-download", args=[job.pk])
+        )
+    return payload
@@ -0,0 +1,118 @@
+# students/management/commands/_loadtest.py
+# Pieces shared by the bench_* load tests (the leading underscore keeps Django
+# from listing this module as a command).
+#   PooledWSGIServer : WSGI server with a fixed number of worker threads
+#   fill_database    : sections / students / enrollments for a throwaway test DB
+#   http_load        : closed-loop HTTP load generator (asyncio, stdlib only, so it
+#                      can run in a separate process without Django set up)
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    # Each connection is handled by one of `workers` threads; extra connections
+    # wait in the listen queue, exactly like a threaded app server
+    # (gunicorn --threads N).
+    request_queue_size = 512
+
+    def __init__(self, address, workers):
+        super().__init__(address, QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def handle_error(self, request, client_address):
+        pass   # timed-out clients hang up; they are counted as failures instead
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def fill_database(n_sections, per_section):
+    from students.models import Enrollment, Section, Student
+    sections = Section.objects.bulk_create(
+        Section(code=f"BENCH{i:03d}", name=f"Bench {i}", term="FA25") for i in range(n_sections)
+    )
+    for section in sections:
+        students = Student.objects.bulk_create(
+            Student(first_name=f"F{j}", last_name=f"L{j}", email=f"s{section.pk}-{j}@example.com",
+                    section=section)
+            for j in range(per_section)
+        )
+        Enrollment.objects.bulk_create(
+            Enrollment(student=s, section=section, is_active=j % 3 != 0)
+            for j, s in enumerate(students)
+        )
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[int(fraction * (len(sorted_values) - 1))]
+
+
+async def _get(host, port, request_bytes, timeout):
+    # One request on a fresh connection (Connection: close) -> status code.
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(request_bytes)
+        response = await asyncio.wait_for(reader.read(), timeout)   # until the server closes
+    finally:
+        writer.close()
+    return int(response.split(b" ", 2)[1])
+
+
+async def _load(host, port, path, headers, connections, duration, timeout):
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    request_bytes = ("\r\n".join(lines) + "\r\n\r\n").encode()
+    latencies, errors = [], 0
+    stop_at = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            began = time.perf_counter()
+            try:
+                ok = await _get(host, port, request_bytes, timeout) == 200
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - began)
+            else:
+                errors += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(connections)])
+    return latencies, errors, time.perf_counter() - began
+
+
+def http_load(host, port, path, headers=None, connections=200, duration=5.0, timeout=10.0):
+    # `connections` clients each send a request, wait for the answer, repeat,
+    # until `duration` seconds have passed.
+    # -> {"ok", "errors", "rps", "p50_ms", "p99_ms"}
+    latencies, errors, wall = asyncio.run(
+        _load(host, port, path, headers or {}, connections, duration, timeout)
+    )
+    latencies.sort()
+    return {
+        "ok": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / wall,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
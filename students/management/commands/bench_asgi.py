@@ -0,0 +1,184 @@
+# students/management/commands/bench_asgi.py
+# Run:  python manage.py bench_asgi
+#       python manage.py bench_asgi --connections 200 --duration 5 --threads 32
+#
+# The I/O-bound JSON endpoints under the two deployment models, on the same
+# throwaway test database:
+#   wsgi : the sync views on a WSGI server with --threads worker threads
+#          (like gunicorn --threads N)
+#   asgi : the async views (api/async/...) on uvicorn, one event loop
+# The load generator runs in its own process and keeps --connections requests
+# in flight (a new connection per request, like `ab` without -k); it reports
+# requests/sec and p50 / p99 latency. The weather endpoints talk to a local
+# stand-in for Open-Meteo that answers after --upstream-delay seconds.
+#
+# Needs uvicorn (pip install uvicorn).
+
+import json
+import logging
+import socket
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from students import weather
+from students.management.commands._loadtest import PooledWSGIServer, fill_database, http_load
+
+# (label, sync path, async path)
+ENDPOINTS = [
+    ("weather", "/api/weather/", "/api/async/weather/"),
+    ("function-students", "/api/function-students/?limit=100", "/api/async/function-students/?limit=100"),
+    ("class-students", "/api/class-students/?limit=100", "/api/async/class-students/?limit=100"),
+    ("sections/students", "/api/sections/students/", "/api/async/sections/students/"),
+    ("sections/enrollments", "/api/sections/enrollments/", "/api/async/sections/enrollments/"),
+]
+
+
+class _StubUpstream:
+    # Open-Meteo stand-in: answers every GET after `delay` seconds.
+    def __init__(self, delay):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(delay)
+                body = json.dumps({"current_weather": {"temperature": 21.5}}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/forecast"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _start_wsgi(threads):
+    server = PooledWSGIServer(("127.0.0.1", 0), threads)
+    server.set_app(WSGIHandler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+        server.pool.shutdown(wait=False, cancel_futures=True)
+    return server.server_port, stop
+
+
+def _start_asgi():
+    import uvicorn
+    from django.core.asgi import get_asgi_application
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    config = uvicorn.Config(
+        get_asgi_application(), lifespan="off", log_level="error", access_log=False, backlog=2048,
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(5)
+        sock.close()
+    return sock.getsockname()[1], stop
+
+
+class Command(BaseCommand):
+    help = "Benchmark the JSON endpoints: sync views on WSGI threads vs async views on ASGI."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=200, help="Requests kept in flight.")
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per run.")
+        parser.add_argument("--threads", type=int, default=32, help="WSGI worker threads.")
+        parser.add_argument("--sections", type=int, default=20)
+        parser.add_argument("--upstream-delay", type=float, default=0.1,
+                            help="Seconds the Open-Meteo stand-in takes to answer.")
+        parser.add_argument("--weather-ttl", type=int, default=1)
+        parser.add_argument("--only", nargs="+", choices=[e[0] for e in ENDPOINTS])
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError("bench_asgi needs uvicorn (pip install uvicorn).")
+
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        upstream = _StubUpstream(options["upstream_delay"])
+        old_client = weather.client
+        weather.client = weather.WeatherClient(
+            url=upstream.url, ttl=options["weather_ttl"], stale=0, timeout=5, key_prefix="bench:weather",
+        )
+        try:
+            fill_database(options["sections"], 25)
+            User.objects.create_user("bench", password="bench")
+            browser = Client()
+            browser.login(username="bench", password="bench")
+            cookie = f"sessionid={browser.cookies['sessionid'].value}"
+            with override_settings(ALLOWED_HOSTS=["127.0.0.1"], DEBUG=False):
+                self._run(options, cookie)
+        finally:
+            weather.client = old_client
+            upstream.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _run(self, options, cookie):
+        logging.getLogger("django.request").setLevel(logging.CRITICAL)
+        endpoints = [e for e in ENDPOINTS if not options["only"] or e[0] in options["only"]]
+        servers = {"wsgi": _start_wsgi(options["threads"]), "asgi": _start_asgi()}
+
+        self.stdout.write(
+            f"{options['connections']} connections, {options['duration']:g} s per run, "
+            f"WSGI threads: {options['threads']}, upstream delay: {options['upstream_delay']:g} s"
+        )
+        self.stdout.write(
+            f"{'endpoint':>21} {'server':>6} {'ok':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}"
+        )
+        # The load generator gets its own process (and GIL).
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as loader:
+            try:
+                for label, sync_path, async_path in endpoints:
+                    for server, path in (("wsgi", sync_path), ("asgi", async_path)):
+                        port = servers[server][0]
+                        self._warm_up(port, path, cookie)
+                        result = loader.submit(
+                            http_load, "127.0.0.1", port, path, {"Cookie": cookie},
+                            options["connections"], options["duration"],
+                        ).result()
+                        self.stdout.write(
+                            f"{label:>21} {server:>6} {result['ok']:>6} {result['errors']:>6} "
+                            f"{result['rps']:>8.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+                        )
+            finally:
+                for _, stop in servers.values():
+                    stop()
+
+    def _warm_up(self, port, path, cookie):
+        request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", headers={"Cookie": cookie})
+        for _ in range(3):
+            with urllib.request.urlopen(request, timeout=10) as resp:
+                resp.read()
+                if resp.status != 200:
+                    raise CommandError(f"{path} answered {resp.status}")
@@ -0,0 +1,87 @@
+# students/management/commands/bench_chart_engines.py
+# Run:  python manage.py bench_chart_engines
+#       python manage.py bench_chart_engines --sections 12 40 --repeat 20
+#
+# matplotlib vs the Pillow fast path (students/chart_pillow.py) for both
+# dashboard charts: cold import cost, render time, PNG size, and how far the
+# Pillow image is from the matplotlib one (mean per-pixel difference).
+# Renders are called directly: no pool, no render cache.
+
+import statistics
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+
+from students import chart_pillow, chart_render
+
+IMPORTS = {
+    "matplotlib": "import matplotlib.figure, matplotlib.backends.backend_agg",
+    "pillow": "import PIL.Image, PIL.ImageDraw, PIL.ImageFont",
+}
+
+ENGINES = {
+    "matplotlib": chart_render.RENDERERS,
+    "pillow": chart_pillow.RENDERERS,
+}
+
+
+def sample_rows(n):
+    return [
+        {"code": f"CS{100 + i}", "name": f"Section {i}", "n_students": (i * 7) % 23 + 1,
+         "n_all": (i * 7) % 23 + 3, "n_active": (i * 5) % 17}
+        for i in range(n)
+    ]
+
+
+def pixel_difference(png_a, png_b):
+    # Mean absolute difference of the grey-scale images, 0..1 (sizes must match).
+    from PIL import Image, ImageChops, ImageStat
+    a = Image.open(BytesIO(png_a)).convert("L")
+    b = Image.open(BytesIO(png_b)).convert("L")
+    if a.size != b.size:
+        return float("nan")
+    return ImageStat.Stat(ImageChops.difference(a, b)).mean[0] / 255
+
+
+def _cold_import_ms(statement):
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout) * 1000
+
+
+class Command(BaseCommand):
+    help = "Compare the matplotlib and Pillow chart renderers (time, bytes, pixel difference)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sections", type=int, nargs="+", default=[12, 40])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        for engine, statement in IMPORTS.items():
+            self.stdout.write(f"cold import {engine:>10}: {_cold_import_ms(statement):8.1f} ms")
+
+        self.stdout.write(
+            f"\n{'chart':>12} {'sections':>8} {'engine':>10} {'p50 ms':>8} {'KiB':>7} {'diff %':>7}"
+        )
+        for n in options["sections"]:
+            rows = sample_rows(n)
+            for chart in chart_render.RENDERERS:
+                reference = None
+                for engine, renderers in ENGINES.items():
+                    render = renderers[chart]
+                    render(rows)   # warm fonts / caches
+                    times = []
+                    for _ in range(options["repeat"]):
+                        began = time.perf_counter()
+                        png = render(rows)
+                        times.append(time.perf_counter() - began)
+                    if reference is None:
+                        reference = png
+                    diff = pixel_difference(reference, png) * 100
+                    self.stdout.write(
+                        f"{chart:>12} {n:>8} {engine:>10} {statistics.median(times) * 1000:>8.1f} "
+                        f"{len(png) / 1024:>7.1f} {diff:>7.2f}"
+                    )
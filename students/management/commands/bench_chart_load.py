@@ -0,0 +1,146 @@
+# students/management/commands/bench_chart_load.py
+# Run:  python manage.py bench_chart_load
+#       python manage.py bench_chart_load --workers 2 --clients 1 2 4 8 --requests 40
+#
+# Concurrent load test for the enrollments chart (charts/enrollments.png).
+# Serves the site from a throwaway test database on a local WSGI server with a
+# fixed number of worker threads (like gunicorn --threads N) and compares:
+#   in-process : the current view, which reads students.stats directly
+#                (render cache bypassed, so both variants draw every chart)
+#   loopback   : the old view, which fetched api/sections/enrollments/ from its
+#                own server with urlopen() before drawing
+# and reports latency (p50 / p95), throughput, failures (a loopback request
+# that waits on a worker held by another loopback request times out) and how
+# many worker-seconds each chart costs.
+
+import logging
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import override_settings
+from django.urls import path, reverse
+
+from students import chart_render, stats, views
+from students.management.commands._loadtest import PooledWSGIServer, fill_database
+
+LOOPBACK_TIMEOUT = 5
+
+
+def _loopback_chart(request):
+    # What enrollments_chart_png used to do.
+    import json
+    api_url = request.build_absolute_uri(reverse("bench-api"))
+    with urllib.request.urlopen(api_url, timeout=LOOPBACK_TIMEOUT) as resp:
+        rows = json.load(resp).get("results", [])
+    return HttpResponse(chart_render.render_enrollments_chart(rows), content_type="image/png")
+
+
+def _in_process_chart(request):
+    # enrollments_chart_png without the render cache, so both variants draw every time.
+    rows = stats.enrollments_per_section()
+    return HttpResponse(chart_render.render_enrollments_chart(rows), content_type="image/png")
+
+
+# ROOT_URLCONF while the benchmark runs (no login needed)
+urlpatterns = [
+    path("in-process.png", _in_process_chart, name="bench-in-process"),
+    path("loopback.png", _loopback_chart, name="bench-loopback"),
+    path("api/", views.api_enrollments_per_section, name="bench-api"),
+]
+
+
+class _BusyMeter:
+    # Wraps the WSGI app and adds up the time worker threads spend in it.
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        self.busy = 0.0
+
+    def __call__(self, environ, start_response):
+        began = time.perf_counter()
+        try:
+            return list(self.app(environ, start_response))
+        finally:
+            with self.lock:
+                self.busy += time.perf_counter() - began
+
+    def take(self):
+        with self.lock:
+            busy, self.busy = self.busy, 0.0
+        return busy
+
+
+class Command(BaseCommand):
+    help = "Load-test the enrollments chart: in-process data vs the old loopback HTTP call."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Server worker threads.")
+        parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8],
+                            help="Concurrent clients to try.")
+        parser.add_argument("--requests", type=int, default=40, help="Chart requests per run.")
+        parser.add_argument("--sections", type=int, default=12)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            fill_database(options["sections"], 20)
+            with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=["127.0.0.1"]):
+                self._run(options["workers"], options["clients"], options["requests"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _run(self, workers, client_counts, n_requests):
+        logging.getLogger("django.request").setLevel(logging.CRITICAL)   # timed-out loopbacks are 500s
+        meter = _BusyMeter(WSGIHandler())
+        server = PooledWSGIServer(("127.0.0.1", 0), workers)
+        server.set_app(meter)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+        def fetch(url):
+            began = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=LOOPBACK_TIMEOUT * 2) as resp:
+                    resp.read()
+                    ok = resp.status == 200
+            except Exception:
+                ok = False
+            return ok, time.perf_counter() - began
+
+        self.stdout.write(f"server workers: {workers}")
+        self.stdout.write(
+            f"{'variant':>11} {'clients':>7} {'ok':>4} {'fail':>4} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'req/s':>7} {'worker-s/chart':>14}"
+        )
+        try:
+            for variant in ("in-process", "loopback"):
+                url = f"{base}/{variant}.png"
+                fetch(url)   # warm up (stats cache, matplotlib fonts)
+                meter.take()
+                for clients in client_counts:
+                    began = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=clients) as pool:
+                        results = list(pool.map(fetch, [url] * n_requests))
+                    wall = time.perf_counter() - began
+                    busy = meter.take()
+
+                    latencies = sorted(t for ok, t in results if ok)
+                    n_ok = len(latencies)
+                    p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+                    p95 = latencies[int(0.95 * (n_ok - 1))] * 1000 if latencies else float("nan")
+                    self.stdout.write(
+                        f"{variant:>11} {clients:>7} {n_ok:>4} {n_requests - n_ok:>4} {p50:>8.1f} "
+                        f"{p95:>8.1f} {n_ok / wall:>7.1f} {busy / max(n_ok, 1):>14.3f}"
+                    )
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,103 @@
+# students/management/commands/bench_chart_render.py
+# Run:  python manage.py bench_chart_render
+#       python manage.py bench_chart_render --clients 1 4 16 --requests 48 --workers 4
+#
+# Throughput of the chart renderers under concurrent request threads:
+#   inline : draw in the calling thread (what the views did before the pool)
+#   pool   : students.charts.RenderService (worker processes)
+# Every request draws a different chart so the render cache never answers.
+# While the clients run, a probe thread does a few microseconds of Python work
+# every 10 ms; its p95 delay shows how much the renders stall the *other*
+# requests of the same web process (the GIL).
+
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from students import chart_render
+from students.charts import ChartBusy, RenderService
+
+
+def _rows(i):
+    return [{"code": f"SEC{j:02d}", "n_all": (i * 7 + j * 3) % 40, "n_active": (i + j) % 30}
+            for j in range(12)]
+
+
+class _Probe(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.delays = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            began = time.perf_counter()
+            time.sleep(0.01)
+            sum(range(100))
+            self.delays.append(time.perf_counter() - began - 0.01)
+
+    def p95_ms(self):
+        delays = sorted(self.delays)
+        return delays[int(0.95 * (len(delays) - 1))] * 1000 if delays else 0.0
+
+
+class Command(BaseCommand):
+    help = "Benchmark chart rendering in request threads vs the chart worker pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+        parser.add_argument("--requests", type=int, default=48, help="Charts per run.")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Pool size (default: STUDENTS_CHART_WORKERS).")
+
+    def handle(self, *args, **options):
+        from students import charts
+        workers = options["workers"] or charts.RENDER_WORKERS
+        n = options["requests"]
+        service = RenderService(workers, max_queue=max(options["clients"]), timeout=60)
+
+        variants = [
+            ("inline", lambda i: chart_render.render("enrollments", _rows(i))),
+            ("pool", lambda i: service.render("enrollments", _rows(i))),
+        ]
+        service.render("enrollments", _rows(-1))     # start + warm the workers
+        chart_render.warm_up()                       # and matplotlib in this process
+
+        self.stdout.write(f"pool workers: {workers}")
+        self.stdout.write(
+            f"{'variant':>8} {'clients':>7} {'charts/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'busy':>5} {'probe p95 ms':>13}"
+        )
+        try:
+            for label, render in variants:
+                for clients in options["clients"]:
+                    def one(i):
+                        began = time.perf_counter()
+                        try:
+                            render(i)
+                            return time.perf_counter() - began
+                        except ChartBusy:
+                            return None
+
+                    probe = _Probe()
+                    probe.start()
+                    began = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=clients) as pool:
+                        results = list(pool.map(one, range(n)))
+                    wall = time.perf_counter() - began
+                    probe.stopped.set()
+                    probe.join()
+
+                    latencies = sorted(t for t in results if t is not None)
+                    busy = n - len(latencies)
+                    p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+                    p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else float("nan")
+                    self.stdout.write(
+                        f"{label:>8} {clients:>7} {len(latencies) / wall:>9.1f} {p50:>8.1f} "
+                        f"{p95:>8.1f} {busy:>5} {probe.p95_ms():>13.1f}"
+                    )
+        finally:
+            service.shutdown()
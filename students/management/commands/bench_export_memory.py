@@ -0,0 +1,113 @@
+# students/management/commands/bench_export_memory.py
+# Run:  python manage.py bench_export_memory
+#       python manage.py bench_export_memory --rows 10000 100000 1000000 5000000 --buffered
+#
+# Fills a throwaway test database with N students and measures the streaming CSV,
+# JSON, NDJSON and Parquet / Arrow exports (students/exports.py): wall time, output size and the peak Python heap
+# (tracemalloc) while the whole file is generated. Streaming peak memory should
+# stay flat as N grows; --buffered adds the old "build it all in an HttpResponse"
+# approach for comparison (keep N small for that one).
+
+import csv
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+
+from students import exports
+
+INSERT_BATCH = 50_000
+
+
+def _fill_students(start, stop, section_id):
+    with connection.cursor() as cursor:
+        for batch_start in range(start, stop, INSERT_BATCH):
+            batch_stop = min(batch_start + INSERT_BATCH, stop)
+            cursor.executemany(
+                "INSERT INTO students_student (first_name, last_name, nickname, email, section_id) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [
+                    (f"First{i}", f"Last{i % 9973:05d}", "", f"student{i}@example.com", section_id)
+                    for i in range(batch_start, batch_stop)
+                ],
+            )
+
+
+def _measure(produce_chunks):
+    tracemalloc.start()
+    began = time.perf_counter()
+    total = sum(len(chunk) for chunk in produce_chunks())
+    elapsed = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, total, peak
+
+
+def _streaming(compress):
+    def produce():
+        rows = exports.iter_rows(exports.student_export_rows())
+        chunks = exports.csv_chunks(exports.STUDENT_EXPORT_COLUMNS, rows)
+        return exports.gzip_chunks(chunks) if compress else chunks
+    return produce
+
+
+def _json(produce_chunks):
+    def produce():
+        return produce_chunks(exports.student_export_rows(), exports.STUDENT_EXPORT_FIELDS)
+    return produce
+
+
+def _buffered():
+    # What export_students_csv used to do.
+    response = HttpResponse(content_type="text/csv")
+    writer = csv.writer(response)
+    writer.writerow(exports.STUDENT_EXPORT_COLUMNS)
+    for row in exports.student_export_rows():
+        writer.writerow(row)
+    return [response.content]
+
+
+class Command(BaseCommand):
+    help = "Benchmark peak memory of the streaming CSV export against growing row counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+        parser.add_argument("--buffered", action="store_true",
+                            help="Also measure the old fully-buffered export.")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self._run(sorted(options["rows"]), options["buffered"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _run(self, sizes, buffered):
+        from students.models import Section
+        section = Section.objects.create(code="BENCH", name="Benchmark")
+
+        self.stdout.write(f"{'rows':>10} {'variant':>10} {'seconds':>9} {'MiB out':>9} {'peak MiB':>9}")
+        filled = 0
+        for n in sizes:
+            _fill_students(filled, n, section.pk)
+            filled = n
+
+            variants = [
+                ("stream", _streaming(False)),
+                ("stream+gz", _streaming(True)),
+                ("json", _json(lambda qs, f: exports.json_envelope_chunks(qs, f, "bench"))),
+                ("ndjson", _json(exports.ndjson_chunks)),
+                ("parquet", lambda: exports.columnar_chunks("students", "parquet")),
+                ("arrow", lambda: exports.columnar_chunks("students", "arrow")),
+            ]
+            if buffered:
+                variants.append(("buffered", _buffered))
+
+            for label, produce in variants:
+                elapsed, total, peak = _measure(produce)
+                self.stdout.write(
+                    f"{n:>10} {label:>10} {elapsed:>9.2f} {total / 2**20:>9.1f} {peak / 2**20:>9.2f}"
+                )
@@ -0,0 +1,70 @@
+# students/management/commands/bench_json.py
+# Run:  python manage.py bench_json
+#       python manage.py bench_json --rows 1000 100000 --repeat 5
+#
+# Micro-benchmark of building a JSON API response from N student rows
+# (the api_students shape, plus a date and a Decimal per row):
+#   JsonResponse : Django's JsonResponse + DjangoJSONEncoder (what the views used)
+#   stdlib       : FastJsonResponse with the stdlib renderer (students/renderers.py)
+#   orjson       : FastJsonResponse with the orjson renderer
+# No database, no HTTP: only encoding + the response object.
+
+import datetime
+import decimal
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+
+from students import renderers
+
+
+def sample_rows(n):
+    day = datetime.date(2025, 8, 25)
+    return [
+        {"student_id": i, "first_name": f"First{i}", "last_name": f"Last{i % 997}",
+         "nickname": None if i % 3 else f"Nick{i}", "email": f"student{i}@illinois.edu",
+         "section__code": f"CS{100 + i % 40}", "enrolled_on": day + datetime.timedelta(days=i % 90),
+         "balance": decimal.Decimal(i % 5000) / 100}
+        for i in range(n)
+    ]
+
+
+def _variants():
+    yield "JsonResponse", lambda data: JsonResponse(data)
+    for name in renderers.RENDERERS:
+        try:
+            renderer = renderers.get_renderer(name)
+        except ImportError:
+            continue     # orjson not installed
+        yield name, lambda data, r=renderer: renderers.FastJsonResponse(data, json_renderer=r)
+
+
+class Command(BaseCommand):
+    help = "Compare JsonResponse with the stdlib and orjson renderers at 1k / 100k rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100_000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"default renderer: {renderers.renderer.name}")
+        self.stdout.write(f"{'rows':>8} {'variant':>13} {'p50 ms':>9} {'MB/s':>8} {'KiB':>9} {'speed-up':>9}")
+        for n in options["rows"]:
+            data = {"count": n, "results": sample_rows(n), "next": None, "prev": None}
+            baseline = None
+            for label, build in _variants():
+                build(data)   # warm-up
+                times = []
+                for _ in range(options["repeat"]):
+                    began = time.perf_counter()
+                    response = build(data)
+                    times.append(time.perf_counter() - began)
+                p50 = statistics.median(times)
+                baseline = baseline or p50
+                size = len(response.content)
+                self.stdout.write(
+                    f"{n:>8} {label:>13} {p50 * 1000:>9.2f} {size / p50 / 1e6:>8.1f} "
+                    f"{size / 1024:>9.1f} {baseline / p50:>8.1f}x"
+                )
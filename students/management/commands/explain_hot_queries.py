@@ -0,0 +1,89 @@
+# students/management/commands/explain_hot_queries.py
+# Run:  python manage.py explain_hot_queries
+#
+# Runs EXPLAIN on the list / report / export queries and checks that each one
+# is answered by the index we added for it (see Student.Meta.indexes and
+# Enrollment.Meta.indexes). Exits with an error if any query falls back to a
+# full scan or a full sort, so it can be used as a deploy check.
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+
+from students.models import Student, Section, Enrollment
+
+
+# (label, queryset builder, index names that are allowed to answer it, must avoid a sort?)
+HOT_QUERIES = [
+    (
+        "student list (default ordering)",
+        lambda: Student.objects.all(),
+        ["student_last_first_idx"],
+        True,
+    ),
+    (
+        "student API / exports (last_name, first_name)",
+        lambda: (
+            Student.objects
+            .values_list("student_id", "first_name", "last_name", "email", "section__code")
+            .order_by("last_name", "first_name")
+        ),
+        ["student_last_first_idx"],
+        True,
+    ),
+    (
+        "enrollments per section (all / active)",
+        lambda: (
+            Section.objects
+            .annotate(
+                n_all=Count("enrollments_related_name"),
+                n_active=Count(
+                    "enrollments_related_name",
+                    filter=Q(enrollments_related_name__is_active=True)
+                ),
+            )
+            .values("code", "n_all", "n_active")
+            .order_by("code")
+        ),
+        ["enroll_section_active_idx"],
+        False,
+    ),
+    (
+        "active enrollments in one section",
+        lambda: (
+            Enrollment.objects
+            .filter(section_id=1, is_active=True)
+            .order_by()
+        ),
+        # On MySQL the partial index is not created, so the composite one is fine.
+        ["enroll_active_section_idx", "enroll_section_active_idx"],
+        False,
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot list/report queries and verify they use their supporting indexes."
+
+    def handle(self, *args, **options):
+        failures = []
+
+        for label, build_qs, index_names, no_sort in HOT_QUERIES:
+            plan = build_qs().explain()
+
+            uses_index = any(name in plan for name in index_names)
+            # SQLite prints this line when it has to sort the result itself.
+            sorts = connection.vendor == "sqlite" and "TEMP B-TREE FOR ORDER BY" in plan
+
+            if uses_index and not (no_sort and sorts):
+                self.stdout.write(self.style.SUCCESS(f"OK    {label}"))
+            else:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"FAIL  {label}"))
+
+            if options["verbosity"] > 1 or label in failures:
+                for line in plan.splitlines():
+                    self.stdout.write(f"      {line}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot query(ies) not using their index: {', '.join(failures)}")
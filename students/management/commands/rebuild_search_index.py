@@ -0,0 +1,24 @@
+# students/management/commands/rebuild_search_index.py
+# Run:  python manage.py rebuild_search_index
+#
+# (Re)creates the student full-text search index for the current database
+# (see students/search.py) and repopulates it from students_student.
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from students.search import backend_for
+
+
+class Command(BaseCommand):
+    help = "Create (if missing) and rebuild the student full-text search index."
+
+    def handle(self, *args, **options):
+        backend = backend_for(connection)
+        if backend.is_installed(connection):
+            backend.rebuild(connection)
+        else:
+            backend.install(connection)   # also populates it
+        self.stdout.write(self.style.SUCCESS(
+            f"Search index rebuilt with {type(backend).__name__}."
+        ))
@@ -0,0 +1,58 @@
+# students/management/commands/recount_sections.py
+# Run:  python manage.py recount_sections            (fix every section)
+#       python manage.py recount_sections --dry-run  (only report drift)
+#
+# Recomputes Section.n_students / n_enrollments / n_active_enrollments from the
+# Student and Enrollment tables. Use it after raw SQL, fixture loads, or any
+# write that bypassed the ORM.
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from students.models import Section
+
+COUNTER_FIELDS = ("n_students", "n_enrollments", "n_active_enrollments")
+
+
+def _snapshot():
+    return {
+        row["section_id"]: row
+        for row in Section.objects.values("section_id", "code", *COUNTER_FIELDS)
+    }
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized counters on Section and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drift without keeping the corrected values.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            before = _snapshot()
+            Section.objects.recount()
+            after = _snapshot()
+
+            drifted = 0
+            for section_id, new in after.items():
+                old = before[section_id]
+                changes = [
+                    f"{field} {old[field]} -> {new[field]}"
+                    for field in COUNTER_FIELDS
+                    if old[field] != new[field]
+                ]
+                if changes:
+                    drifted += 1
+                    self.stdout.write(f"{new['code']}: " + ", ".join(changes))
+
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+
+        verb = "would be fixed" if options["dry_run"] else "fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(after)} section(s) checked, {drifted} {verb}."
+        ))
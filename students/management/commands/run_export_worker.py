@@ -0,0 +1,51 @@
+# students/management/commands/run_export_worker.py
+# Run:  python manage.py run_export_worker            (keep polling)
+#       python manage.py run_export_worker --once     (drain the queue, then exit; e.g. from cron)
+#
+# Picks up queued ExportJob rows and writes their files (see students/jobs.py).
+# Several workers can run side by side: a job is claimed with a conditional UPDATE.
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from students import jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued background export jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Exit when the queue is empty instead of polling.")
+        parser.add_argument("--poll", type=float, default=2.0,
+                            help="Seconds to sleep when the queue is empty (default 2).")
+        parser.add_argument("--stale-after", type=int, default=3600,
+                            help="Requeue jobs stuck in 'running' for this many seconds (default 3600).")
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_stale_jobs(options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+
+        try:
+            while True:
+                close_old_connections()
+                job = jobs.claim_next_job()
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+
+                started = time.perf_counter()
+                jobs.run_job(job)
+                elapsed = time.perf_counter() - started
+                line = f"{job.table}.{job.file_format} [{job.pk}] {job.status} in {elapsed:.2f}s"
+                if job.status == job.DONE:
+                    self.stdout.write(self.style.SUCCESS(f"{line} -> {job.artifact} ({job.size_bytes} bytes)"))
+                else:
+                    self.stdout.write(self.style.ERROR(f"{line}: {job.error}"))
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping.")
@@ -0,0 +1,154 @@
+# students/metrics.py
+# Rolling-window metrics over the typed time series (students/dataset_tables.py),
+# computed on demand with NumPy instead of shipping one precomputed CSV column per
+# window (vlSpec6's "20 Days Net Sentiment", "Standardized Volume", ...):
+#
+#   compute(name, series, metric, window, start, end) -> (columns, rows)
+#
+#   mean         trailing rolling mean over the last `window` points (one point per day)
+#   std          trailing rolling standard deviation (ddof=1)
+#   zscore       (value - rolling mean) / rolling std
+#   normalize    (value - min) / (max - min) over the selected date range
+#   standardize  (value - mean) / std over the selected date range (ddof=1)
+#
+# Rolling metrics need a full window of non-null values (else null). They are
+# computed over the whole series and then cut to ?from= / ?to=, so the first days
+# of a range still look back into earlier data.
+#
+# Each dataset is read from the database once per "datasetfile" DataVersion into
+# SeriesArrays holding prefix sums of the values, their squares and the non-null
+# count. Any window sum is then S[i] - S[i - w]: a new window, metric or date range
+# is a few O(n) vector operations on the cached sums, not another pass over rows.
+
+from functools import lru_cache
+
+import numpy as np
+
+from students import dataset_tables
+from students.models import DataVersion
+
+METRICS = ("mean", "std", "zscore", "normalize", "standardize")
+ROLLING_METRICS = ("mean", "std", "zscore")
+DEFAULT_WINDOW = 20
+MAX_WINDOW = 3660
+
+
+class SeriesArrays:
+    def __init__(self, days, values):
+        self.days = np.array(days, dtype="datetime64[D]")
+        self.values = np.array(values, dtype=float)          # None -> nan
+        valid = ~np.isnan(self.values)
+        # sums of (value - center): keeps the squares small, so the variance from
+        # differences of prefix sums does not lose precision on large volumes
+        self.center = float(self.values[valid].mean()) if valid.any() else 0.0
+        clean = np.where(valid, self.values - self.center, 0.0)
+        # prefix sums with a leading 0: the sum of points [i, j) is s[j] - s[i]
+        self.s1 = np.concatenate(([0.0], np.cumsum(clean)))
+        self.s2 = np.concatenate(([0.0], np.cumsum(clean * clean)))
+        self.n = np.concatenate(([0], np.cumsum(valid)))
+
+    def rolling(self, window):
+        # (mean, std) of the `window` points ending at each point; nan where the window is not full
+        end = np.arange(1, len(self.values) + 1)
+        start = np.maximum(end - window, 0)
+        count = self.n[end] - self.n[start]
+        total = self.s1[end] - self.s1[start]
+        squares = self.s2[end] - self.s2[start]
+        full = count == window
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(full, total / count, np.nan)
+            var = np.where(full, (squares - total * mean) / (count - 1), np.nan)
+        return mean + self.center, np.sqrt(np.maximum(var, 0.0))
+
+    def span(self, start, end):
+        # [lo, hi) positions of the points between the two dates (inclusive)
+        lo = 0 if start is None else int(np.searchsorted(self.days, np.datetime64(start, "D"), "left"))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, np.datetime64(end, "D"), "right"))
+        return lo, hi
+
+    def metric(self, metric, window, lo, hi):
+        values = self.values[lo:hi]
+        if metric in ROLLING_METRICS:
+            mean, std = self.rolling(window)
+            mean, std = mean[lo:hi], std[lo:hi]
+            if metric == "mean":
+                return mean
+            if metric == "std":
+                return std
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(std > 0, (values - mean) / std, np.nan)
+
+        count = self.n[hi] - self.n[lo]
+        if count < 2:
+            return np.full(hi - lo, np.nan)
+        if metric == "normalize":
+            low, high = np.nanmin(values), np.nanmax(values)
+            return (values - low) / (high - low) if high > low else np.zeros(hi - lo)
+        total = self.s1[hi] - self.s1[lo]
+        mean = total / count
+        std = np.sqrt(max((self.s2[hi] - self.s2[lo] - total * mean) / (count - 1), 0.0))
+        return (values - self.center - mean) / std if std > 0 else np.zeros(hi - lo)
+
+
+@lru_cache(maxsize=8)
+def _dataset(name, version):
+    # {series name: SeriesArrays} for one dataset at one data version (one query)
+    grouped = {}
+    for series, day, value in dataset_tables.points(name):
+        days, values = grouped.setdefault(series, ([], []))
+        days.append(day)
+        values.append(np.nan if value is None else value)
+    return {series: SeriesArrays(days, values) for series, (days, values) in grouped.items()}
+
+
+def dataset(name):
+    version = DataVersion.current(dataset_tables.DATA_VERSION_TABLE)[dataset_tables.DATA_VERSION_TABLE].tag
+    return _dataset(name, version)
+
+
+def _plain(array):
+    # NumPy floats -> Python floats, nan -> None (JSON null)
+    return [None if v != v else v for v in array.tolist()]
+
+
+def compute(name, series=(), metric="mean", window=DEFAULT_WINDOW, start=None, end=None):
+    # -> (columns, rows) with rows (series, day, value, <metric>), by series then day.
+    # ValueError on bad input.
+    if dataset_tables.LAYOUTS[name].kind != "dated":
+        raise ValueError(f"{name} is not a time series.")
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(METRICS)}.")
+    if metric in ROLLING_METRICS and not 2 <= window <= MAX_WINDOW:
+        raise ValueError(f"window must be between 2 and {MAX_WINDOW}.")
+    arrays = dataset(name)
+    series = list(series) or list(arrays)
+    unknown = [s for s in series if s not in arrays]
+    if unknown:
+        raise ValueError(f"Unknown series: {', '.join(unknown)}.")
+
+    rows = []
+    for s in series:
+        a = arrays[s]
+        lo, hi = a.span(start, end)
+        result = a.metric(metric, window, lo, hi)
+        rows.extend(zip([s] * (hi - lo), a.days[lo:hi].tolist(), _plain(a.values[lo:hi]), _plain(result)))
+    return ("series", "day", "value", metric), rows
+
+
+def arrow_table(columns, rows):
+    import pyarrow as pa
+
+    values = list(zip(*rows)) if rows else [[] for _ in columns]
+    types = (pa.string(), pa.date32(), pa.float64(), pa.float64())
+    return pa.table([pa.array(v, type=t) for v, t in zip(values, types)], names=list(columns))
+
+
+def arrow_bytes(columns, rows):
+    # Arrow IPC file (the same format as export/<table>.arrow)
+    import pyarrow as pa
+
+    table = arrow_table(columns, rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Section = apps.get_model('students', 'Section')
+    Student = apps.get_model('students', 'Student')
+    Enrollment = apps.get_model('students', 'Enrollment')
+
+    def count_per_section(model, **filters):
+        return Coalesce(
+            Subquery(
+                model.objects
+                .filter(section=OuterRef('pk'), **filters)
+                .order_by()
+                .values('section')
+                .annotate(c=Count('pk'))
+                .values('c')
+            ),
+            0,
+        )
+
+    Section.objects.update(
+        n_students=count_per_section(Student),
+        n_enrollments=count_per_section(Enrollment),
+        n_active_enrollments=count_per_section(Enrollment, is_active=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='section',
+            name='n_active_enrollments',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='n_enrollments',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='n_students',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from students.search import backend_for
+    backend_for(schema_editor.connection).install(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from students.search import backend_for
+    backend_for(schema_editor.connection).uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_section_counters'),
+    ]
+
+    operations = [
+        # SQLite: FTS5 trigram table + sync triggers. MySQL: FULLTEXT ngram index.
+        # See students/search.py.
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_section_term_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Country',
+            fields=[
+                ('country_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=64, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'countries',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DatasetFile',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64)),
+                ('n_rows', models.PositiveIntegerField(default=0)),
+                ('loaded_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DataSeries',
+            fields=[
+                ('series_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=64)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_related_name', to='students.datasetfile')),
+            ],
+            options={
+                'ordering': ['dataset', 'series_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProfilePoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('value', models.FloatField(null=True)),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_points_related_name', to='students.dataseries')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SeriesPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('value', models.FloatField(null=True)),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_related_name', to='students.dataseries')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CountryValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.FloatField(null=True)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='values_related_name', to='students.country')),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='country_values_related_name', to='students.dataseries')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('series', 'country'), name='uniq_value_per_series_per_country')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dataseries',
+            constraint=models.UniqueConstraint(fields=('dataset', 'name'), name='uniq_series_name_in_dataset'),
+        ),
+        migrations.AddConstraint(
+            model_name='profilepoint',
+            constraint=models.UniqueConstraint(fields=('series', 'slot'), name='uniq_point_per_series_per_slot'),
+        ),
+        migrations.AddIndex(
+            model_name='seriespoint',
+            index=models.Index(fields=['day'], name='seriespoint_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='seriespoint',
+            constraint=models.UniqueConstraint(fields=('series', 'day'), name='uniq_point_per_series_per_day'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:15
+
+import students.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0007_dataset_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='epoch',
+            field=models.CharField(default=students.models.new_data_version_epoch, editable=False, max_length=8),
+        ),
+    ]
@@ -1,8 +1,200 @@
 # Paste here: students/models.py
 # New changes: Added get_absolute_url method in the Student model.
 
-from django.db import models
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django.utils import timezone
+
+
+# ---------- Data versions ----------
+# One generation counter per table, bumped on every write (signals for save/delete,
+# VersionedQuerySet for bulk writes). Lets export artifacts, caches and ETags tell
+# "nothing changed" from "something changed" with a single primary-key read.
+# A counter starts again from 0 when its row is lost (new database, flush), so the
+# row also carries a random epoch: versions from before and after never compare equal.
+def new_data_version_epoch():
+    return uuid.uuid4().hex[:8]
+
+
+class DataVersion(models.Model):
+    table      = models.CharField(max_length=32, primary_key=True)   # model_name, e.g. "student"
+    version    = models.PositiveBigIntegerField(default=0)
+    epoch      = models.CharField(max_length=8, default=new_data_version_epoch, editable=False)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+    @classmethod
+    def bump(cls, *tables):
+        now = timezone.now()
+        for table in tables:
+            if not cls.objects.filter(table=table).update(version=F("version") + 1, updated_at=now):
+                cls.objects.get_or_create(table=table, defaults={"version": 1, "updated_at": now})
+
+    @classmethod
+    def current(cls, *tables):
+        # {table: DataVersion}. A table without a row (never written, or the row was
+        # lost) gets one now, with a fresh epoch and updated_at, so its validators
+        # can't match anything a client saw before.
+        found = {dv.table: dv for dv in cls.objects.filter(table__in=tables)}
+        if len(found) < len(set(tables)):
+            cls.objects.bulk_create([cls(table=t) for t in tables if t not in found], ignore_conflicts=True)
+            found = {dv.table: dv for dv in cls.objects.filter(table__in=tables)}
+        return found
+
+    @classmethod
+    async def acurrent(cls, *tables):
+        # current() for async views
+        found = {dv.table: dv async for dv in cls.objects.filter(table__in=tables)}
+        if len(found) < len(set(tables)):
+            await cls.objects.abulk_create([cls(table=t) for t in tables if t not in found], ignore_conflicts=True)
+            found = {dv.table: dv async for dv in cls.objects.filter(table__in=tables)}
+        return found
+
+    @property
+    def tag(self):
+        # e.g. "student.1f3a9c0e.12"
+        return f"{self.table}.{self.epoch}.{self.version}"
+
+    @classmethod
+    def key(cls, *tables):
+        # e.g. "section.5d1e03aa.40-student.1f3a9c0e.12" (stable order)
+        versions = cls.current(*tables)
+        return "-".join(versions[t].tag for t in sorted(tables))
+
+
+class VersionedQuerySet(models.QuerySet):
+    # Bulk writes send no signals, so they bump the table's DataVersion themselves.
+    def _bump_version(self):
+        DataVersion.bump(self.model._meta.model_name)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            self._bump_version()
+        return objs
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            rows = super().update(**kwargs)
+            if rows:
+                self._bump_version()
+        return rows
+
+
+# ---------- Denormalized counters ----------
+# Section carries n_students / n_enrollments / n_active_enrollments so the
+# dashboards read one small table instead of GROUP BY-joining the big ones.
+#   - single-row writes:  Student.save() / Enrollment.save() adjust the counters
+#                         in the same transaction as the row write
+#   - instance.delete() (incl. its cascades): pre_delete signals in
+#                         students/signals.py (Django runs them inside the delete transaction)
+#   - bulk_create / queryset.update() / bulk_update() / queryset.delete(): the
+#                         querysets below recount the affected sections
+#   - anything else (raw SQL, fixtures): python manage.py recount_sections
+
+def _count_per_section(queryset, **filters):
+    # Correlated "SELECT COUNT(*) ... WHERE section_id = <outer section>" subquery.
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(section=OuterRef("pk"), **filters)
+            .order_by()
+            .values("section")
+            .annotate(c=Count("pk"))
+            .values("c")
+        ),
+        0,
+    )
+
+
+class SectionQuerySet(VersionedQuerySet):
+    def recount(self):
+        # Recompute the counters from the real tables (used by bulk paths and recount_sections).
+        from students import stats   # stats imports this module
+
+        rows = self.update(
+            n_students=_count_per_section(Student.objects),
+            n_enrollments=_count_per_section(Enrollment.objects),
+            n_active_enrollments=_count_per_section(Enrollment.objects, is_active=True),
+        )
+        # Bulk writes send no save/delete signals, so clear the cached stats here.
+        transaction.on_commit(stats.invalidate, using=self.db)
+        return rows
+
+    def bump(self, **deltas):
+        # Atomic "counter = counter + delta" in SQL, so concurrent writers don't lose updates.
+        deltas = {name: F(name) + delta for name, delta in deltas.items() if delta}
+        return self.update(**deltas) if deltas else 0
+
+
+class SectionCountedQuerySet(VersionedQuerySet):
+    # Bulk operations skip save() and the signals, so they recount the sections they touched.
+    counted_fields = ("section",)
+
+    def _touches_counters(self, kwargs):
+        names = set(self.counted_fields)
+        names |= {f"{name}_id" for name in self.counted_fields}
+        return bool(names & set(kwargs))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            Section.objects.filter(pk__in={obj.section_id for obj in objs}).recount()
+        return objs
+
+    def update(self, **kwargs):
+        if not self._touches_counters(kwargs):
+            return super().update(**kwargs)
+
+        with transaction.atomic(using=self.db):
+            section_ids = set(self.order_by().values_list("section_id", flat=True).distinct())
+            rows = super().update(**kwargs)
+
+            new_section = kwargs.get("section", kwargs.get("section_id"))
+            if hasattr(new_section, "resolve_expression"):
+                # e.g. bulk_update()'s CASE ... WHEN: target sections are not known up front.
+                Section.objects.recount()
+            else:
+                if new_section is not None:
+                    section_ids.add(getattr(new_section, "pk", new_section))
+                Section.objects.filter(pk__in=section_ids).recount()
+        return rows
+
+    def _deleted_sections(self):
+        # sections whose counters a delete of these rows changes
+        return set(self.order_by().values_list("section_id", flat=True).distinct())
+
+    def delete(self):
+        # One recount and one DataVersion bump per table for the whole delete; the
+        # per-row delete signals leave deletes started here alone (students/signals.py).
+        with transaction.atomic(using=self.db):
+            section_ids = self._deleted_sections()
+            deleted, per_model = super().delete()
+            if deleted:
+                DataVersion.bump(*(apps.get_model(label)._meta.model_name
+                                   for label, count in per_model.items() if count))
+                Section.objects.filter(pk__in=section_ids).recount()
+        return deleted, per_model
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class StudentQuerySet(SectionCountedQuerySet):
+    def _deleted_sections(self):
+        # + those of the enrollments the delete cascades to
+        return super()._deleted_sections() | set(
+            Enrollment.objects.filter(student__in=self.values("pk")).order_by()
+            .values_list("section_id", flat=True).distinct()
+        )
 
 
 # ---------- Parent table ----------
@@ -13,8 +205,19 @@ class Section(models.Model):
     name  = models.CharField(max_length=60)                # e.g. "Intro to CS - A"
     term  = models.CharField(max_length=16, blank=True)    # e.g. "Fall 2025"
 
+    # Denormalized counters (see the notes at the top of this file)
+    n_students           = models.PositiveIntegerField(default=0, editable=False)
+    n_enrollments        = models.PositiveIntegerField(default=0, editable=False)
+    n_active_enrollments = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = SectionQuerySet.as_manager()
+
     class Meta:
         ordering = ["code"]
+        indexes = [
+            # ?term= filter on the student APIs
+            models.Index(fields=["term"], name="section_term_idx"),
+        ]
 
     def __str__(self):
         return f"{self.code} ({self.term or '—'})"
@@ -33,6 +236,8 @@ class Student(models.Model):
         related_name="section_related_name",          # I changed this name in week 5
     )
 
+    objects = StudentQuerySet.as_manager()
+
     ####################################################################################################################################
     # NEW:
     def get_absolute_url(self):
@@ -50,13 +255,38 @@ class Student(models.Model):
                 name="uniq_student_name_in_section",
             )
         ]
+        indexes = [
+            # Backs the default ordering (list pages, APIs, exports) so the DB can
+            # walk the index instead of sorting the whole table on every request.
+            models.Index(fields=["last_name", "first_name"], name="student_last_first_idx"),
+        ]
 
     def __str__(self):
         base = f"{self.last_name}, {self.first_name}"
         return f"{base} ({self.nickname})" if self.nickname else base
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            old_section_id = None
+            if self.pk is not None:
+                old_section_id = (
+                    Student.objects.filter(pk=self.pk).select_for_update()
+                    .values_list("section_id", flat=True).first()
+                )
+
+            super().save(*args, **kwargs)
+
+            if old_section_id != self.section_id:
+                if old_section_id is not None:
+                    Section.objects.filter(pk=old_section_id).bump(n_students=-1)
+                Section.objects.filter(pk=self.section_id).bump(n_students=1)
+
 
 # ---------- Association table (join table) ----------
+class EnrollmentQuerySet(SectionCountedQuerySet):
+    counted_fields = ("section", "is_active")
+
+
 class Enrollment(models.Model):
     enroll_id       = models.AutoField(primary_key=True)
     student  = models.ForeignKey(
@@ -76,6 +306,8 @@ class Enrollment(models.Model):
     enrolled_on = models.DateField(auto_now_add=True)
     is_active   = models.BooleanField(default=True)
 
+    objects = EnrollmentQuerySet.as_manager()
+
     class Meta:
         ordering = ["-enroll_id", "student__last_name", "student__first_name"]
         constraints = [
@@ -84,6 +316,159 @@ class Enrollment(models.Model):
                 name="uniq_enrollment_per_student_per_section",
             )
         ]
+        indexes = [
+            # Covers the "enrollments per section (all / active)" counts.
+            models.Index(fields=["section", "is_active"], name="enroll_section_active_idx"),
+            # Partial index: only active rows. SQLite/PostgreSQL build it,
+            # MySQL skips it (the composite index above still covers MySQL).
+            models.Index(
+                fields=["section"],
+                condition=models.Q(is_active=True),
+                name="enroll_active_section_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Enrollment(student={self.student_id}, section={self.section_id})"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            old = None
+            if self.pk is not None:
+                old = (
+                    Enrollment.objects.filter(pk=self.pk).select_for_update()
+                    .values("section_id", "is_active").first()
+                )
+
+            super().save(*args, **kwargs)
+
+            # {section_id: [delta n_enrollments, delta n_active_enrollments]}
+            deltas = {self.section_id: [1, int(self.is_active)]}
+            if old is not None:
+                before = deltas.setdefault(old["section_id"], [0, 0])
+                before[0] -= 1
+                before[1] -= int(old["is_active"])
+
+            for section_id, (d_all, d_active) in deltas.items():
+                Section.objects.filter(pk=section_id).bump(
+                    n_enrollments=d_all,
+                    n_active_enrollments=d_active,
+                )
+
+
+# ---------- Background export jobs ----------
+# Rows are created by the export-job endpoints and processed by
+# `python manage.py run_export_worker` (see students/jobs.py).
+class ExportJob(models.Model):
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    job_id       = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    table        = models.CharField(max_length=16)         # "students", "sections", "enrollments"
+    file_format  = models.CharField(max_length=8)          # "csv", "json", "ndjson", "parquet", "arrow"
+    status       = models.CharField(max_length=8, choices=STATUS_CHOICES, default=QUEUED)
+    data_version = models.CharField(max_length=64, blank=True)   # DataVersion.key() the artifact was built from
+    artifact     = models.CharField(max_length=255, blank=True)  # file name inside STUDENTS_EXPORT_DIR
+    size_bytes   = models.PositiveBigIntegerField(null=True, blank=True)
+    error        = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="export_jobs_related_name",
+    )
+    created_at   = models.DateTimeField(auto_now_add=True)
+    started_at   = models.DateTimeField(null=True, blank=True)
+    finished_at  = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # worker: "oldest queued job"; requests: "latest done job for this export"
+            models.Index(fields=["status", "created_at"], name="exportjob_status_created_idx"),
+            models.Index(fields=["table", "file_format", "status"], name="exportjob_kind_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"ExportJob({self.table}.{self.file_format}, {self.status})"
+
+
+# ---------- Vega-Lite datasets (typed copies of data/vega-lite-test_data/*.csv) ----------
+# Loaded by `python manage.py load_datasets` (see students/dataset_tables.py).
+# One DataSeries per plotted measure; its values live in one of three fact tables:
+#   SeriesPoint   date-indexed time series (vlSpec4, vlSpec5, vlSpec6)
+#   CountryValue  one value per country    (vlSpec3)
+#   ProfilePoint  day-of-week / hour-of-day profiles (vlSpec1, vlSpec2)
+class DatasetFile(models.Model):
+    name      = models.CharField(max_length=32, primary_key=True)   # file stem, e.g. "vlSpec4"
+    sha256    = models.CharField(max_length=64)                     # of the file last loaded
+    n_rows    = models.PositiveIntegerField(default=0)
+    loaded_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} ({self.sha256[:12]})"
+
+
+class DataSeries(models.Model):
+    series_id = models.AutoField(primary_key=True)
+    dataset   = models.ForeignKey(DatasetFile, on_delete=models.CASCADE, related_name="series_related_name")
+    name      = models.CharField(max_length=64)                     # e.g. "net_sent_vol", "Net Sentiment"
+
+    class Meta:
+        ordering = ["dataset", "series_id"]
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "name"], name="uniq_series_name_in_dataset"),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset_id}/{self.name}"
+
+
+class Country(models.Model):
+    country_id = models.AutoField(primary_key=True)
+    name       = models.CharField(max_length=64, unique=True)
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name_plural = "countries"
+
+    def __str__(self):
+        return self.name
+
+
+class SeriesPoint(models.Model):
+    series = models.ForeignKey(DataSeries, on_delete=models.CASCADE, related_name="points_related_name")
+    day    = models.DateField()
+    value  = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            # also the (series, day) index behind "these series between these dates"
+            models.UniqueConstraint(fields=["series", "day"], name="uniq_point_per_series_per_day"),
+        ]
+        indexes = [
+            # date range over every series of a dataset
+            models.Index(fields=["day"], name="seriespoint_day_idx"),
+        ]
+
+
+class CountryValue(models.Model):
+    series  = models.ForeignKey(DataSeries, on_delete=models.CASCADE, related_name="country_values_related_name")
+    country = models.ForeignKey(Country, on_delete=models.PROTECT, related_name="values_related_name")
+    value   = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["series", "country"], name="uniq_value_per_series_per_country"),
+        ]
+
+
+class ProfilePoint(models.Model):
+    series = models.ForeignKey(DataSeries, on_delete=models.CASCADE, related_name="profile_points_related_name")
+    slot   = models.PositiveSmallIntegerField()    # day of week 1-7, or hour of day 0-23
+    value  = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["series", "slot"], name="uniq_point_per_series_per_slot"),
+        ]
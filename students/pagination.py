@@ -0,0 +1,156 @@
+# students/pagination.py
+# Keyset ("cursor") pagination for the JSON list APIs.
+#
+# Instead of OFFSET (which makes the DB walk and throw away every earlier row),
+# each page remembers the sort key of its first/last row and the next query asks
+# for rows strictly after / before that key:
+#
+#   WHERE (last_name, first_name, student_id) > (:l, :f, :id)
+#   ORDER BY last_name, first_name, student_id LIMIT :n
+#
+# With the (last_name, first_name) index this costs the same on page 5000 as on
+# page 1, and rows inserted between requests never shift or duplicate a page.
+# Cursors are opaque to clients (url-safe base64 of a small JSON document). They
+# carry the name of the ordering they were made for, and every key value is checked
+# against its model field before it reaches a query, so a tampered, stale or
+# cross-ordering cursor is an InvalidPageRequest (400), never a 500.
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_LIMIT = getattr(settings, "STUDENTS_API_DEFAULT_LIMIT", 100)
+MAX_LIMIT = getattr(settings, "STUDENTS_API_MAX_LIMIT", 1000)
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def encode_cursor(key, direction, ordering=None):
+    data = {"k": list(key), "d": direction}
+    if ordering is not None:
+        data["o"] = ordering
+    raw = json.dumps(data, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, ordering=None):
+    # ordering: the one the cursor must have been made for (None: not checked)
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, direction = data["k"], data["d"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidPageRequest("Malformed cursor.")
+    if direction not in ("n", "p") or not isinstance(key, list):
+        raise InvalidPageRequest("Malformed cursor.")
+    if ordering is not None and data.get("o") != ordering:
+        raise InvalidPageRequest("This cursor belongs to another ordering; start again without it.")
+    return key, direction
+
+
+def _model_field(model, path):
+    # "section__code" -> the Section.code field
+    *relations, name = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def parse_limit(raw):
+    if raw in (None, ""):
+        return DEFAULT_LIMIT
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise InvalidPageRequest("limit must be an integer.")
+    return max(1, min(limit, MAX_LIMIT))   # server-side cap
+
+
+class KeysetPaginator:
+    # key_fields: the sort key, unique as a whole; "-field" sorts that column descending.
+    # name: written into (and required back from) cursors, e.g. the ?ordering= value.
+    def __init__(self, key_fields, name=None):
+        self.key_fields = [f.lstrip("-") for f in key_fields]
+        self.descending = [f.startswith("-") for f in key_fields]
+        self.name = name if name is not None else ",".join(key_fields)
+
+    def _clean_key(self, model, key):
+        # Cursor values -> Python values of the key fields (InvalidPageRequest if they can't be).
+        if len(key) != len(self.key_fields):
+            raise InvalidPageRequest("Malformed cursor.")
+        cleaned = []
+        for field, value in zip(self.key_fields, key):
+            if value is None or isinstance(value, (list, dict)):
+                raise InvalidPageRequest("Malformed cursor.")
+            try:
+                cleaned.append(_model_field(model, field).to_python(value))
+            except (ValidationError, ValueError, TypeError):
+                raise InvalidPageRequest("Malformed cursor.")
+        return cleaned
+
+    def _after(self, key, backwards):
+        # (a, b, c) > (x, y, z)  ==  a > x  OR (a = x AND b > y)  OR (a = x AND b = y AND c > z)
+        # ("<" for a descending column, and every comparison flipped when paging backwards)
+        ops = ["lt" if desc != backwards else "gt" for desc in self.descending]
+        condition = Q()
+        for i, field in enumerate(self.key_fields):
+            equal = {f: v for f, v in zip(self.key_fields[:i], key[:i])}
+            condition |= Q(**equal, **{f"{field}__{ops[i]}": key[i]})
+        # Redundant range on the leading column so the index range scan starts at the cursor.
+        first = self.key_fields[0]
+        return Q(**{f"{first}__{ops[0]}e": key[0]}) & condition
+
+    def key_of(self, row, fields=None):
+        if fields is None:
+            return [row[field] for field in self.key_fields]
+        return [row[fields.index(field)] for field in self.key_fields]
+
+    def order_by(self, backwards=False):
+        return [f"-{f}" if desc != backwards else f for f, desc in zip(self.key_fields, self.descending)]
+
+    def _query(self, values_qs, cursor, limit):
+        key, direction = decode_cursor(cursor, self.name) if cursor else (None, "n")
+        backwards = direction == "p"
+        qs = values_qs.order_by(*self.order_by(backwards))
+        if key is not None:
+            key = self._clean_key(values_qs.model, key)
+            try:
+                qs = qs.filter(self._after(key, backwards))
+            except (ValidationError, ValueError, TypeError):
+                raise InvalidPageRequest("Malformed cursor.")
+        return qs[:limit + 1], key, backwards
+
+    def _result(self, rows, key, backwards, limit, fields):
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return rows, None, None
+
+        if backwards:
+            next_cursor = encode_cursor(self.key_of(rows[-1], fields), "n", self.name)
+            prev_cursor = encode_cursor(self.key_of(rows[0], fields), "p", self.name) if has_more else None
+        else:
+            next_cursor = encode_cursor(self.key_of(rows[-1], fields), "n", self.name) if has_more else None
+            prev_cursor = encode_cursor(self.key_of(rows[0], fields), "p", self.name) if key is not None else None
+        return rows, next_cursor, prev_cursor
+
+    def page(self, values_qs, cursor=None, limit=DEFAULT_LIMIT, fields=None):
+        # values_qs must be a .values() queryset that includes every key field,
+        # or a .values_list(*fields) one (pass `fields`, rows are then tuples).
+        # Returns (rows, next_cursor, prev_cursor).
+        qs, key, backwards = self._query(values_qs, cursor, limit)
+        return self._result(list(qs), key, backwards, limit, fields)
+
+    async def apage(self, values_qs, cursor=None, limit=DEFAULT_LIMIT, fields=None):
+        # page() for async views (async ORM iteration).
+        qs, key, backwards = self._query(values_qs, cursor, limit)
+        return self._result([row async for row in qs], key, backwards, limit, fields)
@@ -0,0 +1,127 @@
+# students/renderers.py
+# JSON encoding for the api/ and export/ views.
+#
+#   renderer.dumps(obj) -> bytes   (UTF-8 JSON, compact separators)
+#   FastJsonResponse(data)         -> drop-in for JsonResponse built on renderer.dumps
+#
+# Two interchangeable renderers, picked by STUDENTS_JSON_RENDERER:
+#   "orjson" : orjson (C extension): encodes straight to bytes, and handles
+#              datetime / date / time / UUID itself
+#   "stdlib" : json.dumps with an encoder that produces the same output
+#   "auto"   : orjson when it is installed, stdlib otherwise (the default)
+# Both write datetimes as ISO 8601 ("Z" for UTC, microseconds kept), Decimals and
+# UUIDs as strings, timedeltas as ISO 8601 durations, and non-ASCII text as UTF-8.
+# The response body is the renderer's bytes, so there is no extra str -> bytes copy.
+#
+# List payload shapes (?shape= on the list APIs), built from values_list() tuples:
+#   records (default) : {"results": [{"col": v, ...}, ...]}
+#   columns           : {"columns": ["col", ...], "rows": [[v, ...], ...]}
+#   arrays            : {"columns": ["col", ...], "data": {"col": [v, ...], ...}}
+# columns / arrays do not repeat the field names on every row.
+
+import datetime
+import decimal
+import json
+import uuid
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.duration import duration_iso_string
+from django.utils.functional import Promise
+
+JSON_RENDERER = getattr(settings, "STUDENTS_JSON_RENDERER", "auto")
+
+
+def _default(obj):
+    # Types neither encoder handles itself.
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, datetime.timedelta):
+        return duration_iso_string(obj)
+    if isinstance(obj, Promise):     # lazy translation strings
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class _StdlibEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime.datetime):
+            text = obj.isoformat()
+            return text[:-6] + "Z" if text.endswith("+00:00") else text
+        if isinstance(obj, (datetime.date, datetime.time)):
+            return obj.isoformat()
+        if isinstance(obj, uuid.UUID):
+            return str(obj)
+        return _default(obj)
+
+
+class StdlibRenderer:
+    name = "stdlib"
+
+    def __init__(self):
+        self._encode = _StdlibEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+    def dumps(self, obj):
+        return self._encode(obj).encode("utf-8")
+
+
+class OrjsonRenderer:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._dumps = orjson.dumps
+        self._option = orjson.OPT_UTC_Z
+
+    def dumps(self, obj):
+        return self._dumps(obj, default=_default, option=self._option)
+
+
+RENDERERS = {
+    "stdlib": StdlibRenderer,
+    "orjson": OrjsonRenderer,
+}
+
+
+def get_renderer(name=JSON_RENDERER):
+    if name == "auto":
+        try:
+            return OrjsonRenderer()
+        except ImportError:
+            return StdlibRenderer()
+    return RENDERERS[name]()
+
+
+renderer = get_renderer()
+
+
+class FastJsonResponse(HttpResponse):
+    # JsonResponse, encoded by `renderer` (or the one passed as json_renderer).
+    # Same `safe` rule: only dicts unless safe=False.
+    def __init__(self, data, safe=True, json_renderer=None, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=(json_renderer or renderer).dumps(data), **kwargs)
+
+
+SHAPES = ("records", "columns", "arrays")
+
+
+def parse_shape(raw):
+    if raw in (None, ""):
+        return "records"
+    if raw not in SHAPES:
+        raise ValueError(f"shape must be one of: {', '.join(SHAPES)}.")
+    return raw
+
+
+def shape_rows(columns, rows, shape):
+    # rows: sequences of values in `columns` order -> part of the payload
+    columns = list(columns)
+    if shape == "columns":
+        return {"columns": columns, "rows": rows}
+    if shape == "arrays":
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        return {"columns": columns, "data": {c: list(v) for c, v in zip(columns, values)}}
+    return {"results": [dict(zip(columns, row)) for row in rows]}
@@ -0,0 +1,225 @@
+# students/search.py
+# Pluggable full-text search over Student first_name / last_name / nickname.
+#
+# The old search was `first_name__icontains | last_name__icontains | nickname__icontains`,
+# a leading-wildcard LIKE over three columns that always scans the whole table.
+# Backends (picked by DB vendor, or by settings.STUDENTS_SEARCH_BACKEND):
+#   - SQLiteFTS5Backend:    FTS5 virtual table with the trigram tokenizer, kept in
+#                           sync by triggers on students_student (development)
+#   - MySQLFullTextBackend: InnoDB FULLTEXT index with the ngram parser (production)
+#   - LikeSearchBackend:    the old icontains search, for any other database
+# Trigram / ngram matching keeps the old "substring anywhere" behaviour, but from an index.
+# Words shorter than the n-gram size can't be looked up in the index; they are
+# matched with LIKE on top of the index match (or alone, when every word is short).
+#
+# Views use two helpers:
+#   filter_students(qs, q)        -> every match, no ordering (index-backed)
+#   rank_students(qs, q, limit)   -> best `limit` matches (None: all), ordered by relevance
+# Both stay one SQL query: the relevance is a column of the match (FTS5 rank /
+# MATCH ... AGAINST), so no id list is pulled into Python and sent back.
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+SEARCH_MAX_RESULTS = getattr(settings, "STUDENTS_SEARCH_MAX_RESULTS", 500)
+
+
+class LikeSearchBackend:
+    # Fallback: the original icontains search (full scan, ordered by name).
+    def is_installed(self, conn):
+        return True
+
+    def install(self, conn):
+        pass
+
+    def uninstall(self, conn):
+        pass
+
+    def rebuild(self, conn):
+        pass
+
+    def like_filter(self, q):
+        return (
+            Q(first_name__icontains=q) |
+            Q(last_name__icontains=q) |
+            Q(nickname__icontains=q)
+        )
+
+    def filter(self, qs, q):
+        return qs.filter(self.like_filter(q))
+
+    def rank(self, qs, q):
+        return self.filter(qs, q).order_by("last_name", "first_name")
+
+
+class IndexedSearchBackend(LikeSearchBackend):
+    # Shared plumbing for the index-backed backends: they only provide
+    # match_query() and the two SQL snippets below.
+    min_token_length = 3
+    matching_sql = ""       # SELECT <student ids> ... (params: match query)
+    rank_sql = ""           # relevance of the students_student row (params: match query)
+    rank_descending = False
+
+    def tokens(self, q):
+        # -> (words the index can match, words too short for it)
+        words = q.split()
+        return (
+            [t for t in words if len(t) >= self.min_token_length],
+            [t for t in words if len(t) < self.min_token_length],
+        )
+
+    def match_query(self, tokens):
+        raise NotImplementedError
+
+    def filter(self, qs, q):
+        tokens, short = self.tokens(q)
+        if not tokens:
+            # Too short for the n-gram index: same result as before, via LIKE.
+            return super().filter(qs, q)
+        match = self.match_query(tokens)
+        qs = qs.filter(pk__in=RawSQL(self.matching_sql, [match]))
+        for t in short:
+            qs = qs.filter(self.like_filter(t))
+        return qs
+
+    def rank(self, qs, q):
+        # Ranked by the indexed words; short words only filter (see filter()).
+        tokens, short = self.tokens(q)
+        if not tokens:
+            return super().rank(qs, q)
+        relevance = RawSQL(self.rank_sql, [self.match_query(tokens)])
+        return (
+            self.filter(qs, q)
+            .annotate(search_rank=relevance)
+            .order_by("-search_rank" if self.rank_descending else "search_rank", "pk")
+        )
+
+
+class SQLiteFTS5Backend(IndexedSearchBackend):
+    table = "students_student_fts"
+
+    matching_sql = f"SELECT rowid FROM {table} WHERE {table} MATCH %s"
+    # bm25: more negative is more relevant
+    rank_sql = f"(SELECT rank FROM {table} WHERE {table} MATCH %s AND rowid = students_student.student_id)"
+
+    # External-content FTS5 table: stores only the index, reads text from students_student.
+    # NOTE: when a migration makes SQLite rebuild students_student the triggers are
+    # dropped with the old table; the post_migrate hook in apps.py re-installs them.
+    install_sql = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+                first_name, last_name, nickname,
+                content='students_student', content_rowid='student_id',
+                tokenize='trigram'
+            )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON students_student BEGIN
+                INSERT INTO {table}(rowid, first_name, last_name, nickname)
+                VALUES (new.student_id, new.first_name, new.last_name, new.nickname);
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON students_student BEGIN
+                INSERT INTO {table}({table}, rowid, first_name, last_name, nickname)
+                VALUES ('delete', old.student_id, old.first_name, old.last_name, old.nickname);
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE ON students_student BEGIN
+                INSERT INTO {table}({table}, rowid, first_name, last_name, nickname)
+                VALUES ('delete', old.student_id, old.first_name, old.last_name, old.nickname);
+                INSERT INTO {table}(rowid, first_name, last_name, nickname)
+                VALUES (new.student_id, new.first_name, new.last_name, new.nickname);
+            END""",
+    ]
+    uninstall_sql = [
+        f"DROP TRIGGER IF EXISTS {table}_ai",
+        f"DROP TRIGGER IF EXISTS {table}_ad",
+        f"DROP TRIGGER IF EXISTS {table}_au",
+        f"DROP TABLE IF EXISTS {table}",
+    ]
+
+    def match_query(self, tokens):
+        # Every token must appear (implicit AND); quoting makes them literal strings.
+        return " ".join('"' + t.replace('"', '""') + '"' for t in tokens)
+
+    def is_installed(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f"{self.table}_a_"],
+            )
+            return cursor.fetchone()[0] == 3
+
+    def install(self, conn):
+        with conn.cursor() as cursor:
+            for sql in self.install_sql:
+                cursor.execute(sql)
+        self.rebuild(conn)
+
+    def uninstall(self, conn):
+        with conn.cursor() as cursor:
+            for sql in self.uninstall_sql:
+                cursor.execute(sql)
+
+    def rebuild(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+
+class MySQLFullTextBackend(IndexedSearchBackend):
+    # InnoDB maintains FULLTEXT indexes itself, so there is nothing to keep in sync.
+    # ngram_token_size defaults to 2.
+    min_token_length = 2
+    index_name = "student_name_ft"
+    against = "MATCH(first_name, last_name, nickname) AGAINST (%s IN BOOLEAN MODE)"
+
+    matching_sql = f"SELECT student_id FROM students_student WHERE {against}"
+    rank_sql = against
+    rank_descending = True
+
+    def match_query(self, tokens):
+        # +"tok" = required phrase; with the ngram parser a phrase is a substring match.
+        return " ".join('+"' + t.replace('"', "") + '"' for t in tokens)
+
+    def is_installed(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = 'students_student' AND index_name = %s",
+                [self.index_name],
+            )
+            return cursor.fetchone()[0] > 0
+
+    def install(self, conn):
+        if self.is_installed(conn):
+            return
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE students_student ADD FULLTEXT INDEX {self.index_name} "
+                f"(first_name, last_name, nickname) WITH PARSER ngram"
+            )
+
+    def uninstall(self, conn):
+        if self.is_installed(conn):
+            with conn.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE students_student DROP INDEX {self.index_name}")
+
+
+VENDOR_BACKENDS = {
+    "sqlite": SQLiteFTS5Backend,
+    "mysql": MySQLFullTextBackend,
+}
+
+
+def backend_for(conn):
+    path = getattr(settings, "STUDENTS_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(conn.vendor, LikeSearchBackend)()
+
+
+def filter_students(qs, q):
+    return backend_for(connection).filter(qs, q.strip())
+
+
+def rank_students(qs, q, limit=None):
+    qs = backend_for(connection).rank(qs, q.strip())
+    return qs[:limit] if limit is not None else qs
@@ -0,0 +1,70 @@
+# students/signals.py
+# 1) Keeps the Section counters in step with instance.delete().
+#    Deletes go through Django's Collector (including the CASCADE from Student ->
+#    Enrollment), which sends pre_delete for every row inside its own transaction.
+#    The counters are decremented from the row as it is in the database (locked,
+#    like save() does), not from the instance, which may be stale. Inserts/updates
+#    are handled in the models' save().
+# 2) Clears the cached dashboard stats (students/stats.py) after any write.
+# 3) Bumps the table's DataVersion (models.py) after any write.
+# Student / Enrollment queryset.delete() does all three once for the whole delete
+# (SectionCountedQuerySet.delete()), so the receivers skip the rows it deletes.
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from students import stats
+from students.models import DataVersion, Student, Section, Enrollment, SectionCountedQuerySet
+
+
+def _counted_in_bulk(kwargs):
+    # True for the rows of a SectionCountedQuerySet.delete() (delete signals carry
+    # the instance or queryset the delete started from as `origin`).
+    return isinstance(kwargs.get("origin"), SectionCountedQuerySet)
+
+
+@receiver(pre_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    if _counted_in_bulk(kwargs):
+        return
+    row = (
+        Student.objects.using(kwargs["using"]).filter(pk=instance.pk).select_for_update()
+        .values("section_id").first()
+    )
+    if row is not None:     # None: already deleted by someone else
+        Section.objects.using(kwargs["using"]).filter(pk=row["section_id"]).bump(n_students=-1)
+
+
+@receiver(pre_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    if _counted_in_bulk(kwargs):
+        return
+    row = (
+        Enrollment.objects.using(kwargs["using"]).filter(pk=instance.pk).select_for_update()
+        .values("section_id", "is_active").first()
+    )
+    if row is not None:
+        Section.objects.using(kwargs["using"]).filter(pk=row["section_id"]).bump(
+            n_enrollments=-1,
+            n_active_enrollments=-int(row["is_active"]),
+        )
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=Section)
+def invalidate_stats(sender, **kwargs):
+    if _counted_in_bulk(kwargs):
+        return
+    # Wait for the commit so another request can't re-cache the old numbers.
+    transaction.on_commit(stats.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=Section)
+def bump_data_version(sender, **kwargs):
+    if _counted_in_bulk(kwargs):
+        return
+    DataVersion.bump(sender._meta.model_name)
@@ -0,0 +1,105 @@
+# students/stats.py
+# Shared dashboard aggregates (students per section, enrollments per section,
+# students per term) for the list pages, reports, JSON APIs and charts.
+#
+# Everything is built from ONE read of the Section counters and cached through
+# Django's cache framework. The cache is cleared by the Student / Enrollment /
+# Section save and delete signals (students/signals.py) and by the bulk
+# recount path (SectionQuerySet.recount), so a warm cache costs zero queries.
+#
+# The a*-prefixed functions are the same reads for async views (async cache +
+# async ORM), so an ASGI worker never blocks its event loop on them.
+
+from django.conf import settings
+from django.core.cache import cache
+
+from students.models import Section
+
+CACHE_KEY = "students:stats:v1"
+
+# Safety net for processes whose local cache missed an invalidation
+# (e.g. LocMemCache with several workers). Signals handle the normal case.
+CACHE_TIMEOUT = getattr(settings, "STUDENTS_STATS_CACHE_TIMEOUT", 300)
+
+
+def _section_rows():
+    return (
+        Section.objects
+        .values("code", "name", "term", "n_students", "n_enrollments", "n_active_enrollments")
+        .order_by("code")
+    )
+
+
+def _build(rows):
+    students_per_section = []
+    enrollments_per_section = []
+    per_term = {}
+
+    for row in rows:
+        students_per_section.append({
+            "code": row["code"],
+            "name": row["name"],
+            "n_students": row["n_students"],
+        })
+        enrollments_per_section.append({
+            "code": row["code"],
+            "n_all": row["n_enrollments"],
+            "n_active": row["n_active_enrollments"],
+        })
+        per_term[row["term"]] = per_term.get(row["term"], 0) + row["n_students"]
+
+    return {
+        "total_students": sum(r["n_students"] for r in rows),
+        "total_enrollments": sum(r["n_enrollments"] for r in rows),
+        "students_per_section": students_per_section,
+        "enrollments_per_section": enrollments_per_section,
+        "students_per_term": [
+            {"term": term, "n_students": n} for term, n in sorted(per_term.items())
+        ],
+    }
+
+
+def compute_stats():
+    return _build(list(_section_rows()))
+
+
+async def acompute_stats():
+    return _build([row async for row in _section_rows()])
+
+
+def get_stats():
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = compute_stats()
+        cache.set(CACHE_KEY, stats, CACHE_TIMEOUT)
+    return stats
+
+
+async def aget_stats():
+    stats = await cache.aget(CACHE_KEY)
+    if stats is None:
+        stats = await acompute_stats()
+        await cache.aset(CACHE_KEY, stats, CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+# Shortcuts used by the JSON APIs and the chart views, so a chart reads the same
+# in-process data as the API instead of calling the API over HTTP.
+def students_per_section():
+    return get_stats()["students_per_section"]
+
+
+def enrollments_per_section():
+    return get_stats()["enrollments_per_section"]
+
+
+async def astudents_per_section():
+    return (await aget_stats())["students_per_section"]
+
+
+async def aenrollments_per_section():
+    return (await aget_stats())["enrollments_per_section"]
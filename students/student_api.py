@@ -0,0 +1,113 @@
+# students/student_api.py
+# Query parameters of the student list APIs (api_students, StudentsAPI and the
+# async variants in students/views.py):
+#
+#   ?fields=student_id,email          projection, pushed into values_list()
+#   ?section=CS101-A,CS101-B          students of these sections (by code)
+#   ?term=Fall 2025                   students of sections in this term
+#   ?is_active=1 | 0                  with / without an active enrollment
+#                                     (in the ?section= sections when given)
+#   ?ordering=name | -name | email | -email | student_id | -student_id
+#   ?shape=, ?limit=, ?cursor=, ?paginate=0, ?q=   as before
+#
+# Every filter and ordering has an index behind it:
+#   name       -> student_last_first_idx (last_name, first_name) + pk
+#   email      -> the unique index on email
+#   student_id -> the primary key
+#   section    -> the section_id foreign-key index (+ unique Section.code)
+#   term       -> section_term_idx
+#   is_active  -> uniq_enrollment_per_student_per_section (student, section)
+# Anything else is rejected with InvalidQuery (400) instead of being served
+# with a full-table sort.
+
+from django.db.models import Exists, OuterRef
+
+from students.models import Enrollment, Student
+from students.pagination import KeysetPaginator, parse_limit
+from students.renderers import parse_shape
+
+FIELDS = (
+    "student_id", "first_name", "last_name",
+    "nickname", "email", "section__code",
+)
+
+# ?ordering= -> keyset paginator on that (unique) sort key; cursors remember the
+# ordering they came from, so one can't be replayed against another
+ORDERINGS = {
+    name: KeysetPaginator(key_fields, name=name)
+    for name, key_fields in {
+        "name": ["last_name", "first_name", "student_id"],
+        "-name": ["-last_name", "-first_name", "-student_id"],
+        "email": ["email"],
+        "-email": ["-email"],
+        "student_id": ["student_id"],
+        "-student_id": ["-student_id"],
+    }.items()
+}
+DEFAULT_ORDERING = "name"
+
+TRUE_VALUES = ("1", "true", "yes")
+FALSE_VALUES = ("0", "false", "no")
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def _csv(raw):
+    return [part.strip() for part in raw.split(",") if part.strip()]
+
+
+class StudentListQuery:
+    def __init__(self, params):
+        # params: request.GET. Raises InvalidQuery / InvalidPageRequest (both ValueErrors).
+        try:
+            self.shape = parse_shape(params.get("shape"))
+        except ValueError as e:
+            raise InvalidQuery(str(e))
+        self.q = (params.get("q") or "").strip()
+        self.paginated = params.get("paginate", "").lower() not in FALSE_VALUES
+        self.limit = parse_limit(params.get("limit")) if self.paginated else None
+        self.cursor = params.get("cursor")
+
+        self.fields = tuple(_csv(params.get("fields") or "")) or FIELDS
+        unknown = [f for f in self.fields if f not in FIELDS]
+        if unknown:
+            raise InvalidQuery(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(FIELDS)}.")
+
+        ordering = params.get("ordering")
+        self.ranked = bool(self.q) and not self.paginated and not ordering   # full-text rank order
+        ordering = ordering or DEFAULT_ORDERING
+        if ordering not in ORDERINGS:
+            raise InvalidQuery(f"ordering must be one of: {', '.join(ORDERINGS)}.")
+        self.paginator = ORDERINGS[ordering]
+
+        # values_list() columns: the requested fields, then any sort-key column the
+        # cursor needs but the client did not ask for (cut off again by rows()).
+        self.select = self.fields + tuple(f for f in self.paginator.key_fields if f not in self.fields)
+
+        self.sections = _csv(params.get("section") or "")
+        self.term = params.get("term")
+        is_active = (params.get("is_active") or "").lower()
+        if is_active and is_active not in TRUE_VALUES + FALSE_VALUES:
+            raise InvalidQuery("is_active must be 1 or 0.")
+        self.is_active = None if not is_active else is_active in TRUE_VALUES
+
+    def queryset(self):
+        # Filtered and ordered, before the ?q= search and pagination.
+        qs = Student.objects.all()
+        if self.sections:
+            qs = qs.filter(section__code__in=self.sections)
+        if self.term:
+            qs = qs.filter(section__term=self.term)
+        if self.is_active is not None:
+            active = Enrollment.objects.filter(student=OuterRef("pk"), is_active=True)
+            if self.sections:
+                active = active.filter(section__code__in=self.sections)
+            qs = qs.filter(Exists(active)) if self.is_active else qs.exclude(Exists(active))
+        return qs.order_by(*self.paginator.order_by())
+
+    def rows(self, rows):
+        # values_list() tuples -> only the requested fields
+        n = len(self.fields)
+        return rows if n == len(self.select) else [row[:n] for row in rows]
@@ -1,3 +1,1231 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import datetime
+import decimal
+import gzip
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your file1_1_dummy_data here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+import numpy as np
+from PIL import Image
+
+from students import (
+    chart_pillow, chart_render, chart_specs, charts, dataset_tables, datasets, exports, jobs, metrics,
+    renderers, search, stats, student_api, timeseries, weather,
+)
+from students.management.commands.bench_chart_engines import pixel_difference, sample_rows
+from students.models import (
+    DataSeries, DatasetFile, DataVersion, Enrollment, ExportJob, Section, SeriesPoint, Student,
+)
+
+LOOPBACK_HOSTS = {"localhost", "testserver", "127.0.0.1", "::1", "0.0.0.0"}
+
+
+def _simple_get_paths(patterns=None, prefix="/"):
+    # Every route of the site without URL parameters (admin excluded).
+    patterns = get_resolver().url_patterns if patterns is None else patterns
+    for p in patterns:
+        if isinstance(p, URLResolver):
+            if p.app_name != "admin" and not p.pattern.converters:
+                yield from _simple_get_paths(p.url_patterns, prefix + str(p.pattern))
+        elif isinstance(p, URLPattern) and not p.pattern.converters:
+            yield prefix + str(p.pattern)
+
+
+class NoLoopbackHTTPTests(TestCase):
+    # A view must never call our own site over HTTP: it needs a second worker and
+    # deadlocks a single-worker deployment. Share an in-process function instead.
+
+    @classmethod
+    def setUpTestData(cls):
+        section = Section.objects.create(code="CS101", name="Intro", term="FA25")
+        student = Student.objects.create(
+            first_name="Ada", last_name="Lovelace", email="ada@example.com", section=section,
+        )
+        Enrollment.objects.create(student=student, section=section)
+        cls.user = User.objects.create_user("tester", password="pw")
+
+    def setUp(self):
+        # the chart views draw inline, into a throwaway cache (not data/charts/)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = charts.ChartCache(charts.MemoryTier(2**20), charts.DiskTier(tmp.name, 2**20))
+        for name, value in (("render_cache", cache), ("render_service", charts.RenderService(0, 0, 10))):
+            patcher = mock.patch.object(charts, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_views_do_not_call_own_site(self):
+        attempts = []
+
+        def record_connect(sock, address, *args, **kwargs):
+            attempts.append(address)
+            raise OSError("network disabled in tests")
+
+        def record_getaddrinfo(host, *args, **kwargs):
+            attempts.append((host,))
+            raise OSError("network disabled in tests")
+
+        self.client.force_login(self.user)
+        self.client.raise_request_exception = False   # a failing view still counts as "visited"
+        paths = sorted(set(_simple_get_paths()) - {reverse("logout_urlpattern")})
+        with mock.patch.object(socket.socket, "connect", record_connect), \
+                mock.patch.object(socket, "getaddrinfo", record_getaddrinfo):
+            for path in paths:
+                self.client.get(path)
+
+        loopback = [a for a in attempts if str(a[0]) in LOOPBACK_HOSTS]
+        self.assertEqual(loopback, [], f"loopback HTTP call while rendering {paths}")
+
+    def test_enrollments_chart_uses_in_process_data(self):
+        self.client.force_login(self.user)
+        with mock.patch("urllib.request.urlopen", side_effect=AssertionError("self HTTP call")):
+            response = self.client.get(reverse("enrollments-chart-png"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+
+
+class SectionCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.a = Section.objects.create(code="CS101", name="A", term="FA25")
+        cls.b = Section.objects.create(code="CS102", name="B", term="FA25")
+
+    def setUp(self):
+        stats.invalidate()
+
+    def counters(self):
+        return {s.code: (s.n_students, s.n_enrollments, s.n_active_enrollments)
+                for s in Section.objects.order_by("code")}
+
+    def assertCounters(self, expected):
+        self.assertEqual(self.counters(), expected)
+        # and they agree with the real tables
+        Section.objects.recount()
+        self.assertEqual(self.counters(), expected)
+
+    def student(self, name, section):
+        return Student.objects.create(first_name=name, last_name=name, email=f"{name}@example.com", section=section)
+
+    def test_save_move_and_delete(self):
+        ada = self.student("ada", self.a)
+        bob = self.student("bob", self.a)
+        e1 = Enrollment.objects.create(student=ada, section=self.a)
+        Enrollment.objects.create(student=bob, section=self.a, is_active=False)
+        self.assertCounters({"CS101": (2, 2, 1), "CS102": (0, 0, 0)})
+
+        ada.section = self.b
+        ada.save()
+        e1.section, e1.is_active = self.b, False
+        e1.save()
+        self.assertCounters({"CS101": (1, 1, 0), "CS102": (1, 1, 0)})
+
+        e1.delete()
+        bob.delete()                      # cascades to bob's enrollment
+        self.assertCounters({"CS101": (0, 0, 0), "CS102": (1, 0, 0)})
+
+    def test_bulk_writes(self):
+        students = Student.objects.bulk_create(
+            [Student(first_name=n, last_name=n, email=f"{n}@example.com", section=self.a) for n in "xyz"]
+        )
+        Enrollment.objects.bulk_create([Enrollment(student=s, section=self.a) for s in students])
+        self.assertCounters({"CS101": (3, 3, 3), "CS102": (0, 0, 0)})
+
+        Student.objects.filter(first_name="x").update(section=self.b)
+        Enrollment.objects.filter(student__first_name="y").update(is_active=False)
+        self.assertCounters({"CS101": (2, 3, 2), "CS102": (1, 0, 0)})
+
+        Student.objects.filter(first_name__in=["y", "z"]).delete()
+        self.assertCounters({"CS101": (0, 1, 1), "CS102": (1, 0, 0)})
+
+    def test_queryset_delete_recounts_once(self):
+        students = [self.student(n, self.a) for n in "vwxyz"]
+        Enrollment.objects.bulk_create([Enrollment(student=s, section=self.b) for s in students])
+        versions = {t: dv.version for t, dv in DataVersion.current("student", "enrollment").items()}
+        with mock.patch.object(type(Section.objects.all()), "bump") as per_row, \
+                self.captureOnCommitCallbacks() as callbacks:
+            deleted, _ = Student.objects.filter(first_name__in=list("wxyz")).delete()   # + 4 enrollments
+        self.assertEqual(deleted, 8)
+        per_row.assert_not_called()
+        self.assertEqual(len(callbacks), 1)                 # the one stats invalidation of recount()
+        after = DataVersion.current("student", "enrollment")
+        self.assertEqual({t: dv.version - versions[t] for t, dv in after.items()}, {"student": 1, "enrollment": 1})
+        self.assertCounters({"CS101": (1, 0, 0), "CS102": (0, 1, 1)})
+
+    def test_delete_of_a_stale_instance(self):
+        ada = self.student("ada", self.a)
+        enrollment = Enrollment.objects.create(student=ada, section=self.a)
+        stale_student = Student.objects.get(pk=ada.pk)
+        stale_enrollment = Enrollment.objects.get(pk=enrollment.pk)
+
+        # changed behind the instances' backs
+        Student.objects.filter(pk=ada.pk).update(section=self.b)
+        Enrollment.objects.filter(pk=enrollment.pk).update(section=self.b, is_active=False)
+        self.assertCounters({"CS101": (0, 0, 0), "CS102": (1, 1, 0)})
+
+        stale_enrollment.delete()         # still says section A, active
+        stale_student.delete()
+        self.assertCounters({"CS101": (0, 0, 0), "CS102": (0, 0, 0)})
+
+    def test_stats_cache_is_cleared_on_commit(self):
+        self.assertEqual(stats.get_stats()["total_students"], 0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.student("ada", self.a)
+            self.assertEqual(stats.get_stats()["total_students"], 0)    # not committed yet
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(stats.get_stats()["total_students"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.bulk_create([Student(first_name="b", last_name="b", email="b@example.com",
+                                                 section=self.b)])
+        self.assertEqual(stats.get_stats()["total_students"], 2)
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            section = Section.objects.create(code=f"CS10{i}", name=f"S{i}", term="FA25")
+            for j in range(4):
+                student = Student.objects.create(
+                    first_name=f"F{j}", last_name=f"L{i}{j}", email=f"s{i}{j}@example.com", section=section,
+                )
+                Enrollment.objects.create(student=student, section=section, is_active=j % 2 == 0)
+        cls.user = User.objects.create_user("tester", password="pw")
+
+    def test_same_responses_as_sync_views(self):
+        self.client.force_login(self.user)
+        pairs = [
+            ("api-students", "api-async-students", "?limit=5"),
+            ("api-students", "api-async-class-students", "?limit=5"),
+            ("api-students-per-section", "api-async-students-per-section", ""),
+            ("api-enrollments-per-section", "api-async-enrollments-per-section", ""),
+            ("api-students", "api-async-students", "?limit=5&shape=columns"),
+            ("api-enrollments-per-section", "api-async-enrollments-per-section", "?shape=arrays"),
+        ]
+        for sync_name, async_name, query in pairs:
+            expected = self.client.get(reverse(sync_name) + query).json()
+            response = self.client.get(reverse(async_name) + query)
+            self.assertEqual(response.json(), expected, async_name)
+
+        first = self.client.get(reverse("api-async-students") + "?limit=5").json()
+        second = self.client.get(reverse("api-async-students") + f"?limit=5&cursor={first['next']}").json()
+        self.assertEqual(second, self.client.get(reverse("api-students") + f"?limit=5&cursor={first['next']}").json())
+
+    def test_columnar_shapes(self):
+        self.client.force_login(self.user)
+        url = reverse("api-students")
+        records = self.client.get(url + "?limit=5").json()
+        columns = self.client.get(url + "?limit=5&shape=columns").json()
+        arrays = self.client.get(url + "?limit=5&shape=arrays").json()
+        self.assertEqual([dict(zip(columns["columns"], row)) for row in columns["rows"]], records["results"])
+        self.assertEqual(arrays["data"]["last_name"], [r["last_name"] for r in records["results"]])
+        self.assertEqual((columns["next"], arrays["next"]), (records["next"], records["next"]))
+
+        everything = self.client.get(url + "?paginate=0&shape=columns").json()
+        self.assertEqual((everything["count"], len(everything["rows"])), (12, 12))
+        empty = self.client.get(url + "?q=nobody-by-that-name&shape=arrays").json()
+        self.assertEqual(empty["data"]["email"], [])
+        self.assertEqual(self.client.get(url + "?shape=table").status_code, 400)
+
+        enrollments = self.client.get(reverse("api-enrollments-per-section") + "?shape=arrays").json()
+        self.assertEqual(enrollments["data"], {"code": ["CS100", "CS101", "CS102"], "n_all": [4, 4, 4],
+                                               "n_active": [2, 2, 2]})
+
+    def test_fields_filters_and_ordering(self):
+        self.client.force_login(self.user)
+        url = reverse("api-students")
+
+        def get(query):
+            return self.client.get(url + query).json()
+
+        page = get("?fields=email&ordering=-email&limit=5")
+        self.assertEqual(list(page["results"][0]), ["email"])
+        rest = get(f"?fields=email&ordering=-email&limit=5&cursor={page['next']}")
+        emails = [r["email"] for r in page["results"] + rest["results"]]
+        self.assertEqual(emails, sorted(Student.objects.values_list("email", flat=True), reverse=True)[:10])
+        back = get(f"?fields=email&ordering=-email&limit=5&cursor={rest['prev']}")
+        self.assertEqual(back["results"], page["results"])
+
+        self.assertEqual(get("?section=CS101&paginate=0")["count"], 4)
+        self.assertEqual(get("?section=CS100,CS102&term=FA25&paginate=0")["count"], 8)
+        self.assertEqual(get("?term=SP26&paginate=0")["count"], 0)
+        self.assertEqual(get("?is_active=1&paginate=0")["count"], 6)
+        self.assertEqual(get("?is_active=0&section=CS100&paginate=0&fields=first_name")["results"],
+                         [{"first_name": "F1"}, {"first_name": "F3"}])
+        names = [r["last_name"] for r in get("?ordering=-name&paginate=0")["results"]]
+        self.assertEqual(names, sorted(names, reverse=True))
+
+        for bad in ("?ordering=first_name", "?fields=email,password", "?is_active=maybe"):
+            self.assertEqual(self.client.get(url + bad).status_code, 400, bad)
+
+    def test_bad_cursors_are_400(self):
+        self.client.force_login(self.user)
+
+        def cursor(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+        name_cursor = self.client.get(reverse("api-students") + "?limit=5").json()["next"]
+        cases = [
+            ("student_id", cursor({"k": ["x"], "d": "n"})),
+            ("student_id", cursor({"k": ["x"], "d": "n", "o": "student_id"})),
+            ("name", cursor({"k": [[1], {"a": 1}, None], "d": "n", "o": "name"})),
+            ("name", cursor({"k": [None, None, None], "d": "n", "o": "name"})),
+            ("name", cursor({"k": ["a", "b"], "d": "n", "o": "name"})),
+            ("student_id", name_cursor),          # made for another ordering
+            ("name", "not-base64!"),
+        ]
+        for name in ("api-students", "api-async-students"):
+            for ordering, token in cases:
+                response = self.client.get(reverse(name) + f"?ordering={ordering}&cursor={token}")
+                self.assertEqual(response.status_code, 400, (name, ordering, token))
+
+        ids = list(Student.objects.order_by("student_id").values_list("student_id", flat=True))
+        page = self.client.get(reverse("api-students") + f"?ordering=student_id&fields=student_id"
+                               f"&cursor={cursor({'k': [str(ids[2])], 'd': 'n', 'o': 'student_id'})}").json()
+        self.assertEqual([r["student_id"] for r in page["results"]], ids[3:])
+
+    def test_orderings_are_index_backed(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("query plans checked on SQLite")
+        for name, paginator in student_api.ORDERINGS.items():
+            for backwards in (False, True):
+                qs = Student.objects.values_list(*student_api.FIELDS).order_by(*paginator.order_by(backwards))
+                self.assertNotIn("TEMP B-TREE", qs[:100].explain(), name)
+
+    async def test_served_by_asgi_handler(self):
+        response = await self.async_client.get(reverse("api-async-class-students"))
+        self.assertEqual(response.status_code, 302)        # login required, checked with auser()
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("api-async-class-students") + "?paginate=0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 12)
+        response = await self.async_client.get(reverse("api-async-enrollments-per-section"))
+        self.assertEqual([r["n_active"] for r in response.json()["results"]], [2, 2, 2])
+
+
+class SearchTests(TestCase):
+    names = [("Ada", "Lovelace", "Countess"), ("Alan", "Turing", ""), ("Grace", "Hopper", "Amazing Grace"),
+             ("Li", "Wei", ""), ("Ada", "Li", "")]
+
+    @classmethod
+    def setUpTestData(cls):
+        section = Section.objects.create(code="CS101", name="Intro", term="FA25")
+        for i, (first, last, nick) in enumerate(cls.names):
+            Student.objects.create(first_name=first, last_name=last, nickname=nick,
+                                   email=f"s{i}@example.com", section=section)
+        for i in range(3):
+            Student.objects.create(first_name="Ada", last_name=f"Extra{i}", email=f"x{i}@example.com",
+                                   section=section)
+        cls.user = User.objects.create_user("tester", password="pw")
+
+    def matches(self, q, backend):
+        with self.settings(STUDENTS_SEARCH_BACKEND=backend):
+            filtered = sorted(search.filter_students(Student.objects.all(), q).values_list("last_name", flat=True))
+            ranked = list(search.rank_students(Student.objects.all(), q).values_list("last_name", flat=True))
+        self.assertEqual(sorted(ranked), filtered, (q, backend))
+        return filtered
+
+    def test_backends_agree(self):
+        backends = ["students.search.LikeSearchBackend"]
+        if connection.vendor == "sqlite":
+            backends.append("students.search.SQLiteFTS5Backend")
+        for backend in backends:
+            self.assertEqual(self.matches("ove", backend), ["Lovelace"])
+            self.assertEqual(self.matches("grace", backend), ["Hopper"])     # nickname, any case
+            self.assertEqual(self.matches("Li", backend), ["Li", "Wei"])     # shorter than a trigram
+            self.assertEqual(self.matches("zzz", backend), [])
+
+        if connection.vendor == "sqlite":
+            fts = "students.search.SQLiteFTS5Backend"
+            self.assertEqual(self.matches("Ada Li", fts), ["Li"])            # short word still has to match
+            self.assertEqual(self.matches("Ada", fts), ["Extra0", "Extra1", "Extra2", "Li", "Lovelace"])
+            with self.settings(STUDENTS_SEARCH_BACKEND=fts):
+                self.assertEqual(len(search.rank_students(Student.objects.all(), "Ada", 2)), 2)
+                self.assertEqual(len(search.rank_students(Student.objects.all(), "Ada Li", 2)), 1)
+                with self.assertNumQueries(1):   # ranked inside SQL, no id list round trip
+                    ranked = list(search.rank_students(Student.objects.all(), "Ada", 3).values_list("pk", flat=True))
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT rowid FROM {search.SQLiteFTS5Backend.table} "
+                               f"WHERE {search.SQLiteFTS5Backend.table} MATCH '\"Ada\"' ORDER BY rank, rowid LIMIT 3")
+                self.assertEqual(ranked, [row[0] for row in cursor.fetchall()])
+
+    def test_fts_index_follows_writes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("FTS5 is SQLite only")
+        with self.settings(STUDENTS_SEARCH_BACKEND="students.search.SQLiteFTS5Backend"):
+            Student.objects.filter(last_name="Turing").update(nickname="Enigma")
+            self.assertEqual(list(search.filter_students(Student.objects.all(), "enigm")
+                                  .values_list("last_name", flat=True)), ["Turing"])
+            Student.objects.filter(last_name="Turing").delete()
+            self.assertFalse(search.filter_students(Student.objects.all(), "enigm").exists())
+
+    def test_unpaginated_api_is_not_capped(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(search, "SEARCH_MAX_RESULTS", 2):
+            everything = self.client.get(reverse("api-students") + "?q=Ada&paginate=0").json()
+            page = self.client.get(reverse("student-list-url") + "?q=Ada")
+        self.assertEqual(everything["count"], 5)
+        self.assertEqual(len(page.context["search_results"]), 2)
+
+
+class JsonRendererTests(TestCase):
+    payload = {
+        "when": datetime.datetime(2025, 9, 1, 8, 30, 0, 123456, tzinfo=datetime.timezone.utc),
+        "naive": datetime.datetime(2025, 9, 1, 8, 30),
+        "day": datetime.date(2025, 9, 1),
+        "price": decimal.Decimal("12.50"),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "took": datetime.timedelta(minutes=90),
+        "name": "Zoë",
+        "rows": [1, 2.5, None, True],
+    }
+
+    def test_renderers_agree(self):
+        expected = renderers.StdlibRenderer().dumps(self.payload)
+        self.assertEqual(renderers.get_renderer("orjson").dumps(self.payload), expected)
+        self.assertEqual(json.loads(expected), {
+            "when": "2025-09-01T08:30:00.123456Z", "naive": "2025-09-01T08:30:00", "day": "2025-09-01",
+            "price": "12.50", "id": "12345678-1234-5678-1234-567812345678", "took": "P0DT01H30M00S",
+            "name": "Zoë", "rows": [1, 2.5, None, True],
+        })
+        self.assertIn("Zoë".encode(), expected)
+
+        response = renderers.FastJsonResponse({"ok": True})
+        self.assertEqual((response["Content-Type"], response.content), ("application/json", b'{"ok":true}'))
+        with self.assertRaises(TypeError):
+            renderers.FastJsonResponse([1, 2])
+
+    def test_streamed_exports_are_valid_json(self):
+        section = Section.objects.create(code="CS101", name="Intro", term="FA25")
+        for i, first in enumerate(["Ada", "Zoë", "Émile"]):
+            Student.objects.create(first_name=first, last_name=f"L{i}", email=f"s{i}@example.com", section=section)
+        fields = exports.STUDENT_EXPORT_FIELDS
+        for name in renderers.RENDERERS:
+            with mock.patch.object(renderers, "renderer", renderers.get_renderer(name)):
+                body = b"".join(exports.json_envelope_chunks(exports.student_export_rows(), fields, "now", 2))
+                lines = b"".join(exports.ndjson_chunks(exports.student_export_rows(), fields, 2)).splitlines()
+            rows = [dict(zip(fields, row)) for row in exports.student_export_rows()]
+            self.assertEqual(
+                body.decode(),
+                json.dumps({"generated_at": "now", "record_count": 3, "students": rows}, indent=2, ensure_ascii=False),
+            )
+            self.assertEqual([json.loads(line) for line in lines], rows)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = Section.objects.create(code="CS101", name="Intro", term="FA25")
+        for i, first in enumerate(["Ada", "Zoë", "Émile"]):
+            student = Student.objects.create(first_name=first, last_name=f"L{i}", email=f"s{i}@example.com",
+                                             section=cls.section)
+            Enrollment.objects.create(student=student, section=cls.section, is_active=i != 1)
+        cls.user = User.objects.create_user("tester", password="pw")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(jobs, "EXPORT_DIR", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_streamed_csv_ndjson_and_gzip(self):
+        with mock.patch.object(exports, "EXPORT_CHUNK_SIZE", 2):
+            plain = self.client.get(reverse("export-students-csv"))
+            zipped = self.client.get(reverse("export-students-csv"), HTTP_ACCEPT_ENCODING="gzip, br")
+            ndjson = self.client.get(reverse("export-students-json") + "?format=ndjson")
+        self.assertTrue(plain.streaming)
+        body = b"".join(plain.streaming_content)
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(zipped["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", zipped["Vary"])
+        self.assertEqual(gzip.decompress(b"".join(zipped.streaming_content)), body)
+
+        rows = list(csv.reader(StringIO(body.decode())))
+        self.assertEqual(rows[0], exports.STUDENT_EXPORT_COLUMNS)
+        self.assertEqual(sorted(r[1] for r in rows[1:]), ["Ada", "Zoë", "Émile"])
+        lines = b"".join(ndjson.streaming_content).splitlines()
+        self.assertEqual(ndjson["Content-Type"], "application/x-ndjson")
+        self.assertEqual(sorted(json.loads(line)["email"] for line in lines),
+                         ["s0@example.com", "s1@example.com", "s2@example.com"])
+
+    def test_parquet_and_arrow(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with mock.patch.object(exports, "COLUMNAR_BATCH_ROWS", 2):
+            parquet = self.client.get(reverse("export-parquet", args=["students"]), HTTP_ACCEPT_ENCODING="gzip")
+            arrow = self.client.get(reverse("export-arrow", args=["enrollments"]))
+        self.assertFalse(parquet.has_header("Content-Encoding"))    # already compressed
+        students = pq.read_table(BytesIO(b"".join(parquet.streaming_content)))
+        self.assertEqual(students.column_names, [c for c, _ in exports.COLUMNAR_TABLES["students"][1]])
+        self.assertEqual(students.column("last_name").to_pylist(), ["L0", "L1", "L2"])
+        enrollments = pa.ipc.open_file(BytesIO(b"".join(arrow.streaming_content))).read_all()
+        self.assertEqual(enrollments.schema.field("enrolled_on").type, pa.date32())
+        self.assertEqual(enrollments.column("is_active").to_pylist(), [True, False, True])
+        self.assertEqual(self.client.get(reverse("export-arrow", args=["users"])).status_code, 404)
+
+    def run_worker(self):
+        job = jobs.claim_next_job()
+        return jobs.run_job(job) if job else None
+
+    def test_jobs_range_and_if_range(self):
+        with self.settings(ALLOWED_HOSTS=["testserver"]):
+            created = self.client.post(reverse("export-job-create"), {"table": "students", "format": "csv"})
+            self.assertEqual(created.status_code, 202)
+            job = self.run_worker()
+            self.assertEqual(job.status, ExportJob.DONE)
+            again = self.client.post(reverse("export-job-create"), {"table": "students", "format": "csv"})
+            self.assertEqual((again.status_code, again.json()["id"]), (200, str(job.pk)))
+
+            url = reverse("export-job-download", args=[job.pk])
+            full = self.client.get(url)
+            body = b"".join(full.streaming_content)
+            self.assertEqual((full.status_code, full["Accept-Ranges"], len(body)), (200, "bytes", job.size_bytes))
+
+            part = self.client.get(url, HTTP_RANGE="bytes=10-19")
+            self.assertEqual((part.status_code, part["Content-Range"]), (206, f"bytes 10-19/{len(body)}"))
+            self.assertEqual(b"".join(part.streaming_content), body[10:20])
+            tail = self.client.get(url, HTTP_RANGE="bytes=-5", HTTP_IF_RANGE=full["ETag"])
+            self.assertEqual(b"".join(tail.streaming_content), body[-5:])
+            changed = self.client.get(url, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"something-else"')
+            self.assertEqual(changed.status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={len(body)}-").status_code, 416)
+
+            # a newer version keeps the old file for the grace period, then removes it
+            Student.objects.create(first_name="Alan", last_name="Turing", email="alan@example.com",
+                                   section=self.section)
+            self.client.post(reverse("export-job-create"), {"table": "students", "format": "csv"})
+            newer = self.run_worker()
+            self.assertNotEqual(newer.artifact, job.artifact)
+            self.assertEqual(self.client.get(url).status_code, 200)
+            with mock.patch.object(jobs, "ARTIFACT_GRACE", 0):
+                jobs._remove_superseded_artifacts(newer)
+            self.assertEqual(self.client.get(url).status_code, 410)
+            self.assertTrue(jobs.artifact_path(newer).exists())
+
+    def test_failed_job_leaves_no_partial_file(self):
+        def broken():
+            yield b"student_id,first_name\n"
+            raise OSError("disk full")
+
+        jobs.request_export("students", "ndjson")
+        with mock.patch.dict(jobs.EXPORT_KINDS, {("students", "ndjson"): broken}):
+            job = self.run_worker()
+        self.assertEqual((job.status, job.error), (ExportJob.FAILED, "OSError: disk full"))
+        self.assertEqual(list(jobs.EXPORT_DIR.iterdir()), [])
+
+    def test_artifact_names_survive_a_counter_reset(self):
+        tables = jobs.EXPORT_SOURCES["students"]
+        counts = {t: dv.version for t, dv in DataVersion.current(*tables).items()}
+        before = jobs.data_version_for("students")
+        DataVersion.objects.all().delete()            # e.g. a new database
+        for table, count in counts.items():
+            for _ in range(count):
+                DataVersion.bump(table)
+        self.assertEqual({t: dv.version for t, dv in DataVersion.current(*tables).items()}, counts)
+        self.assertNotEqual(jobs.data_version_for("students"), before)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = Section.objects.create(code="CS101", name="Intro", term="FA25")
+        Student.objects.create(first_name="Ada", last_name="Lovelace", email="ada@example.com", section=cls.section)
+        cls.user = User.objects.create_user("tester", password="pw")
+
+    def test_unchanged_data_is_a_304_before_any_query(self):
+        url = reverse("api-students-per-section")
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first["ETag"].startswith('W/"'))
+        self.assertIn("no-cache", first["Cache-Control"])
+
+        with self.assertNumQueries(1):        # the DataVersion read
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual((again.status_code, again.content, again["ETag"]), (304, b"", first["ETag"]))
+        # ETag only: a Last-Modified (whole seconds) would 304 a write made in the same second
+        self.assertFalse(first.has_header("Last-Modified"))
+        since = self.client.get(url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+        self.assertEqual(since.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):     # stats cache cleared on commit
+            Student.objects.create(first_name="Alan", last_name="Turing", email="alan@example.com",
+                                   section=self.section)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+        self.assertEqual(changed.json()["counts"], [2])
+
+    def test_lost_versions_never_revalidate(self):
+        url = reverse("api-students-per-section")
+        DataVersion.objects.all().delete()            # never written / new database
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        DataVersion.objects.all().delete()            # the counters start again from 0
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again["ETag"], first["ETag"])
+
+    def test_exports_and_student_apis(self):
+        self.client.force_login(self.user)
+        for name in ("export-students-csv", "api-students", "api-async-class-students"):
+            first = self.client.get(reverse(name))
+            self.assertEqual(self.client.get(reverse(name), HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304, name)
+        bad = self.client.get(reverse("api-async-students") + "?ordering=nickname")
+        self.assertEqual(bad.status_code, 400)
+        self.assertFalse(bad.has_header("ETag"))
+
+    async def test_async_view(self):
+        url = reverse("api-async-enrollments-per-section")
+        first = await self.async_client.get(url)
+        again = await self.async_client.get(url, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual((first.status_code, again.status_code), (200, 304))
+
+
+class ChartRenderCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = Section.objects.create(code="CS101", name="Intro", term="FA25")
+        cls.user = User.objects.create_user("tester", password="pw")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = charts.ChartCache(charts.MemoryTier(2**20), charts.DiskTier(tmp.name, 2**20))
+        patcher = mock.patch.object(charts, "render_cache", cache)
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.user)
+
+    def test_renders_once_per_data_change_and_revalidates(self):
+        url = reverse("chart-sections")
+        first = self.client.get(url)
+        again = self.client.get(url)
+        self.assertEqual(first.content, again.content)
+        self.assertEqual(first["ETag"], again["ETag"])
+        self.assertEqual(self.cache.renders, 1)
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(first_name="A", last_name="B", email="a@b.c", section=self.section)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+        self.assertEqual(self.cache.renders, 2)
+
+    def test_busy_renderer_returns_placeholder(self):
+        with mock.patch.object(charts, "render_service", charts.RenderService(1, 0, 1)):
+            response = self.client.get(reverse("chart-sections"))
+            svg = self.client.get(reverse("chart-sections"), {"format": "svg"})
+            webp = self.client.get(reverse("chart-sections"), HTTP_ACCEPT="image/webp,*/*;q=0.8")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Cache-Control"], "no-store")
+        self.assertEqual(self.cache.renders, 0)
+        self.assertEqual((svg.status_code, svg["Content-Type"]), (503, "image/svg+xml"))
+        self.assertTrue(svg.content.startswith(b"<svg"))
+        self.assertEqual((webp.status_code, webp["Content-Type"]), (503, "image/webp"))
+        self.assertEqual(Image.open(BytesIO(webp.content)).format, "WEBP")
+
+    def test_render_service_counts_renders_until_they_finish(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        def slow_render(*args):
+            time.sleep(0.3)
+            return b"png"
+
+        service = charts.RenderService(1, 1, 0.05)
+        pool = service._pool = ThreadPoolExecutor(1)
+        service._pool_pid = os.getpid()
+        self.addCleanup(pool.shutdown)
+        with mock.patch.object(chart_render, "render", slow_render):
+            with self.assertRaises(charts.ChartBusy):
+                service.render("sections", [])
+            self.assertEqual(service.pending, 1)      # the worker is still drawing it
+            with self.assertRaises(charts.ChartBusy):
+                service.render("sections", [])        # so the queue is still full
+            pool.shutdown(wait=True)
+        self.assertEqual(service.pending, 0)
+
+        broken = mock.Mock(submit=mock.Mock(side_effect=BrokenProcessPool()))
+        service._pool = broken
+        with self.assertRaises(charts.ChartBusy):
+            service.render("sections", [])
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        self.assertIsNone(service._pool)
+        self.assertEqual(service.pending, 0)
+
+    def test_waiting_for_the_same_render_is_bounded(self):
+        started, finish = threading.Event(), threading.Event()
+
+        def slow_render():
+            started.set()
+            finish.wait(5)
+            return b"png"
+
+        first = threading.Thread(target=self.cache.get_or_render, args=("k", slow_render))
+        first.start()
+        self.addCleanup(first.join)
+        self.addCleanup(finish.set)
+        started.wait(5)
+        self.cache.wait = 0.05
+        with self.assertRaises(charts.ChartBusy):
+            self.cache.get_or_render("k", lambda: b"other")
+        finish.set()
+        first.join()
+        self.assertEqual(self.cache.get_or_render("k", lambda: b"other"), b"png")
+        self.assertEqual(self.cache.renders, 1)
+
+    def test_engine_parameter(self):
+        url = reverse("enrollments-chart-png")
+        fast = self.client.get(url, {"engine": "pillow"})
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast["Content-Type"], "image/png")
+        self.assertEqual(self.client.get(url, {"engine": "gnuplot"}).status_code, 400)
+
+    def test_format_resolution_and_negotiation(self):
+        url = reverse("chart-sections")
+        svg = self.client.get(url, {"engine": "pillow", "format": "svg"})
+        self.assertEqual(svg["Content-Type"], "image/svg+xml")
+        self.assertTrue(svg.content.startswith(b"<svg"))
+
+        small = self.client.get(url, {"engine": "pillow", "w": "640"})
+        self.assertEqual(Image.open(BytesIO(small.content)).size[0], 640)
+        retina = self.client.get(url, {"engine": "pillow", "dpi": "300"})
+        self.assertEqual(Image.open(BytesIO(retina.content)).size[0], 1800)
+        self.assertEqual(len({svg["ETag"], small["ETag"], retina["ETag"]}), 3)
+
+        for bad in ({"w": "641"}, {"dpi": "5000"}, {"format": "gif"}):
+            self.assertEqual(self.client.get(url, bad).status_code, 400)
+
+        chrome = "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8"
+        webp = self.client.get(url, {"engine": "pillow"}, HTTP_ACCEPT=chrome)
+        self.assertEqual(webp["Content-Type"], "image/webp")
+        self.assertIn("Accept", webp["Vary"])
+        self.assertEqual(self.client.get(url, {"engine": "pillow"}, HTTP_ACCEPT="*/*")["Content-Type"], "image/png")
+
+    def test_tiers_evict_least_recently_used(self):
+        memory = charts.MemoryTier(max_bytes=10)
+        memory.put("a", b"12345")
+        memory.put("b", b"12345")
+        memory.get("a")
+        memory.put("c", b"12345")
+        self.assertIsNone(memory.get("b"))
+        self.assertEqual(memory.get("a"), b"12345")
+
+
+class DatasetTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.precompressed = Path(tmp.name)
+        patcher = mock.patch.object(datasets, "PRECOMPRESSED_DIR", self.precompressed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        datasets._variant.cache_clear()
+
+    def rows(self, response):
+        body = response.content
+        if response.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return list(csv.reader(body.decode().splitlines()))
+
+    def test_page_is_a_shell_with_lazy_specs(self):
+        with self.settings(ALLOWED_HOSTS=["testserver"]):
+            response = self.client.get(reverse("chart-vega-lite"))
+            page = response.content.decode()
+            specs = {name: self.client.get(reverse("chart-vega-lite-spec", args=[name]))
+                     for name in chart_specs.names()}
+            again = self.client.get(reverse("chart-vega-lite-spec", args=["vlSpec4"]),
+                                    HTTP_IF_NONE_MATCH=specs["vlSpec4"]["ETag"])
+            missing = self.client.get(reverse("chart-vega-lite-spec", args=["nope"]))
+        self.assertIn("max-age=600", response["Cache-Control"])
+        self.assertNotIn("raw.githubusercontent.com", page)
+        self.assertNotIn("/datasets/", page)           # no data (and no digests) in the shell
+        self.assertEqual(page.count('class="vega-lazy"'), 6)
+        for name, spec in specs.items():
+            self.assertIn(reverse("chart-vega-lite-spec", args=[name]), page)
+            data = spec.json()["data"]
+            self.assertTrue(data["url"].startswith(f"/datasets/{name}.{datasets.source(name).digest}"))
+            self.assertEqual(data["format"], {"type": "csv"})
+            self.assertEqual(spec["Cache-Control"], datasets.REVALIDATE)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_hashed_url_is_immutable_and_compressed(self):
+        with self.settings(ALLOWED_HOSTS=["testserver"]):
+            url = datasets.dataset_url("vlSpec6")
+            plain = self.client.get(url)
+            zipped = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+            again = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=zipped["ETag"])
+            stale = self.client.get(url.replace(datasets.source("vlSpec6").digest, "0" * 12))
+            latest = self.client.get(reverse("dataset", args=["vlSpec6"]))
+        self.assertEqual(plain["Cache-Control"], datasets.IMMUTABLE)
+        self.assertEqual(zipped["Content-Encoding"], "gzip")
+        self.assertLess(len(zipped.content), len(plain.content) / 3)
+        self.assertEqual(self.rows(zipped), self.rows(plain))
+        self.assertIn("Accept-Encoding", zipped["Vary"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(stale.status_code, 404)
+        self.assertEqual(latest["Cache-Control"], datasets.REVALIDATE)
+        self.assertEqual(latest.content, plain.content)
+
+    def test_transforms(self):
+        with self.settings(ALLOWED_HOSTS=["testserver"]):
+            everything = self.rows(self.client.get(reverse("dataset", args=["vlSpec4"])))
+            two = self.rows(self.client.get(datasets.dataset_url("vlSpec4", oneof="variable:male,female")))
+            totals = self.rows(self.client.get(datasets.dataset_url(
+                "vlSpec4", oneof="variable:male,female", groupby="variable", agg="sum:value,count",
+            )))
+            bad = self.client.get(reverse("dataset", args=["vlSpec4"]), {"groupby": "variable"})
+        self.assertEqual(two[0], everything[0])
+        self.assertEqual(len(two) - 1, sum(row[1] in ("male", "female") for row in everything[1:]))
+        self.assertEqual(totals[0], ["variable", "sum_value", "count"])
+        male = [float(row[2]) for row in everything[1:] if row[1] == "male"]
+        self.assertAlmostEqual(float(dict((r[0], r[1]) for r in totals[1:])["male"]), sum(male))
+        self.assertEqual(bad.status_code, 400)
+
+    def test_only_published_variants_get_the_best_encoding(self):
+        with mock.patch.object(datasets, "_compress", wraps=datasets._compress) as compress:
+            plain = datasets.load("vlSpec4")
+            again = datasets.Variant(plain.encodings["identity"], best=True)   # e.g. another process
+            custom = datasets.load("vlSpec4", datasets.parse_transform({"oneof": "variable:male"}))
+        self.assertEqual([call.args[1:] for call in compress.call_args_list], [datasets.BEST, datasets.FAST])
+        self.assertTrue((self.precompressed / f"{plain.etag}.gz").is_file())
+        self.assertEqual(again.encodings, plain.encodings)
+        self.assertEqual(gzip.decompress(custom.encodings["gzip"]), custom.encodings["identity"])
+
+
+class TimeSeriesTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.precompressed = Path(tmp.name)
+        patcher = mock.patch.object(datasets, "PRECOMPRESSED_DIR", self.precompressed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        timeseries._variant.cache_clear()
+
+    @staticmethod
+    def reference_lttb(x, y, threshold):
+        # the textbook loop, one point at a time
+        every = (len(x) - 2) / (threshold - 2)
+        kept, a = [0], 0
+        for i in range(threshold - 2):
+            lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+            nxt = range(hi, int((i + 2) * every) + 1) if i < threshold - 3 else [len(x) - 1]
+            cx = sum(x[j] for j in nxt) / len(nxt)
+            cy = sum(y[j] for j in nxt) / len(nxt)
+            areas = [abs((x[a] - cx) * (y[j] - y[a]) - (x[a] - x[j]) * (cy - y[a])) for j in range(lo, hi)]
+            a = lo + areas.index(max(areas))
+            kept.append(a)
+        return kept + [len(x) - 1]
+
+    def test_lttb(self):
+        rng = np.random.default_rng(7)
+        x = np.arange(1000)
+        y = rng.normal(size=1000).cumsum()
+        y[500] = 1000                                     # a spike must survive
+        for threshold in (3, 10, 97, 400):
+            kept = timeseries.lttb(x, y, threshold)
+            self.assertEqual(kept.tolist(), self.reference_lttb(x.tolist(), y.tolist(), threshold))
+        self.assertIn(500, timeseries.lttb(x, y, 20))
+        self.assertEqual(timeseries.lttb(x[:5], y[:5], 10).tolist(), [0, 1, 2, 3, 4])
+
+    def test_endpoint(self):
+        with self.settings(ALLOWED_HOSTS=["testserver"]):
+            url = reverse("dataset-series", args=["vlSpec4"])
+            everything = self.client.get(url, {"series": "male,female", "max_points": 5000})
+            response = self.client.get(url, {
+                "series": "male,female", "from": "2020-01-01", "to": "2020-06-30", "max_points": 40,
+            })
+            errors = [self.client.get(url, params).status_code for params in (
+                {"series": "nope"}, {"from": "January"}, {"max_points": 2}, {"max_points": "all"},
+            )] + [self.client.get(reverse("dataset-series", args=["vlSpec1"])).status_code]
+            hashed = self.client.get(timeseries.series_url("vlSpec6", max_points=100))
+        rows = list(csv.reader(response.content.decode().splitlines()))
+        self.assertEqual(rows[0], ["days", "variable", "value"])
+        for name in ("male", "female"):
+            days = [row[0] for row in rows[1:] if row[1] == name]
+            self.assertEqual(len(days), 32)   # max_points rounds down to a power of two
+            self.assertEqual(days, sorted(days))
+            self.assertTrue("2020-01-01" <= days[0] and days[-1] <= "2020-06-30")
+        self.assertEqual(everything.content.count(b"\n"), 2 * 559 + 1)
+        self.assertEqual(errors, [400] * 5)
+        self.assertEqual(hashed["Cache-Control"], datasets.IMMUTABLE)
+        self.assertEqual(hashed.content.count(b"\n"), 2 * 64 + 1)
+
+    def test_only_the_spec_series_gets_the_best_encoding(self):
+        src = datasets.source("vlSpec6")
+        table = timeseries._table(src)
+        spec = timeseries.published("vlSpec6", table)
+        with mock.patch.object(datasets, "_compress", wraps=datasets._compress) as compress:
+            timeseries.precompress("vlSpec6")
+            timeseries._variant(src, timeseries.parse_query({"max_points": 700}, table))
+            timeseries._variant(src, timeseries.parse_query({"max_points": 600}, table))   # same bucket
+        self.assertEqual(spec[-1], 1024)
+        self.assertEqual([call.args[1:] for call in compress.call_args_list], [datasets.BEST, datasets.FAST])
+        self.assertEqual(len(list(self.precompressed.glob("*.gz"))), 1)
+
+
+class DatasetTableTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        tmp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(tmp.cleanup)
+        cls.precompressed = Path(tmp.name)
+        patcher = mock.patch.object(datasets, "PRECOMPRESSED_DIR", cls.precompressed)
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        datasets._variant.cache_clear()
+        timeseries._variant.cache_clear()
+        call_command("load_datasets", stdout=StringIO())
+
+    def test_incremental_load(self):
+        out = StringIO()
+        call_command("load_datasets", stdout=out)
+        self.assertEqual(out.getvalue().count("unchanged"), len(dataset_tables.LAYOUTS))
+        published = len(dataset_tables.LAYOUTS) + len(timeseries.SERIES_DATASETS)
+        self.assertEqual(len(list(self.precompressed.glob("*.gz"))), published)
+        self.assertTrue(dataset_tables.ingest("vlSpec4", force=True).loaded)
+
+        self.assertEqual(DatasetFile.objects.get(name="vlSpec4").n_rows, 17329)
+        self.assertEqual(SeriesPoint.objects.filter(series__dataset="vlSpec4").count(), 17329)
+        self.assertEqual(list(DataSeries.objects.filter(dataset="vlSpec1").values_list("name", flat=True)), ["day_vol"])
+        # vlSpec6: two Brand series + the per-day volume columns, stored once per day
+        self.assertEqual(SeriesPoint.objects.filter(series__dataset="vlSpec6", series__name="Volume").count(), 702)
+
+    def test_api(self):
+        url = reverse("api-dataset-points", args=["vlSpec5"])
+        data = self.client.get(url, {"series": "volume,Twitter", "from": "2020-01-01", "to": "2020-01-31"}).json()
+        self.assertEqual(len(data["results"]), 62)
+        self.assertEqual(data["results"][0], {"series": "volume", "day": "2020-01-01", "value": data["results"][0]["value"]})
+        self.assertEqual(data["results"][-1]["day"], "2020-01-31")
+
+        countries = self.client.get(reverse("api-dataset-points", args=["vlSpec3"]), {"shape": "columns"}).json()
+        self.assertEqual(countries["columns"], ["series", "country", "value"])
+        self.assertIn(["geo_vol", "Canada", 246672.0], countries["rows"])
+
+        for params in ({"series": "nope"}, {"from": "yesterday"}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api-dataset-points", args=["vlSpec3"]), {"from": "2020-01-01"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api-dataset-points", args=["nope"])).status_code, 404)
+
+    def test_rolling_metrics(self):
+        metrics._dataset.cache_clear()
+        _, rows = metrics.compute("vlSpec6", ["Net Sentiment"], "mean", 20)
+        _, precomputed = metrics.compute("vlSpec6", ["20 Days Net Sentiment"], "mean", 2)
+        self.assertEqual([r[3] for r in rows[:19]], [None] * 19)
+        # the file's "20 Days Net Sentiment" is the trailing 20-day mean of "Net Sentiment"
+        # (checked up to the first day missing from the export, 2019-01-25)
+        first_gap = next(i for i in range(1, len(rows)) if (rows[i][1] - rows[i - 1][1]).days > 1)
+        self.assertGreater(first_gap, 80)
+        for ours, theirs in zip(rows[19:first_gap], precomputed[19:first_gap]):
+            self.assertEqual(ours[1], theirs[1])
+            self.assertAlmostEqual(ours[3], theirs[2], places=9)
+
+        _, rows = metrics.compute("vlSpec5", ["volume"], "zscore", 7, datetime.date(2020, 1, 1))
+        values = np.array([r[2] for r in metrics.compute("vlSpec5", ["volume"], "mean", 2)[1]])
+        days = [r[1] for r in metrics.compute("vlSpec5", ["volume"], "mean", 2)[1]]
+        i = days.index(datetime.date(2020, 1, 1))
+        window = values[i - 6:i + 1]
+        self.assertEqual(rows[0][1], datetime.date(2020, 1, 1))
+        self.assertAlmostEqual(rows[0][3], (values[i] - window.mean()) / window.std(ddof=1), places=9)
+
+        _, rows = metrics.compute("vlSpec5", ["volume"], "standardize", start=datetime.date(2020, 1, 1))
+        standardized = np.array([r[3] for r in rows])
+        self.assertAlmostEqual(standardized.mean(), 0, places=9)
+        self.assertAlmostEqual(standardized.std(ddof=1), 1, places=9)
+
+    def test_metrics_api(self):
+        import pyarrow as pa
+
+        url = reverse("api-dataset-metrics", args=["vlSpec5"])
+        data = self.client.get(url, {"series": "volume", "metric": "mean", "window": 7, "shape": "columns"}).json()
+        self.assertEqual(data["columns"], ["series", "day", "value", "mean"])
+        self.assertEqual(len(data["rows"]), 559)
+        response = self.client.get(url, {"series": "volume,Twitter", "metric": "zscore", "format": "arrow"})
+        table = pa.ipc.open_file(pa.BufferReader(response.content)).read_all()
+        self.assertEqual((table.num_rows, table.column_names), (2 * 559, ["series", "day", "value", "zscore"]))
+        for params in ({"metric": "median"}, {"window": 1}, {"window": "week"}, {"format": "xml"}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api-dataset-metrics", args=["vlSpec3"])).status_code, 400)
+
+    def test_range_queries_use_the_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("query plans checked on SQLite")
+        ids = DataSeries.objects.filter(dataset="vlSpec4", name__in=["male", "female"]).values_list("series_id", flat=True)
+        qs = (SeriesPoint.objects.filter(series_id__in=list(ids), day__range=("2020-01-01", "2020-03-31"))
+              .order_by("series_id", "day"))
+        plan = qs.explain()
+        self.assertIn("(series_id=? AND day>? AND day<?)", plan)   # the (series, day) unique index
+        self.assertNotIn("TEMP B-TREE", plan)
+        plan = SeriesPoint.objects.filter(day__range=("2020-01-01", "2020-01-31")).explain()
+        self.assertIn("seriespoint_day_idx", plan)
+
+
+class PillowEngineTests(SimpleTestCase):
+    def test_palette_png_is_less_than_half_of_truecolor(self):
+        rows = sample_rows(12)
+        quantised = chart_render.render("enrollments", rows, "png")
+        truecolor = BytesIO()
+        Image.open(BytesIO(quantised)).convert("RGB").save(truecolor, format="PNG")
+        # the 24-bit image of the same pixels; matplotlib's own RGBA PNG is larger still
+        self.assertLess(len(quantised), len(truecolor.getvalue()) / 2)
+
+    def test_matches_matplotlib_within_tolerance(self):
+        rows = sample_rows(12)
+        for chart in chart_render.RENDERERS:
+            with self.subTest(chart=chart):
+                reference = chart_render.render(chart, rows)
+                fast = chart_pillow.RENDERERS[chart](rows)
+                self.assertLess(pixel_difference(reference, fast), 0.06)
+
+
+class StubWeatherServer:
+    # Local stand-in for api.open-meteo.com with injectable latency and errors.
+    def __init__(self):
+        self.delay = 0.0
+        self.status = 200
+        self.body = None      # bytes to send instead of the usual JSON
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits += 1
+                time.sleep(stub.delay)
+                body = stub.body or json.dumps({"current_weather": {"temperature": 21.5, "hit": stub.hits}}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.handle_error = lambda request, address: None   # timed-out clients hang up
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/forecast"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class WeatherClientTests(SimpleTestCase):
+    def setUp(self):
+        self.stub = StubWeatherServer()
+        self.addCleanup(self.stub.close)
+        self.now = 1000.0
+        self.breaker = weather.CircuitBreaker(max_failures=2, reset_after=100, clock=lambda: self.now)
+        self.client = weather.WeatherClient(
+            url=self.stub.url, ttl=10, stale=60, timeout=0.5, breaker=self.breaker,
+            key_prefix=f"test:weather:{id(self)}", clock=lambda: self.now,
+        )
+        self.addCleanup(cache.delete_many, [self.client.value_key, self.client.lease_key])
+
+    def expire_lease(self):
+        cache.delete(self.client.lease_key)   # what the TTL window passing does
+
+    def wait_for_refresh(self):
+        deadline = time.monotonic() + 2
+        while self.client._inflight is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_burst_makes_one_upstream_call(self):
+        self.stub.delay = 0.2
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.client.current())) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.stub.hits, 1)
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(data["temperature"] == 21.5 for data, _ in results))
+
+    def test_async_burst_makes_one_upstream_call(self):
+        self.stub.delay = 0.2
+
+        async def burst():
+            return await asyncio.gather(*[self.client.acurrent() for _ in range(20)])
+
+        results = asyncio.run(burst())
+        self.assertEqual(self.stub.hits, 1)
+        self.assertTrue(all(data["temperature"] == 21.5 for data, _ in results))
+        self.assertEqual(self.client.current(), ({"temperature": 21.5, "hit": 1}, False))   # shared cache
+
+    def test_async_failure_and_timeout(self):
+        self.stub.status = 500
+        with self.assertRaises(weather.WeatherUnavailable):
+            asyncio.run(self.client.acurrent())
+        self.assertEqual(self.breaker.failures, 1)
+
+        self.expire_lease()
+        self.stub.status, self.stub.delay = 200, 1.0
+        began = time.monotonic()
+        with self.assertRaises(weather.WeatherUnavailable):
+            asyncio.run(self.client.acurrent())
+        self.assertLess(time.monotonic() - began, 0.9)
+
+    def test_cancelled_async_fetch_releases_the_lease(self):
+        self.stub.delay = 1.0
+
+        async def cancel_midway():
+            task = self.client._arefresh()
+            await asyncio.sleep(0.1)          # the request is in flight
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(cancel_midway())
+        self.assertEqual(cache.get(self.client.lease_key), weather.RETRY)
+        self.assertEqual(self.breaker.failures, 1)
+        self.assertIn("CancelledError", self.client.last_error)
+
+        # a half-open trial that is cancelled opens the circuit again
+        self.breaker.state, self.breaker.opened_at = weather.CircuitBreaker.OPEN, self.now - 100
+        self.expire_lease()
+        asyncio.run(cancel_midway())
+        self.assertEqual(self.breaker.state, weather.CircuitBreaker.OPEN)
+
+    def test_stale_while_revalidate(self):
+        self.client.current()
+        self.now += 15                       # past the TTL, inside the stale window
+        self.expire_lease()
+        self.stub.delay = 0.3
+        began = time.monotonic()
+        data, stale = self.client.current()
+        self.assertLess(time.monotonic() - began, 0.2)   # did not wait for upstream
+        self.assertTrue(stale)
+        self.assertEqual(data["hit"], 1)
+        self.wait_for_refresh()
+        self.assertEqual(self.stub.hits, 2)
+        self.assertEqual(self.client.current(), ({"temperature": 21.5, "hit": 2}, False))
+
+    def test_async_refresh_in_the_request_without_asgi(self):
+        asyncio.run(self.client.acurrent())
+        self.now += 15                       # stale
+        self.expire_lease()
+        # an event loop that ends with the request: refreshed before returning
+        self.assertEqual(asyncio.run(self.client.acurrent(background=False)),
+                         ({"temperature": 21.5, "hit": 2}, False))
+        self.assertEqual(self.stub.hits, 2)
+
+    def test_one_attempt_per_ttl_window(self):
+        self.stub.status = 500
+        for _ in range(5):
+            with self.assertRaises(weather.WeatherUnavailable):
+                self.client.current()
+        self.assertEqual(self.stub.hits, 1)
+
+    def test_failed_attempt_is_retried_after_the_retry_delay(self):
+        self.client.retry_after = 0.2
+        self.stub.status = 500
+        with self.assertRaises(weather.WeatherUnavailable):
+            self.client.current()
+        with self.assertRaises(weather.WeatherUnavailable):
+            self.client.current()             # inside the retry delay: no call
+        self.assertEqual(self.stub.hits, 1)
+
+        time.sleep(0.25)
+        self.stub.status = 200
+        self.assertEqual(self.client.current(), ({"temperature": 21.5, "hit": 2}, False))
+
+    def test_waits_for_another_workers_call(self):
+        cache.set(self.client.lease_key, weather.FETCHING, 10)    # another worker is fetching
+
+        def other_worker_finishes():
+            time.sleep(0.2)
+            cache.set(self.client.value_key, {"data": {"temperature": 3.0}, "fetched_at": self.now}, 100)
+            cache.set(self.client.lease_key, weather.DONE, 10)
+
+        threading.Thread(target=other_worker_finishes).start()
+        self.assertEqual(self.client.current(), ({"temperature": 3.0}, False))
+        self.assertEqual(self.stub.hits, 0)
+
+        cache.delete(self.client.value_key)
+        cache.set(self.client.lease_key, weather.FETCHING, 10)
+        threading.Thread(target=other_worker_finishes).start()
+        self.assertEqual(asyncio.run(self.client.acurrent()), ({"temperature": 3.0}, False))
+        self.assertEqual(self.stub.hits, 0)
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        self.client.current()
+        self.stub.status = 500
+        for _ in range(2):                   # two failed refreshes open the circuit
+            self.now += 15
+            self.expire_lease()
+            self.client._refresh(wait=True)
+        self.assertEqual(self.breaker.state, weather.CircuitBreaker.OPEN)
+
+        self.now += 15
+        self.expire_lease()
+        data, stale = self.client.current()  # still serving the last good value
+        self.assertTrue(stale)
+        self.assertEqual(self.stub.hits, 3)  # no call while open
+
+        self.stub.status = 200
+        self.now += 100
+        self.expire_lease()
+        self.client._refresh(wait=True)      # half-open trial succeeds
+        self.assertEqual(self.breaker.state, weather.CircuitBreaker.CLOSED)
+        self.assertEqual(self.stub.hits, 4)
+
+    def test_unexpected_payload_is_a_failed_attempt(self):
+        for body in (b"[1, 2]", b"null", b'{"current_weather": "sunny"}'):
+            self.breaker.state, self.breaker.opened_at = weather.CircuitBreaker.OPEN, self.now - 100
+            self.stub.body = body
+            self.expire_lease()
+            with self.assertRaises(weather.WeatherUnavailable):
+                self.client.current()
+            self.assertEqual(self.breaker.state, weather.CircuitBreaker.OPEN)
+            self.assertEqual(cache.get(self.client.lease_key), weather.RETRY)
+            self.assertIn("ValueError", self.client.last_error)   # the half-open trial failed
+        self.assertEqual(self.stub.hits, 3)
+
+        self.stub.body = b"[]"
+        self.expire_lease()
+        self.breaker.state = weather.CircuitBreaker.CLOSED
+        with self.assertRaises(weather.WeatherUnavailable):
+            asyncio.run(self.client.acurrent())
+        self.assertEqual(cache.get(self.client.lease_key), weather.RETRY)
+
+    def test_slow_upstream_times_out(self):
+        self.stub.delay = 1.0
+        began = time.monotonic()
+        with self.assertRaises(weather.WeatherUnavailable):
+            self.client.current()
+        self.assertLess(time.monotonic() - began, 0.9)
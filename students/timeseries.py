@@ -0,0 +1,173 @@
+# students/timeseries.py
+# Downsampled time series from the long-format Vega-Lite datasets (one row per
+# date and series), so a line / area chart gets about as many points as it has
+# pixels instead of every row in the file:
+#
+#   datasets/<name>.<digest>/series.csv?series=a,b&from=2020-01-01&to=2020-06-30&max_points=800
+#
+#   ?series=       series to keep (default: all of them)
+#   ?from= / ?to=  inclusive date range, YYYY-MM-DD
+#   ?max_points=   at most this many points per series (default DEFAULT_MAX_POINTS),
+#                  rounded down to a power of two so clients share a few variants
+#
+# Each series is reduced with Largest-Triangle-Three-Buckets (lttb() below), which
+# keeps the peaks and troughs a chart would show. The answer is CSV with the same
+# columns as the source file (whole rows are kept, so tooltips still work), built
+# once per (file version, parameters) and then served from the datasets LRU with
+# the same gzip / br / ETag / Cache-Control handling as the plain files. Only the
+# query a chart spec links to gets the best compression (datasets.Variant).
+
+import csv
+import datetime
+import io
+from functools import lru_cache
+from urllib.parse import urlencode
+
+import numpy as np
+from django.urls import reverse
+
+from students import datasets
+
+# dataset -> (date column, series column, value column)
+SERIES_DATASETS = {
+    "vlSpec4": ("days", "variable", "value"),
+    "vlSpec6": ("Date", "Brand", "Value"),
+}
+DEFAULT_MAX_POINTS = 1000
+MAX_POINTS = 10_000
+MIN_POINTS = 4
+
+
+class Table:
+    # One long-format file as NumPy columns (parsed once per file version).
+    def __init__(self, src, date_column, series_column, value_column):
+        reader = csv.reader(io.StringIO(src.body.decode("utf-8-sig")))
+        self.header = next(reader)
+        self.rows = list(reader)
+        d, s, v = (self.header.index(c) for c in (date_column, series_column, value_column))
+        self.days = np.array([row[d] for row in self.rows], dtype="datetime64[D]")
+        self.series = np.array([row[s] for row in self.rows])
+        self.values = np.array([float(row[v]) if row[v] else np.nan for row in self.rows])
+        self.names = list(dict.fromkeys(self.series.tolist()))   # in file order
+
+
+@lru_cache(maxsize=len(SERIES_DATASETS) * 2)
+def _table(src):
+    return Table(src, *SERIES_DATASETS[src.name])
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: indices of `threshold` points of (x, y)
+    # (x ascending) that keep the shape of the line. The first and last points
+    # stay; the rest are split into threshold - 2 buckets and each bucket keeps
+    # the point making the largest triangle with the point kept before it and
+    # the average of the next bucket.
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # bucket i is x[edges[i]:edges[i + 1]]; all bucket averages in one pass
+    edges = (np.arange(threshold - 1) * (n - 2) // (threshold - 2) + 1).astype(np.intp)
+    sizes = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / sizes
+    avg_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / sizes
+    # the third corner for bucket i: the next bucket's average, the last point for the last bucket
+    cx = np.append(avg_x[1:], x[-1])
+    cy = np.append(avg_y[1:], y[-1])
+
+    keep = np.empty(threshold, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # twice the triangle area, for every candidate in the bucket at once
+        area = np.abs((ax - cx[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy[i] - ay))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def _date(raw, name):
+    try:
+        return np.datetime64(datetime.date.fromisoformat(raw), "D")
+    except ValueError:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD).")
+
+
+def parse_query(params, table):
+    # QueryDict -> canonical (series, from, to, max_points) tuple (the cache key). ValueError on bad input.
+    series = tuple(s.strip() for s in (params.get("series") or "").split(",") if s.strip()) or tuple(table.names)
+    unknown = [s for s in series if s not in table.names]
+    if unknown:
+        raise ValueError(f"Unknown series: {', '.join(unknown)}.")
+    start = _date(params["from"], "from") if params.get("from") else None
+    end = _date(params["to"], "to") if params.get("to") else None
+    try:
+        max_points = int(params.get("max_points") or DEFAULT_MAX_POINTS)
+    except ValueError:
+        raise ValueError("max_points must be an integer.")
+    if not MIN_POINTS <= max_points <= MAX_POINTS:
+        raise ValueError(f"max_points must be between {MIN_POINTS} and {MAX_POINTS}.")
+    return series, start, end, 1 << (max_points.bit_length() - 1)
+
+
+def downsample(table, series, start, end, max_points):
+    # Row numbers to send: per series, in date order, at most max_points each.
+    usable = ~np.isnan(table.values)
+    if start is not None:
+        usable &= table.days >= start
+    if end is not None:
+        usable &= table.days <= end
+    kept = []
+    for name in series:
+        rows = np.flatnonzero(usable & (table.series == name))
+        rows = rows[np.argsort(table.days[rows], kind="stable")]
+        kept.append(rows[lttb(table.days[rows].astype(np.int64), table.values[rows], max_points)])
+    return np.concatenate(kept) if kept else np.empty(0, dtype=np.intp)
+
+
+def published(name, table):
+    # The query the chart spec of `name` links to, or None.
+    from students import chart_specs   # chart_specs builds its URLs with this module
+
+    url_for, params = chart_specs.DATA.get(name, (None, {}))
+    return parse_query(params, table) if url_for is series_url else None
+
+
+@lru_cache(maxsize=datasets.CACHE_SIZE)
+def _variant(src, query):
+    table = _table(src)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(table.header)
+    writer.writerows(table.rows[i] for i in downsample(table, *query))
+    return datasets.Variant(out.getvalue().encode("utf-8"), best=query == published(src.name, table))
+
+
+def precompress(name):
+    # Build (and so write to datasets.PRECOMPRESSED_DIR) the series the chart spec of `name` uses.
+    if name not in SERIES_DATASETS:
+        return []
+    src = datasets.source(name)
+    query = published(name, _table(src))
+    return [_variant(src, query)] if query is not None else []
+
+
+def series_url(name, **params):
+    url = reverse("dataset-series-hashed", kwargs={"name": name, "digest": datasets.source(name).digest})
+    params = [(key, params[key]) for key in ("series", "from", "to", "max_points") if params.get(key)]
+    return f"{url}?{urlencode(params)}" if params else url
+
+
+def series_response(request, name, digest=None):
+    src = datasets.source(name, digest)
+    if name not in SERIES_DATASETS:
+        return datasets.bad_request(f"{name} is not a time-series dataset.")
+    try:
+        query = parse_query(request.GET, _table(src))
+    except ValueError as e:
+        return datasets.bad_request(e)
+    return datasets.send(request, _variant(src, query), immutable=digest is not None)
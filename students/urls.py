@@ -58,6 +58,13 @@ urlpatterns = [
     # WEEK 12: VEGA-LITE CHARTS DEMO
     # -----------------------------------------------------------------------------------
     path("charts/vega-lite/", VegaLiteAPI.as_view(), name="chart-vega-lite"),
+    path("charts/vega-lite/specs/<slug:name>.json", views.chart_spec, name="chart-vega-lite-spec"),
+    path("datasets/<slug:name>.csv", views.dataset_csv, name="dataset"),
+    path("datasets/<slug:name>.<slug:digest>.csv", views.dataset_csv, name="dataset-hashed"),
+    path("datasets/<slug:name>/series.csv", views.dataset_series, name="dataset-series"),
+    path("datasets/<slug:name>.<slug:digest>/series.csv", views.dataset_series, name="dataset-series-hashed"),
+    path("api/datasets/<slug:name>/", views.api_dataset_points, name="api-dataset-points"),
+    path("api/datasets/<slug:name>/metrics/", views.api_dataset_metrics, name="api-dataset-metrics"),
 
     # -----------------------------------------------------------------------------------
     # WEEK 8.5: EXTERNAL DATA FETCH (Weather API)
@@ -70,6 +77,11 @@ urlpatterns = [
     path("reports/", ReportsView.as_view(), name="export-reports-url"),
     path("export/students.csv", export_students_csv, name="export-students-csv"),
     path("export/students.json", export_students_json, name="export-students-json"),
+    path("export/<slug:table>.parquet", views.export_columnar, {"fmt": "parquet"}, name="export-parquet"),
+    path("export/<slug:table>.arrow", views.export_columnar, {"fmt": "arrow"}, name="export-arrow"),
+    path("export/jobs/", views.export_job_create, name="export-job-create"),
+    path("export/jobs/<uuid:job_id>/", views.export_job_status, name="export-job-status"),
+    path("export/jobs/<uuid:job_id>/download", views.export_job_download, name="export-job-download"),
 
     # -----------------------------------------------------------------------------------
     # WEEK 11: JSON API ENDPOINTS (Data for charts and AJAX)
@@ -81,6 +93,17 @@ urlpatterns = [
     path("api/sections/enrollments/", views.api_enrollments_per_section, name="api-enrollments-per-section"),
     path("api/class-students/", StudentsAPI.as_view(), name="api-students"),
 
+    # -----------------------------------------------------------------------------------
+    # ASYNC (ASGI) VARIANTS of the I/O-bound endpoints above (same responses)
+    # -----------------------------------------------------------------------------------
+    path("api/async/weather/", views.AsyncWeatherNow.as_view(), name="api-async-weather"),
+    path("api/async/function-students/", views.api_students_async, name="api-async-students"),
+    path("api/async/sections/students/", views.api_students_per_section_async,
+         name="api-async-students-per-section"),
+    path("api/async/sections/enrollments/", views.api_enrollments_per_section_async,
+         name="api-async-enrollments-per-section"),
+    path("api/async/class-students/", views.AsyncStudentsAPI.as_view(), name="api-async-class-students"),
+
 
 
 ]
\ No newline at end of file
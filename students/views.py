@@ -7,37 +7,48 @@
 
 # --- Week 4 / 5: Core Django + Models / Querysets / Aggregations ---
 from django.shortcuts import get_object_or_404, render, redirect
-from django.http import HttpResponse, JsonResponse
-from django.db.models import Count, Q
+from django.http import Http404, HttpResponse
 from django.views import View
 from django.views.generic import ListView, CreateView, TemplateView
-from django.urls import reverse, reverse_lazy
+from django.urls import reverse_lazy
+from django.conf import settings
 from datetime import datetime
-import csv
 import json
-import urllib.request
 
-# --- Week 6 / 7: Visualization and external data (matplotlib, requests) ---
-from io import BytesIO
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import requests
+# --- Week 6 / 7: Visualization and external data (matplotlib: students/charts.py, Open-Meteo: students/weather.py) ---
+from students import weather
 
 # --- Week 11: Export / Download, API-style JSON endpoints ---
-# (already covered above: JsonResponse, csv, datetime, json)
+# (already covered above: datetime, json; CSV writing lives in students/exports.py)
+# JSON responses of the api/ and export/ views: orjson when installed (students/renderers.py)
+from students.renderers import FastJsonResponse, parse_shape, shape_rows
 
 # --- Week 12: Authentication / LoginRequired / Signup flow ---
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth import login
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_page
+
+# --- Async (ASGI) variants of the JSON endpoints ---
+from django.core.handlers.asgi import ASGIRequest
 from .forms_auth import StudentSignUpForm
 
 # --- Forms (Week 10 form handling) ---
 from .forms import FeedbackForm, StudentForm
 
 # --- Our models (Week 3 data modeling and after) ---
-from students.models import Student, Section, Enrollment
+from students.models import Student, Section, Enrollment, ExportJob
+
+# --- Shared, cached dashboard aggregates + full-text student search ---
+from students import chart_specs, charts, dataset_tables, datasets, metrics, search, stats, timeseries
+from students.conditional import conditional_on
+from students.pagination import InvalidPageRequest
+from students.student_api import StudentListQuery
+
+# --- Streaming exports + background export jobs ---
+from students import exports, jobs
 
 
 # =======================================================================================
@@ -59,41 +70,20 @@ class StudentListView(LoginRequiredMixin, ListView):
         q = self.request.GET.get("q")
 
         if q:
-            search_qs = Student.objects.filter(first_name__icontains=q)
+            search_qs = search.rank_students(Student.objects.all(), q, search.SEARCH_MAX_RESULTS)
         else:
             search_qs = None
 
         ctx["q"] = q
         ctx["search_results"] = search_qs
-        ctx["total_students"] = Student.objects.count()
-        ctx["total_enrollments"] = Enrollment.objects.count()
-
-        ctx["students_per_section"] = (
-            Section.objects
-            .values("code", "name")
-            .annotate(n_students=Count("section_related_name"))
-            .order_by("code")
-        )
-
-        ctx["enrollments_per_section"] = (
-            Section.objects
-            .values("code")
-            .annotate(
-                n_enrolls=Count("enrollments_related_name"),
-                n_active=Count(
-                    "enrollments_related_name",
-                    filter=Q(enrollments_related_name__is_active=True)
-                ),
-            )
-            .order_by("code")
-        )
-
-        ctx["students_per_term"] = (
-            Section.objects
-            .values("term")
-            .annotate(n_students=Count("section_related_name"))
-            .order_by("term")
-        )
+        # Totals and per-section / per-term numbers come from the shared,
+        # cached stats service (zero queries on a warm cache).
+        dashboard = stats.get_stats()
+        ctx["total_students"] = dashboard["total_students"]
+        ctx["total_enrollments"] = dashboard["total_enrollments"]
+        ctx["students_per_section"] = dashboard["students_per_section"]
+        ctx["enrollments_per_section"] = dashboard["enrollments_per_section"]
+        ctx["students_per_term"] = dashboard["students_per_term"]
 
         return ctx
 
@@ -107,32 +97,10 @@ class SectionListView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
 
-        ctx["students_per_section"] = (
-            Section.objects
-            .annotate(n_students=Count("section_related_name"))
-            .values("code", "name", "n_students")
-            .order_by("code")
-        )
-
-        ctx["students_per_term"] = (
-            Section.objects
-            .values("term")
-            .annotate(n_students=Count("section_related_name"))
-            .order_by("term")
-        )
-
-        ctx["enrollments_per_section"] = (
-            Section.objects
-            .annotate(
-                n_enrolls=Count("enrollments_related_name"),
-                n_active=Count(
-                    "enrollments_related_name",
-                    filter=Q(enrollments_related_name__is_active=True)
-                ),
-            )
-            .values("code", "n_enrolls", "n_active")
-            .order_by("code")
-        )
+        dashboard = stats.get_stats()
+        ctx["students_per_section"] = dashboard["students_per_section"]
+        ctx["students_per_term"] = dashboard["students_per_term"]
+        ctx["enrollments_per_section"] = dashboard["enrollments_per_section"]
 
         return ctx
 
@@ -206,58 +174,90 @@ class StudentCreateView(LoginRequiredMixin, CreateView):
 # - export_students_csv(), export_students_json()
 # =======================================================================================
 
-def api_students(request):
-    q = (request.GET.get("q") or "").strip()
-    qs = Student.objects.all().values(
-        "student_id", "first_name", "last_name",
-        "nickname", "email", "section__code"
-    )
-
-    if q:
-        qs = Student.objects.filter(
-            Q(first_name__icontains=q) |
-            Q(last_name__icontains=q) |
-            Q(nickname__icontains=q)
-        ).values(
-            "student_id", "first_name", "last_name",
-            "nickname", "email", "section__code"
+def _students_api_response(request):
+    # Shared by api_students() and StudentsAPI.
+    #   default:       one page  -> {"count", "results", "next", "prev"}
+    #                  (?limit=, ?cursor=<next/prev from the previous page>)
+    #   ?paginate=0:   the original shape, every row -> {"count", "results"}
+    #   ?shape=columns / ?shape=arrays: "results" replaced by field names + bare
+    #                  values (see students/renderers.py), rows straight from values_list()
+    #   ?fields=, ?section=, ?term=, ?is_active=, ?ordering=: see students/student_api.py
+    try:
+        query = StudentListQuery(request.GET)
+    except ValueError as e:
+        return FastJsonResponse({"error": str(e)}, status=400)
+    qs = query.queryset()
+
+    if not query.paginated:
+        if query.ranked:
+            # Full-text index, best matches first (see students/search.py)
+            qs = search.rank_students(qs, query.q)
+        elif query.q:
+            qs = search.filter_students(qs, query.q)
+        rows = query.rows(list(qs.values_list(*query.select)))
+        return FastJsonResponse({"count": len(rows), **shape_rows(query.fields, rows, query.shape)})
+
+    if query.q:
+        # Pages are in sort-key order, so every match is reachable by cursor.
+        qs = search.filter_students(qs, query.q)
+
+    try:
+        rows, next_cursor, prev_cursor = query.paginator.page(
+            qs.values_list(*query.select), cursor=query.cursor, limit=query.limit, fields=query.select,
         )
+    except InvalidPageRequest as e:
+        return FastJsonResponse({"error": str(e)}, status=400)
+
+    return FastJsonResponse({
+        "count": len(rows),
+        **shape_rows(query.fields, query.rows(rows), query.shape),
+        "next": next_cursor,
+        "prev": prev_cursor,
+    })
+
 
-    data = list(qs.order_by("last_name", "first_name"))
-    return JsonResponse({"count": len(data), "results": data})
+# Conditional GET (students/conditional.py): an ETag from the DataVersion
+# of the tables a response reads; an unchanged poll gets a 304 before any query runs.
+STUDENT_API_TABLES = ("student", "section", "enrollment")    # enrollment: ?is_active=
+SECTION_API_TABLES = ("section",)                           # the per-section counters
 
 
+@conditional_on(STUDENT_API_TABLES)
+def api_students(request):
+    return _students_api_response(request)
+
+
+@conditional_on(SECTION_API_TABLES)
 def api_students_per_section(request):
-    rows = (
-        Section.objects
-        .annotate(n_students=Count("section_related_name"))
-        .values("code", "n_students")
-        .order_by("code")
-    )
+    rows = stats.students_per_section()
 
     labels = [r["code"] for r in rows]
     counts = [r["n_students"] for r in rows]
-    return JsonResponse({"labels": labels, "counts": counts})
+    return FastJsonResponse({"labels": labels, "counts": counts})
+
+
+ENROLLMENT_API_FIELDS = ("code", "n_all", "n_active")
 
 
+def _enrollments_api_response(request, rows):
+    # ?shape= as for the student list APIs
+    try:
+        shape = parse_shape(request.GET.get("shape"))
+    except ValueError as e:
+        return FastJsonResponse({"error": str(e)}, status=400)
+    if shape == "records":
+        return FastJsonResponse({"results": rows})   # the cached dicts as they are
+    values = [tuple(r[f] for f in ENROLLMENT_API_FIELDS) for r in rows]
+    return FastJsonResponse(shape_rows(ENROLLMENT_API_FIELDS, values, shape))
+
+
+@conditional_on(SECTION_API_TABLES)
 def api_enrollments_per_section(request):
-    rows = (
-        Section.objects
-        .annotate(
-            n_all=Count("enrollments_related_name"),
-            n_active=Count(
-                "enrollments_related_name",
-                filter=Q(enrollments_related_name__is_active=True)
-            ),
-        )
-        .values("code", "n_all", "n_active")
-        .order_by("code")
-    )
-    return JsonResponse({"results": list(rows)})
+    return _enrollments_api_response(request, stats.enrollments_per_section())
 
 
 def api_ping_jsonresponse(request):
-    return JsonResponse({"ok": True})
+    return FastJsonResponse({"ok": True})
 
 
 def api_ping_httpresponse(request):
@@ -266,77 +266,114 @@ def api_ping_httpresponse(request):
     return HttpResponse(payload2, content_type="application/json")
 
 
+@method_decorator(conditional_on(STUDENT_API_TABLES), name="get")
 class StudentsAPI(LoginRequiredMixin, View):
     def get(self, request):
-        q = (request.GET.get("q") or "").strip()
-        qs = Student.objects.all()
-        if q:
-            qs = qs.filter(
-                Q(first_name__icontains=q) |
-                Q(last_name__icontains=q) |
-                Q(nickname__icontains=q)
-            )
-        data = list(
-            qs.values(
-                "student_id", "first_name", "last_name",
-                "nickname", "email", "section__code"
-            ).order_by("last_name", "first_name")
-        )
-        return JsonResponse({"count": len(data), "results": data})
+        return _students_api_response(request)
 
 
 @login_required(login_url='login_urlpattern')
+@conditional_on(jobs.EXPORT_SOURCES["students"])
 def export_students_csv(request):
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
     filename = f"students_{timestamp}.csv"
 
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    # Streamed: rows are read and written a chunk at a time (see students/exports.py),
+    # so the file is never held in memory and the first bytes go out immediately.
+    rows = exports.iter_rows(exports.student_export_rows())
+    chunks = exports.csv_chunks(exports.STUDENT_EXPORT_COLUMNS, rows)
 
-    writer = csv.writer(response)
-    writer.writerow(["student_id", "first_name", "last_name", "email", "section_code"])
-
-    rows = (
-        Student.objects
-        .select_related("section")
-        .values_list("student_id", "first_name", "last_name", "email", "section__code")
-        .order_by("last_name", "first_name")
-    )
-
-    for row in rows:
-        writer.writerow(row)
-
-    return response
+    return exports.streaming_response(request, chunks, "text/csv", filename)
 
 
 @login_required(login_url='login_urlpattern')
+@conditional_on(jobs.EXPORT_SOURCES["students"])
 def export_students_json(request):
-    data = list(
-        Student.objects
-        .select_related("section")
-        .values(
-            "student_id",
-            "first_name",
-            "last_name",
-            "email",
-            "section__code"
+    # Streamed like the CSV export:
+    #   default:        {"generated_at", "record_count", "students": [...]} (same bytes as before)
+    #   ?format=ndjson: one student object per line
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    rows = exports.student_export_rows()
+
+    if request.GET.get("format") == "ndjson":
+        chunks = exports.ndjson_chunks(rows, exports.STUDENT_EXPORT_FIELDS)
+        return exports.streaming_response(
+            request, chunks, "application/x-ndjson", f"students_{timestamp}.ndjson"
         )
-        .order_by("last_name", "first_name")
+
+    chunks = exports.json_envelope_chunks(
+        rows,
+        exports.STUDENT_EXPORT_FIELDS,
+        generated_at=datetime.now().isoformat(timespec="seconds"),
+    )
+    return exports.streaming_response(
+        request, chunks, "application/json", f"students_{timestamp}.json"
     )
 
-    json_content = {
-        "generated_at": datetime.now().isoformat(timespec="seconds"),
-        "record_count": len(data),
-        "students": data,
-    }
 
-    response = JsonResponse(json_content, json_dumps_params={"indent": 2})
+@login_required(login_url='login_urlpattern')
+@conditional_on(lambda request, table, fmt: jobs.EXPORT_SOURCES.get(table, ()))
+def export_columnar(request, table, fmt):
+    # export/<students|sections|enrollments>.<parquet|arrow>
+    # Typed columns (dates as dates, booleans as booleans), written one record batch
+    # at a time from a chunked query; loads straight into pandas / duckdb.
+    if table not in exports.COLUMNAR_TABLES or fmt not in exports.COLUMNAR_FORMATS:
+        raise Http404("Unknown export.")
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return HttpResponse("Columnar exports need pyarrow (pip install pyarrow).", status=501)
 
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
-    filename = f"students_{timestamp}.json"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return exports.streaming_response(
+        request,
+        exports.columnar_chunks(table, fmt),
+        exports.COLUMNAR_FORMATS[fmt],
+        f"{table}_{timestamp}.{fmt}",
+        compressible=(fmt != "parquet"),
+    )
+
+
+# Background export jobs (students/jobs.py): the request only records the job,
+# `python manage.py run_export_worker` builds the file.
+#   POST export/jobs/                 table=students&format=csv -> job (202, or 200 if reusable)
+#   GET  export/jobs/<id>/            job status
+#   GET  export/jobs/<id>/download    the file (supports Range, so downloads can resume)
 
-    return response
+@login_required(login_url='login_urlpattern')
+@require_POST
+def export_job_create(request):
+    table = request.POST.get("table", "students")
+    file_format = request.POST.get("format", "csv")
+    if (table, file_format) not in jobs.EXPORT_KINDS:
+        return FastJsonResponse({"error": f"Unknown export {table}.{file_format}."}, status=400)
+
+    job = jobs.request_export(table, file_format, user=request.user)
+    status = 200 if job.status == ExportJob.DONE else 202
+    return FastJsonResponse(jobs.job_payload(job, request), status=status)
+
+
+@login_required(login_url='login_urlpattern')
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id)
+    return FastJsonResponse(jobs.job_payload(job, request))
+
+
+@login_required(login_url='login_urlpattern')
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id, status=ExportJob.DONE)
+    path = jobs.artifact_path(job)
+    if not path.exists():
+        # Replaced by a newer version of the same export; request a new job.
+        return FastJsonResponse({"error": "This export has been superseded."}, status=410)
+
+    return exports.ranged_file_response(
+        request,
+        path,
+        jobs.CONTENT_TYPES[job.file_format],
+        filename=job.artifact,
+        etag=f'"{job.data_version}"',
+    )
 
 
 # =======================================================================================
@@ -350,24 +387,9 @@ class ReportsView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["students_per_section"] = (
-            Section.objects
-            .values("code", "name")
-            .annotate(n_students=Count("section_related_name"))
-            .order_by("code")
-        )
-        ctx["enrolls_per_section"] = (
-            Section.objects
-            .annotate(
-                n_all=Count("enrollments_related_name"),
-                n_active=Count(
-                    "enrollments_related_name",
-                    filter=Q(enrollments_related_name__is_active=True)
-                ),
-            )
-            .values("code", "n_all", "n_active")
-            .order_by("code")
-        )
+        dashboard = stats.get_stats()
+        ctx["students_per_section"] = dashboard["students_per_section"]
+        ctx["enrolls_per_section"] = dashboard["enrollments_per_section"]
         return ctx
 
 
@@ -380,30 +402,9 @@ class ReportsView(LoginRequiredMixin, TemplateView):
 
 @login_required(login_url='login_urlpattern')
 def section_counts_chart(request):
-    data = (
-        Section.objects
-        .annotate(student_count=Count("section_related_name"))
-        .order_by("code")
-    )
-
-    labels = [sec.code for sec in data]
-    counts = [sec.student_count for sec in data]
-
-    fig, ax = plt.subplots(figsize=(6, 3), dpi=150)
-    ax.bar(labels, counts, color="#13294B")
-    ax.set_title("Students per Section", fontsize=10, color="#13294B")
-    ax.set_xlabel("Section", fontsize=8)
-    ax.set_ylabel("Students", fontsize=8)
-    ax.tick_params(axis="x", rotation=45, labelsize=8)
-    ax.tick_params(axis="y", labelsize=8)
-    fig.tight_layout()
-
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-
-    return HttpResponse(buf.getvalue(), content_type="image/png")
+    # Rendered once per data change (students/charts.py), then served from the
+    # render cache or answered with 304 Not Modified.
+    return charts.chart_response(request, "sections", stats.students_per_section())
 
 
 class EnrollmentsChartPage(LoginRequiredMixin, TemplateView):
@@ -412,36 +413,10 @@ class EnrollmentsChartPage(LoginRequiredMixin, TemplateView):
 
 @login_required(login_url='login_urlpattern')
 def enrollments_chart_png(request):
-    api_url = request.build_absolute_uri(reverse("api-enrollments-per-section"))
-
-    with urllib.request.urlopen(api_url) as resp:
-        payload = json.load(resp)
-
-    rows = payload.get("results", [])
-
-    labels        = [r["code"] for r in rows]
-    all_counts    = [r["n_all"] for r in rows]
-    active_counts = [r["n_active"] for r in rows]
-
-    x = range(len(labels))
-    width = 0.4
-
-    fig, ax = plt.subplots(figsize=(6.5, 3.2), dpi=150)
-    ax.bar([i - width/2 for i in x], all_counts,   width=width, label="All",    color="#13294B")
-    ax.bar([i + width/2 for i in x], active_counts, width=width, label="Active", color="#E84A27")
-
-    ax.set_title("Enrollments per Section")
-    ax.set_ylabel("Enrollments")
-    ax.set_xticks(list(x))
-    ax.set_xticklabels(labels, rotation=45, ha="right")
-    ax.legend()
-    fig.tight_layout()
-
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-    return HttpResponse(buf.getvalue(), content_type="image/png")
+    # Same data function as api_enrollments_per_section(), called in-process.
+    # (This used to urlopen() our own API: a second worker per chart, a full
+    # HTTP/JSON round trip, and a deadlock on single-worker deployments.)
+    return charts.chart_response(request, "enrollments", stats.enrollments_per_section())
 
 
 # =======================================================================================
@@ -453,27 +428,98 @@ class WeatherNow(LoginRequiredMixin, View):
     redirect_field_name = 'next'
 
     def get(self, request):
-        params = {
-            "latitude": 40.1164,
-            "longitude": -88.2434,
-            "current_weather": True,
-        }
-
+        # Cached, single-flight, circuit-broken client (students/weather.py):
+        # at most one call to Open-Meteo per TTL, however many users hit this.
         try:
-            output_raw_all = requests.get(
-                "https://api.open-meteo.com/v1/forecast",
-                params=params,
-                timeout=5
-            )
+            current, stale = weather.client.current()
+        except weather.WeatherUnavailable as e:
+            return FastJsonResponse({"ok": False, "error": str(e)}, status=502)
+
+        return FastJsonResponse({"ok": True, "weather": current, "stale": stale})
+
+
+# =======================================================================================
+# ASYNC (ASGI) VARIANTS OF THE I/O-BOUND ENDPOINTS (api/async/...)
+# - AsyncWeatherNow, AsyncStudentsAPI
+# - api_students_async(), api_students_per_section_async(), api_enrollments_per_section_async()
+# Same responses as the views above. Under an ASGI server (uvicorn illinois.asgi:application)
+# a request waiting on the database, the cache or Open-Meteo holds no thread: it awaits
+# on the event loop (async ORM, async cache, shared httpx pool in students/weather.py).
+# Under WSGI they still work, but each request pays for its own event loop.
+# =======================================================================================
+
+async def _astudents_api_response(request):
+    # _students_api_response() with the async ORM.
+    try:
+        query = StudentListQuery(request.GET)
+    except ValueError as e:
+        return FastJsonResponse({"error": str(e)}, status=400)
+    qs = query.queryset()
+
+    if not query.paginated:
+        if query.ranked:
+            qs = search.rank_students(qs, query.q)
+        elif query.q:
+            qs = search.filter_students(qs, query.q)
+        rows = query.rows([row async for row in qs.values_list(*query.select)])
+        return FastJsonResponse({"count": len(rows), **shape_rows(query.fields, rows, query.shape)})
+
+    if query.q:
+        qs = search.filter_students(qs, query.q)
+
+    try:
+        rows, next_cursor, prev_cursor = await query.paginator.apage(
+            qs.values_list(*query.select), cursor=query.cursor, limit=query.limit, fields=query.select,
+        )
+    except InvalidPageRequest as e:
+        return FastJsonResponse({"error": str(e)}, status=400)
+
+    return FastJsonResponse({
+        "count": len(rows),
+        **shape_rows(query.fields, query.rows(rows), query.shape),
+        "next": next_cursor,
+        "prev": prev_cursor,
+    })
+
+
+@conditional_on(STUDENT_API_TABLES)
+async def api_students_async(request):
+    return await _astudents_api_response(request)
 
-            output_raw_all.raise_for_status()
-            output_polished_all = output_raw_all.json()
-            output_polished_cw_only = output_polished_all.get("current_weather", {})
 
-            return JsonResponse({"ok": True, "weather": output_polished_cw_only})
+@conditional_on(SECTION_API_TABLES)
+async def api_students_per_section_async(request):
+    rows = await stats.astudents_per_section()
+    return FastJsonResponse({
+        "labels": [r["code"] for r in rows],
+        "counts": [r["n_students"] for r in rows],
+    })
 
-        except requests.exceptions.RequestException as e:
-            return JsonResponse({"ok": False, "error": str(e)}, status=502)
+
+@conditional_on(SECTION_API_TABLES)
+async def api_enrollments_per_section_async(request):
+    return _enrollments_api_response(request, await stats.aenrollments_per_section())
+
+
+# login_required checks the user with request.auser() when the view is async
+# (LoginRequiredMixin would load the session synchronously).
+@method_decorator(login_required(login_url='login_urlpattern'), name="get")
+@method_decorator(conditional_on(STUDENT_API_TABLES), name="get")
+class AsyncStudentsAPI(View):
+    async def get(self, request):
+        return await _astudents_api_response(request)
+
+
+@method_decorator(login_required(login_url='login_urlpattern'), name="get")
+class AsyncWeatherNow(View):
+    async def get(self, request):
+        try:
+            # Under WSGI this loop ends with the request: no background refresh.
+            current, stale = await weather.client.acurrent(background=isinstance(request, ASGIRequest))
+        except weather.WeatherUnavailable as e:
+            return FastJsonResponse({"ok": False, "error": str(e)}, status=502)
+
+        return FastJsonResponse({"ok": True, "weather": current, "stale": stale})
 
 
 # =======================================================================================
@@ -501,5 +547,83 @@ def signup_view(request):
 # NOTE: Personal or Commercial use and sharing not permitted
 # =======================================================================================
 
+# The page is a static shell: no data, no specs. Each chart's spec is its own
+# cached JSON resource (chart_spec() below, students/chart_specs.py) that the page
+# fetches when the chart scrolls into view; the spec points at its dataset URL.
+# The shell is cached whole (per Vary: Cookie, so logged-in headers stay per user).
+@method_decorator(cache_page(settings.STUDENTS_CHART_PAGE_CACHE_SECONDS), name="dispatch")
 class VegaLiteAPI(TemplateView):
-    template_name = "students/vega-lite-illinois.html"
\ No newline at end of file
+    template_name = "students/vega-lite-illinois.html"
+
+
+def chart_spec(request, name):
+    # charts/vega-lite/specs/<name>.json -- ETag + revalidate, 304 when unchanged
+    return chart_specs.spec_response(request, name)
+
+
+def dataset_csv(request, name, digest=None):
+    # datasets/<name>.csv               the current file (revalidated)
+    # datasets/<name>.<digest>.csv      that version of the file (cached for good)
+    # Precompressed gzip / brotli, optional ?oneof= / ?columns= / ?groupby=&agg=.
+    return datasets.dataset_response(request, name, digest)
+
+
+def dataset_series(request, name, digest=None):
+    # datasets/<name>[.<digest>]/series.csv?series=&from=&to=&max_points=
+    # The long-format time series, downsampled per series (LTTB).
+    return timeseries.series_response(request, name, digest)
+
+
+def _dataset_filters(request):
+    # ?series=a,b&from=YYYY-MM-DD&to=YYYY-MM-DD -> (series, start, end); ValueError on bad dates
+    series = [s.strip() for s in request.GET.get("series", "").split(",") if s.strip()]
+    start, end = (
+        datetime.strptime(request.GET[p], "%Y-%m-%d").date() if request.GET.get(p) else None
+        for p in ("from", "to")
+    )
+    return series, start, end
+
+
+@conditional_on((dataset_tables.DATA_VERSION_TABLE,))
+def api_dataset_points(request, name):
+    # api/datasets/<name>/?series=a,b&from=YYYY-MM-DD&to=YYYY-MM-DD&shape=
+    # The typed copy loaded by `python manage.py load_datasets`, read through the
+    # (series, day) index instead of re-parsing the CSV.
+    layout = dataset_tables.LAYOUTS.get(name)
+    if layout is None:
+        raise Http404("Unknown dataset.")
+    try:
+        shape = parse_shape(request.GET.get("shape"))
+        rows = dataset_tables.points(name, *_dataset_filters(request))
+    except ValueError as e:
+        return FastJsonResponse({"error": str(e)}, status=400)
+    key = "country" if layout.kind == "country" else layout.key_field
+    return FastJsonResponse({"dataset": name, "kind": layout.kind, **shape_rows(("series", key, "value"), rows, shape)})
+
+
+@conditional_on((dataset_tables.DATA_VERSION_TABLE,))
+def api_dataset_metrics(request, name):
+    # api/datasets/<name>/metrics/?metric=mean|std|zscore|normalize|standardize&window=20
+    #                             &series=&from=&to=&shape=&format=json|arrow
+    # Computed on request from cached prefix sums (students/metrics.py), so any
+    # window works without a precomputed CSV column.
+    if name not in dataset_tables.LAYOUTS:
+        raise Http404("Unknown dataset.")
+    fmt = request.GET.get("format", "json")
+    if fmt not in ("json", "arrow"):
+        return FastJsonResponse({"error": "format must be json or arrow."}, status=400)
+    try:
+        shape = parse_shape(request.GET.get("shape"))
+        window = int(request.GET.get("window") or metrics.DEFAULT_WINDOW)
+        series, start, end = _dataset_filters(request)
+        columns, rows = metrics.compute(name, series, request.GET.get("metric", "mean"), window, start, end)
+    except ValueError as e:
+        return FastJsonResponse({"error": str(e)}, status=400)
+
+    if fmt == "arrow":
+        try:
+            body = metrics.arrow_bytes(columns, rows)
+        except ImportError:
+            return HttpResponse("Arrow output needs pyarrow (pip install pyarrow).", status=501)
+        return HttpResponse(body, content_type=exports.COLUMNAR_FORMATS["arrow"])
+    return FastJsonResponse({"dataset": name, "window": window, **shape_rows(columns, rows, shape)})
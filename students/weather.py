@@ -0,0 +1,269 @@
+# students/weather.py
+# Client for the Open-Meteo "current weather" call behind WeatherNow (api/weather/).
+#
+# One WeatherClient per process (`client` below). What it adds on top of requests.get:
+#   - a pooled requests.Session (keep-alive, no new TCP/TLS handshake per call)
+#   - a TTL cache in Django's cache (shared by all workers when the backend is):
+#       age < TTL               -> served as is
+#       age < TTL + STALE       -> served immediately, refreshed in the background
+#       older / missing         -> fetched while the caller waits
+#   - single-flight: concurrent misses share one upstream call; a miss in another
+#     worker waits (up to TIMEOUT + 1 s) for that call's result instead of failing
+#   - at most one upstream attempt per TTL window, whatever the traffic
+#     (an "attempt lease" taken with cache.add()); after a failed attempt the
+#     next one is allowed RETRY_AFTER seconds later, not a whole TTL later
+#   - a circuit breaker: after BREAKER_FAILURES failures in a row, stop calling
+#     upstream for BREAKER_RESET seconds, then let one trial call through
+# When upstream is unusable the last good value is served (flagged stale);
+# WeatherUnavailable is raised only when there is nothing to serve at all.
+#
+# acurrent() is the same thing for async views: async cache calls, an
+# httpx.AsyncClient opened and closed around each upstream call (at most one per
+# TTL, so there is no pool worth keeping), and asyncio tasks instead of threads
+# for single-flight and background refreshes. Under WSGI an async view runs in an
+# event loop that ends with the request, which would cancel a background task, so
+# there the stale value is refreshed before returning (background=False). The
+# lease and the breaker are shared, so sync and async callers still make one
+# upstream call per TTL between them.
+
+import asyncio
+import threading
+import time
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+URL = getattr(settings, "STUDENTS_WEATHER_URL", "https://api.open-meteo.com/v1/forecast")
+PARAMS = {
+    "latitude": 40.1164,      # Urbana-Champaign
+    "longitude": -88.2434,
+    "current_weather": True,
+}
+TTL = getattr(settings, "STUDENTS_WEATHER_TTL", 300)
+STALE = getattr(settings, "STUDENTS_WEATHER_STALE", 3600)
+TIMEOUT = getattr(settings, "STUDENTS_WEATHER_TIMEOUT", 3)
+BREAKER_FAILURES = getattr(settings, "STUDENTS_WEATHER_BREAKER_FAILURES", 3)
+BREAKER_RESET = getattr(settings, "STUDENTS_WEATHER_BREAKER_RESET", 900)
+RETRY_AFTER = getattr(settings, "STUDENTS_WEATHER_RETRY_AFTER", 30)
+
+# Attempt lease values: FETCHING while the call is in flight (other workers wait
+# for it), then DONE for the rest of the TTL window or RETRY until the next attempt.
+FETCHING, DONE, RETRY = "fetching", "done", "retry"
+LEADER_POLL = 0.05   # seconds between a follower's looks at the lease
+
+
+class WeatherUnavailable(Exception):
+    pass
+
+
+def current_weather(payload):
+    # The "current_weather" object of a decoded response; ValueError for any other shape.
+    data = payload.get("current_weather") if isinstance(payload, dict) else None
+    if not isinstance(data, dict):
+        raise ValueError(f"no current_weather object in the response ({type(payload).__name__})")
+    return data
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, max_failures, reset_after, clock=time.monotonic):
+        self.max_failures = max_failures
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.state = self.CLOSED
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_after:
+                self.state = self.HALF_OPEN      # exactly one trial call
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.max_failures:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class WeatherClient:
+    def __init__(self, url=URL, params=None, ttl=TTL, stale=STALE, timeout=TIMEOUT,
+                 breaker=None, key_prefix="students:weather", clock=time.time, retry_after=RETRY_AFTER):
+        self.url = url
+        self.params = dict(PARAMS if params is None else params)
+        self.ttl = ttl
+        self.stale = stale
+        self.timeout = timeout
+        self.retry_after = min(retry_after, ttl)
+        self.breaker = breaker or CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+        self.clock = clock
+        self.value_key = f"{key_prefix}:value"
+        self.lease_key = f"{key_prefix}:lease"
+        self.upstream_calls = 0
+        self.last_error = None
+
+        self.session = requests.Session()
+        self.session.mount(url.split("://")[0] + "://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
+        self._lock = threading.Lock()
+        self._inflight = None        # threading.Event of the fetch in progress (this process)
+        self._ainflight = None       # asyncio.Task of the async fetch in progress
+
+    # ---------- public ----------
+
+    def current(self):
+        # -> (current_weather dict, is_stale)
+        entry = cache.get(self.value_key)
+        age = self.clock() - entry["fetched_at"] if entry else None
+
+        if entry and age < self.ttl:
+            return entry["data"], False
+        if entry and age < self.ttl + self.stale:
+            self._refresh(wait=False)           # stale-while-revalidate
+            return entry["data"], True
+
+        self._refresh(wait=True)
+        entry = cache.get(self.value_key)
+        if entry:
+            return entry["data"], self.clock() - entry["fetched_at"] >= self.ttl
+        raise WeatherUnavailable(f"weather service unavailable ({self.last_error or 'no data yet'})")
+
+    async def acurrent(self, background=True):
+        # current() for async views. background=False: the event loop ends with the
+        # request (an async view under WSGI), so refresh before returning.
+        entry = await cache.aget(self.value_key)
+        age = self.clock() - entry["fetched_at"] if entry else None
+
+        if entry and age < self.ttl:
+            return entry["data"], False
+        if entry and age < self.ttl + self.stale and background:
+            self._arefresh()                    # stale-while-revalidate
+            return entry["data"], True
+
+        try:
+            await asyncio.wait_for(asyncio.shield(self._arefresh()), self.timeout + 1)
+        except asyncio.TimeoutError:
+            pass
+        entry = await cache.aget(self.value_key)
+        if entry:
+            return entry["data"], self.clock() - entry["fetched_at"] >= self.ttl
+        raise WeatherUnavailable(f"weather service unavailable ({self.last_error or 'no data yet'})")
+
+    # ---------- internals ----------
+
+    def _refresh(self, wait):
+        with self._lock:
+            event = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
+
+        if leader:
+            if wait:
+                self._fetch(event, wait)
+            else:
+                threading.Thread(target=self._fetch, args=(event, wait), daemon=True).start()
+        elif wait:
+            event.wait(self.timeout + 1)
+
+    def _fetch(self, event, wait=False):
+        try:
+            # One attempt per TTL window across every thread / worker sharing the cache,
+            # and none while the breaker is open.
+            # (Lease first: a half-open breaker must only let a call through that will happen.)
+            if not cache.add(self.lease_key, FETCHING, self.ttl):
+                if wait:
+                    self._wait_for_leader()
+                return
+            if not self.breaker.allow():
+                self.last_error = "circuit open"
+                cache.set(self.lease_key, RETRY, self.retry_after)
+                return
+            self.upstream_calls += 1
+            try:
+                resp = self.session.get(self.url, params=self.params, timeout=self.timeout)
+                resp.raise_for_status()
+                data = current_weather(resp.json())
+                cache.set(self.value_key, self._succeeded(data), self.ttl + self.stale)
+                cache.set(self.lease_key, DONE, self.ttl)
+            except BaseException as e:
+                # Any way out but success is a failed attempt, so the breaker does not
+                # stay half-open and the lease does not stay FETCHING for the whole TTL.
+                self._failed(e)
+                cache.set(self.lease_key, RETRY, self.retry_after)
+                if not isinstance(e, (requests.exceptions.RequestException, ValueError)):
+                    raise
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+    def _arefresh(self):
+        # Single-flight within the event loop: every caller awaits the same task.
+        task = self._ainflight
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self._ainflight = asyncio.get_running_loop().create_task(self._afetch())
+        return task
+
+    def _wait_for_leader(self):
+        # Another worker holds the lease: give its call the time we would have given ours.
+        deadline = time.monotonic() + self.timeout + 1
+        while cache.get(self.lease_key) == FETCHING and time.monotonic() < deadline:
+            time.sleep(LEADER_POLL)
+
+    async def _await_leader(self):
+        # _wait_for_leader() for the event loop
+        deadline = time.monotonic() + self.timeout + 1
+        while await cache.aget(self.lease_key) == FETCHING and time.monotonic() < deadline:
+            await asyncio.sleep(LEADER_POLL)
+
+    async def _afetch(self, wait=True):
+        if not await cache.aadd(self.lease_key, FETCHING, self.ttl):
+            if wait:
+                await self._await_leader()
+            return
+        if not self.breaker.allow():
+            self.last_error = "circuit open"
+            await cache.aset(self.lease_key, RETRY, self.retry_after)
+            return
+        self.upstream_calls += 1
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as http:
+                resp = await http.get(self.url, params=self.params)
+            resp.raise_for_status()
+            data = current_weather(resp.json())
+            await cache.aset(self.value_key, self._succeeded(data), self.ttl + self.stale)
+            await cache.aset(self.lease_key, DONE, self.ttl)
+        except BaseException as e:
+            # As in _fetch(), plus cancellation: the task is cancelled when the event
+            # loop of a WSGI request ends before upstream answers.
+            self._failed(e)
+            await cache.aset(self.lease_key, RETRY, self.retry_after)
+            if not isinstance(e, (httpx.HTTPError, ValueError)):
+                raise
+
+    def _failed(self, error):
+        self.last_error = f"{type(error).__name__}: {error}"
+        self.breaker.record_failure()
+
+    def _succeeded(self, data):
+        # -> the cache entry to store
+        self.last_error = None
+        self.breaker.record_success()
+        return {"data": data, "fetched_at": self.clock()}
+
+
+client = WeatherClient()